@@ -0,0 +1,285 @@
+# backend/alerts.py
+"""
+Subscription / alert rules evaluated at ingest.
+
+A rule (models.AlertRule) sets any of:
+    priority, category, sector, source   lists; the field must equal one value
+    keywords                             words or phrases; one must occur in
+                                         title + summary (case-insensitive,
+                                         whole words)
+and matches an incident when every condition it sets holds.
+
+RuleIndex compiles the enabled rules into posting lists (field value →
+rules, first keyword token → (rule, phrase)). Matching an incident only
+walks the postings for its own values and tokens and counts satisfied
+conditions per rule, so the cost follows the number of candidate rules,
+not the total number of rules.
+
+Matches are grouped per webhook and queued as "alert" jobs; delivery
+(batched, retried) is automation/alert_delivery.py.
+
+Webhook URLs must resolve to public addresses (no private, loopback or
+link-local targets), unless the host is listed in CYBERNOW_WEBHOOK_HOSTS
+(comma-separated; a listed domain also allows its subdomains). Rules read
+back through the API show the URL redacted to scheme://host/…, since
+webhook paths usually carry the token.
+"""
+
+import ipaddress
+import json
+import os
+import re
+import socket
+import threading
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+from sqlalchemy import func, select
+
+from .automation import job_queue
+from .models import AlertRule
+from . import metrics
+
+FIELDS = ("priority", "category", "sector", "source")
+CONDITIONS = FIELDS + ("keywords",)
+MAX_VALUES = 200                 # per condition list
+MAX_ALERTS_PER_JOB = 100
+ALERT_JOB = "alert"
+WEBHOOK_HOSTS = {
+    h.strip().lower().rstrip(".")
+    for h in os.getenv("CYBERNOW_WEBHOOK_HOSTS", "").split(",") if h.strip()
+}
+
+# incident columns carried in an alert (rows passed to dispatch() need them)
+ROW_FIELDS = ("id", "title", "summary", "url", "source", "timestamp",
+              "priority", "category", "sector", "threat_score")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+MATCHED = metrics.counter(
+    "cybernow_alerts_matched_total", "Incident/rule matches queued for delivery"
+)
+
+
+class AlertRuleError(ValueError):
+    """Invalid rule definition (reported to the client as 400)."""
+
+
+# ================== RULES ==================
+def _norm(value):
+    return str(value).strip().lower() if value is not None else ""
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _allowed_host(host):
+    return any(host == h or host.endswith("." + h) for h in WEBHOOK_HOSTS)
+
+
+def check_webhook_url(url):
+    """Reject non-http(s) URLs and hosts resolving to non-public addresses."""
+    parts = urlparse(url)
+    if parts.scheme not in ("http", "https"):
+        raise AlertRuleError("webhook_url must be an http(s) URL")
+    host = (parts.hostname or "").rstrip(".")
+    if not host:
+        raise AlertRuleError("webhook_url has no host")
+    if _allowed_host(host):
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError):
+        raise AlertRuleError(f"webhook_url host {host!r} does not resolve")
+    for *_, sockaddr in infos:
+        addr = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if not addr.is_global or addr.is_multicast:
+            raise AlertRuleError(f"webhook_url host {host!r} is not a public address")
+
+
+def redact_webhook(url):
+    """scheme://host[:port]/… — the path and query usually hold the secret."""
+    parts = urlparse(url or "")
+    if not parts.hostname:
+        return ""
+    netloc = f"{parts.hostname}:{parts.port}" if parts.port else parts.hostname
+    tail = "/…" if (parts.path.strip("/") or parts.query) else ""
+    return f"{parts.scheme}://{netloc}{tail}"
+
+
+def parse_rule(data):
+    """Validate an API payload → dict of AlertRule column values."""
+    if not isinstance(data, dict):
+        raise AlertRuleError("JSON object required")
+
+    name = str(data.get("name") or "").strip()
+    if not name:
+        raise AlertRuleError("name is required")
+    webhook = str(data.get("webhook_url") or "").strip()
+    check_webhook_url(webhook)
+
+    conditions = {}
+    for key in CONDITIONS:
+        values = data.get(key)
+        if values in (None, "", []):
+            continue
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise AlertRuleError(f"{key} must be a string or a list of strings")
+        values = sorted({v.strip() for v in values if v.strip()})
+        if len(values) > MAX_VALUES:
+            raise AlertRuleError(f"{key}: at most {MAX_VALUES} values")
+        if key == "keywords" and not all(_tokens(v) for v in values):
+            raise AlertRuleError("keywords must contain letters or digits")
+        if values:
+            conditions[key] = values
+    if not conditions:
+        raise AlertRuleError(f"set at least one of {', '.join(CONDITIONS)}")
+
+    return {
+        "name": name[:200],
+        "webhook_url": webhook,
+        "conditions": json.dumps(conditions, sort_keys=True),
+        "enabled": bool(data.get("enabled", True)),
+    }
+
+
+def rule_dict(rule):
+    return {
+        "id": rule.id,
+        "name": rule.name,
+        "webhook_url": redact_webhook(rule.webhook_url),
+        "enabled": bool(rule.enabled),
+        **json.loads(rule.conditions or "{}"),
+        "created_at": rule.created_at.isoformat() if rule.created_at else None,
+    }
+
+
+# ================== MATCHER ==================
+class RuleIndex:
+    """Enabled rules compiled into posting lists; see the module docstring."""
+
+    def __init__(self, rules):
+        self.rules = {}                                   # id → (name, webhook_url)
+        self._required = {}                               # id → conditions set
+        self._by_value = {f: defaultdict(list) for f in FIELDS}
+        self._by_token = defaultdict(list)                # first token → [(id, phrase)]
+
+        for rule_id, name, webhook_url, conditions in rules:
+            conditions = json.loads(conditions or "{}")
+            required = 0
+            for field in FIELDS:
+                values = {_norm(v) for v in conditions.get(field, ())}
+                for value in values:
+                    self._by_value[field][value].append(rule_id)
+                required += bool(values)
+            phrases = {tuple(_tokens(k)) for k in conditions.get("keywords", ())} - {()}
+            for phrase in phrases:
+                self._by_token[phrase[0]].append((rule_id, phrase))
+            required += bool(phrases)
+            if required:
+                self.rules[rule_id] = (name, webhook_url)
+                self._required[rule_id] = required
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, row):
+        """Ids of the rules matching one incident (dict with FIELDS, title, summary)."""
+        hits = Counter()
+        for field in FIELDS:
+            for rule_id in self._by_value[field].get(_norm(row.get(field)), ()):
+                hits[rule_id] += 1
+
+        if self._by_token:
+            tokens = _tokens(f"{row.get('title') or ''} {row.get('summary') or ''}")
+            positions = defaultdict(list)
+            for i, tok in enumerate(tokens):
+                positions[tok].append(i)
+
+            found = set()
+            for tok, starts in positions.items():
+                for rule_id, phrase in self._by_token.get(tok, ()):
+                    if rule_id in found:
+                        continue
+                    n = len(phrase)
+                    if n == 1 or any(tuple(tokens[i:i + n]) == phrase for i in starts):
+                        found.add(rule_id)
+            for rule_id in found:
+                hits[rule_id] += 1
+
+        return [rule_id for rule_id, n in hits.items() if n == self._required[rule_id]]
+
+
+_index_lock = threading.Lock()
+_index_cache = {"key": None, "index": None}
+
+
+def load_index(db):
+    """The compiled index, rebuilt only when alert_rules changed (any process)."""
+    key = tuple(db.execute(
+        select(func.count(AlertRule.id), func.max(AlertRule.updated_at))
+    ).one())
+    with _index_lock:
+        if _index_cache["key"] != key:
+            rows = db.execute(
+                select(AlertRule.id, AlertRule.name, AlertRule.webhook_url, AlertRule.conditions)
+                .where(AlertRule.enabled.is_(True))
+            ).all()
+            _index_cache.update(key=key, index=RuleIndex(rows))
+        return _index_cache["index"]
+
+
+# ================== DISPATCH ==================
+def _alert_incident(row):
+    out = {f: row.get(f) for f in ROW_FIELDS if f != "summary"}
+    if out["timestamp"] is not None:
+        out["timestamp"] = out["timestamp"].isoformat()
+    return out
+
+
+def evaluate(index, rows):
+    """{webhook_url: [alert, ...]} for the incident rows matching `index`."""
+    by_webhook = defaultdict(list)
+    for row in rows:
+        for rule_id in index.match(row):
+            name, webhook_url = index.rules[rule_id]
+            by_webhook[webhook_url].append({
+                "rule_id": rule_id,
+                "rule": name,
+                "incident": _alert_incident(row),
+            })
+    return by_webhook
+
+
+def dispatch(db, rows):
+    """
+    Match newly stored (and classified) incidents against the rules and
+    queue the alerts. Never raises: alerting must not fail ingest.
+    Returns the number of alerts queued.
+    """
+    if not rows:
+        return 0
+    try:
+        with metrics.span("alerts.match", rows=len(rows)):
+            index = load_index(db)
+            if not len(index):
+                return 0
+            by_webhook = evaluate(index, rows)
+
+        payloads = [
+            {"webhook_url": webhook_url, "alerts": alerts[i:i + MAX_ALERTS_PER_JOB]}
+            for webhook_url, alerts in by_webhook.items()
+            for i in range(0, len(alerts), MAX_ALERTS_PER_JOB)
+        ]
+        job_queue.enqueue_many(ALERT_JOB, payloads)
+        queued = sum(len(p["alerts"]) for p in payloads)
+        MATCHED.inc(queued)
+        return queued
+
+    except Exception as e:
+        print("⚠️ Alert dispatch failed:", e)
+        return 0
@@ -0,0 +1,297 @@
+# backend/analytics_store.py
+"""
+Columnar snapshot of incidents for long-range analytics.
+
+The OLTP SQLite table only keeps ~60 days (retention) and GROUP BY over
+it competes with ingest. This module appends new incidents (id > last
+snapshot) into a compact numpy column store:
+
+    id        int64
+    day       int32   days since 1970-01-01 (-1 = no timestamp)
+    category  int16   code into the "category" dictionary
+    source    int16   code into the "source" dictionary
+    priority  int16   code into the "priority" dictionary
+    sector    int16   code into the "sector" dictionary
+    mitigated bool
+    anomaly   float32 IsolationForest score (NaN = not scored)
+
+and answers day/week counts grouped by category, source, priority or
+sector with vectorized scans (np.bincount). The store is append-only, so it
+keeps history past the retention window; rows are captured as
+classified at ingest time.
+
+Appending on "id > last id" relies on incident ids never being reissued
+(incidents is AUTOINCREMENT, see automation/db_migrate.py); refresh()
+also reserves the store's last id, so rows inserted after the migration
+from a reused-id table can't land at or below it.
+
+Refresh:  analytics_store.refresh()         (run_pipeline does this every cycle)
+Rebuild:  python -m backend.analytics_store --rebuild
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select
+
+from .models import Incident
+from .automation.db_migrate import reserve_ids
+from . import metrics
+
+BACKEND_DIR = Path(__file__).resolve().parent
+STORE_FILE = Path(
+    os.environ.get("CYBERNOW_ANALYTICS_STORE", BACKEND_DIR / "analytics_store.npz")
+)
+
+GROUP_COLUMNS = ("category", "source", "priority", "sector")
+INTERVALS = ("day", "week")
+FETCH_ROWS = 5000
+DEFAULT_RANGE_DAYS = 90
+MAX_RANGE_DAYS = 3660
+
+_COLUMN_TYPES = {
+    "id": np.int64,
+    "day": np.int32,
+    "category": np.int16,
+    "source": np.int16,
+    "priority": np.int16,
+    "sector": np.int16,
+    "mitigated": np.bool_,
+    "anomaly": np.float32,
+}
+
+_write_lock = threading.Lock()
+_load_cache = {"mtime": None, "store": None}
+
+
+class AnalyticsError(ValueError):
+    """Bad range query parameters (reported to the client as 400)."""
+
+
+# ================== STORE I/O ==================
+def _empty_store():
+    store = {name: np.empty(0, dtype=t) for name, t in _COLUMN_TYPES.items()}
+    for col in GROUP_COLUMNS:
+        store[f"dict_{col}"] = np.empty(0, dtype=str)
+    return store
+
+
+def _upgrade(store):
+    """
+    Fill columns an older store lacks (sector → "Unknown", anomaly → NaN)
+    instead of rebuilding: the store holds rows the OLTP table no longer has.
+    """
+    n = len(store["id"])
+    for col in GROUP_COLUMNS:
+        if col not in store:
+            store[col] = np.zeros(n, dtype=np.int16)
+            store[f"dict_{col}"] = np.array(["Unknown"] if n else [], dtype=str)
+    if "anomaly" not in store:
+        store["anomaly"] = np.full(n, np.nan, dtype=np.float32)
+
+
+def load_store():
+    """
+    Current store (dict of numpy arrays), cached until the file changes.
+    Columns added since the file was written are back-filled (see _upgrade).
+    """
+    try:
+        mtime = STORE_FILE.stat().st_mtime
+    except OSError:
+        return None
+    if _load_cache["mtime"] != mtime:
+        with np.load(STORE_FILE, allow_pickle=False) as data:
+            store = {name: data[name] for name in data.files}
+        _upgrade(store)
+        _load_cache.update(mtime=mtime, store=store)
+    return _load_cache["store"]
+
+
+def _save_store(store):
+    tmp = STORE_FILE.with_name(STORE_FILE.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **store)
+    os.replace(tmp, STORE_FILE)
+
+
+# ================== SNAPSHOT ==================
+def _encode(values, dictionary):
+    """Map strings to int16 codes, extending `dictionary` (a list) in place."""
+    index = {v: i for i, v in enumerate(dictionary)}
+    codes = np.empty(len(values), dtype=np.int16)
+    for i, v in enumerate(values):
+        v = v or "Unknown"
+        code = index.get(v)
+        if code is None:
+            code = index[v] = len(dictionary)
+            dictionary.append(v)
+        codes[i] = code
+    return codes
+
+
+def _to_days(timestamps):
+    days = np.array(timestamps, dtype="datetime64[D]")
+    out = days.astype(np.int64)
+    out[np.isnat(days)] = -1
+    return out.astype(np.int32)
+
+
+def _fetch_new(db, after_id):
+    stmt = (
+        select(
+            Incident.id, Incident.timestamp, Incident.category,
+            Incident.source, Incident.priority, Incident.sector,
+            Incident.is_mitigated, Incident.anomaly_score,
+        )
+        .where(Incident.id > after_id)
+        .order_by(Incident.id)
+        .execution_options(yield_per=FETCH_ROWS)
+    )
+    return db.execute(stmt).partitions(FETCH_ROWS)
+
+
+@metrics.timed("analytics.refresh")
+def refresh(db=None, rebuild=False):
+    """Append incidents newer than the snapshot. Returns rows appended."""
+    from .database import SessionLocal
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        with _write_lock:
+            store = None if rebuild else load_store()
+            if store is None:
+                store = _empty_store()
+            after_id = int(store["id"][-1]) if len(store["id"]) else 0
+            reserve_ids(db, after_id)
+            dictionaries = {c: list(store[f"dict_{c}"]) for c in GROUP_COLUMNS}
+
+            parts = {name: [store[name]] for name in _COLUMN_TYPES}
+            added = 0
+            for chunk in _fetch_new(db, after_id):
+                ids, ts, cats, srcs, prios, sectors, mitigated, anomaly = zip(*chunk)
+                parts["id"].append(np.array(ids, dtype=np.int64))
+                parts["day"].append(_to_days(ts))
+                parts["category"].append(_encode(cats, dictionaries["category"]))
+                parts["source"].append(_encode(srcs, dictionaries["source"]))
+                parts["priority"].append(_encode(prios, dictionaries["priority"]))
+                parts["sector"].append(_encode(sectors, dictionaries["sector"]))
+                parts["mitigated"].append(np.array([bool(m) for m in mitigated]))
+                parts["anomaly"].append(
+                    np.array([np.nan if a is None else a for a in anomaly], dtype=np.float32)
+                )
+                added += len(chunk)
+
+            if not added and STORE_FILE.exists():
+                return 0
+
+            new_store = {
+                name: np.concatenate(parts[name]).astype(t, copy=False)
+                for name, t in _COLUMN_TYPES.items()
+            }
+            for col in GROUP_COLUMNS:
+                new_store[f"dict_{col}"] = np.array(dictionaries[col], dtype=str)
+            _save_store(new_store)
+            _load_cache.update(mtime=STORE_FILE.stat().st_mtime, store=new_store)
+            return added
+    finally:
+        if own_session:
+            db.close()
+
+
+# ================== QUERIES ==================
+def _parse_day(value, default):
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise AnalyticsError("start/end must be ISO dates (YYYY-MM-DD)")
+
+
+def parse_range(args):
+    """Validate ?start=&end=&interval=&group_by= into query kwargs."""
+    end = _parse_day(args.get("end"), date.today())
+    start = _parse_day(args.get("start"), end - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    if start > end:
+        raise AnalyticsError("start must not be after end")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise AnalyticsError(f"range is limited to {MAX_RANGE_DAYS} days")
+
+    interval = args.get("interval") or "day"
+    if interval not in INTERVALS:
+        raise AnalyticsError(f"interval must be one of {', '.join(INTERVALS)}")
+    group_by = args.get("group_by") or "category"
+    if group_by not in GROUP_COLUMNS:
+        raise AnalyticsError(f"group_by must be one of {', '.join(GROUP_COLUMNS)}")
+    return {"start": start, "end": end, "interval": interval, "group_by": group_by}
+
+
+def range_counts(store, start, end, interval="day", group_by="category"):
+    """
+    Incident counts per bucket between start and end (inclusive dates),
+    one dataset per group value, in the trends chart shape.
+    """
+    epoch = date(1970, 1, 1)
+    first, last = (start - epoch).days, (end - epoch).days
+    if interval == "week":
+        first -= start.weekday()  # buckets start on Monday
+    step = 7 if interval == "week" else 1
+    n_buckets = (last - first) // step + 1
+    labels = [(epoch + timedelta(days=first + i * step)).isoformat() for i in range(n_buckets)]
+
+    names = store[f"dict_{group_by}"]
+    day = store["day"]
+    mask = (day >= max(first, (start - epoch).days)) & (day <= last)
+    buckets = (day[mask] - first) // step
+    codes = store[group_by][mask].astype(np.int64)
+
+    counts = np.bincount(
+        codes * n_buckets + buckets, minlength=len(names) * n_buckets
+    ).reshape(len(names), n_buckets)
+    mitigated = np.bincount(buckets[store["mitigated"][mask]], minlength=n_buckets)
+
+    totals = counts.sum(axis=1)
+    datasets = [
+        {"label": str(names[i]), "values": counts[i].tolist()}
+        for i in np.argsort(-totals, kind="stable")
+        if totals[i]
+    ]
+    return {
+        "interval": interval,
+        "group_by": group_by,
+        "labels": labels,
+        "datasets": datasets,
+        "totals": {"detected": counts.sum(axis=0).tolist(), "mitigated": mitigated.tolist()},
+    }
+
+
+def snapshot_info(store):
+    return {
+        "rows": int(len(store["id"])),
+        "max_id": int(store["id"][-1]) if len(store["id"]) else 0,
+        "updated_at": _load_cache["mtime"],
+    }
+
+
+# ================== CLI ==================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the analytics column store")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild from scratch")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    added = refresh(rebuild=args.rebuild)
+    info = snapshot_info(load_store())
+    print(f"📦 Analytics store: +{added} rows, {info['rows']} total "
+          f"in {time.perf_counter() - t0:.2f}s → {STORE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,165 +1,468 @@
-from datetime import datetime
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Blueprint, Flask, Response, g, jsonify, send_from_directory, request
 from flask_cors import CORS
 from datetime import date, datetime, timedelta
 from sqlalchemy import func, case
 from sqlalchemy import and_
 import os
 import hashlib
-import requests
 import json
+import time
 from pathlib import Path
 
-from .database import init_db, SessionLocal
-from .models import Incident
+from .database import init_db, db_session, SessionLocal
+from .models import AlertRule, Incident, IncidentEntity
+from .collector import entity_extractor
+from . import metrics
+from .dashboard_snapshot import get_snapshot, recent_trends, ml_status as current_ml_status
+from .serialization import fingerprint, json_response
+from . import (
+    alerts, analytics_store, export_service, hot_window, reports, text_store, vector_index,
+)
 
 # ---------------- CONFIG ----------------
 BASE_DIR = os.path.dirname(__file__)
 STATIC_DIR = os.path.join(BASE_DIR, "static")
-ML_DIR = Path(BASE_DIR) / "ml"
-DRIFT_STATE = ML_DIR / "drift_state.json"
 
-app = Flask(
-    __name__,
-    static_folder="static",
-    static_url_path="/static"
+bp = Blueprint("cybernow", __name__)
+
+# ---------------- METRICS ----------------
+HTTP_SECONDS = metrics.histogram(
+    "cybernow_http_request_duration_seconds", "Flask request latency"
+)
+HTTP_REQUESTS = metrics.counter(
+    "cybernow_http_requests_total", "Flask requests served"
 )
+HTTP_IN_FLIGHT = metrics.gauge(
+    "cybernow_http_requests_in_flight", "Flask requests being handled"
+)
+
+
+@bp.before_app_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+    g.request_endpoint = request.endpoint or "unmatched"
+    HTTP_IN_FLIGHT.inc(endpoint=g.request_endpoint)
+
+
+@bp.after_app_request
+def _count_request(response):
+    if "request_start" in g:
+        HTTP_REQUESTS.inc(
+            endpoint=g.request_endpoint,
+            method=request.method,
+            status=response.status_code,
+        )
+    return response
+
+
+@bp.teardown_app_request
+def _stop_timer(exc):
+    start = g.pop("request_start", None)
+    if start is None:
+        return
+    endpoint = g.pop("request_endpoint")
+    HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+    HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+
 
-CORS(app)
-init_db()
+@bp.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
 
-# ---------------- DB SESSION (FIXED) ----------------
+# ---------------- DB SESSION ----------------
 def get_db():
-    return SessionLocal()
+    """Request-scoped session; removed in teardown_appcontext."""
+    return db_session()
+
+def _int_arg(name, default, upper):
+    try:
+        return max(1, min(int(request.args.get(name, default)), upper))
+    except ValueError:
+        return default
 
 # ---------------- FRONTEND ROUTES ----------------
-@app.route("/")
-@app.route("/live-feed")
-@app.route("/apt-groups")
-@app.route("/sectors")
-@app.route("/trends")
-@app.route("/analytics")
-@app.route("/reports")
+@bp.route("/")
+@bp.route("/live-feed")
+@bp.route("/apt-groups")
+@bp.route("/sectors")
+@bp.route("/trends")
+@bp.route("/analytics")
+@bp.route("/reports")
 def index():
     return send_from_directory(STATIC_DIR, "index.html")
 
 # ---------------- DASHBOARD APIs ----------------
-@app.route("/api/dashboard/summary")
-def dashboard_summary():
-    db = SessionLocal()
-
-    today_start = datetime.combine(date.today(), datetime.min.time())
-    today_end = datetime.combine(date.today(), datetime.max.time())
-
-    total_today = db.query(Incident).filter(
-        Incident.timestamp.between(today_start, today_end)
-    ).count()
+@bp.route("/api/dashboard/snapshot")
+def dashboard_snapshot():
+    """Summary, distribution, trends, ML status and live feed in one payload."""
+    snapshot = get_snapshot(get_db())
+    resp = json_response(snapshot, cache_key=("snapshot", snapshot["version"]))
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
-    critical_today = db.query(Incident).filter(
-        Incident.timestamp.between(today_start, today_end),
-        Incident.priority.in_(["HIGH", "CRITICAL"])
-    ).count()
+@bp.route("/api/dashboard/summary")
+def dashboard_summary():
+    db = get_db()
+    hot_window.refresh(db)
+    today = hot_window.day_counts(date.today())
 
-    affected_sectors = db.query(Incident.sector).filter(
-        Incident.sector.isnot(None)
-    ).distinct().count()
+    # all-time figures: one aggregate pass instead of two COUNT queries
+    affected_sectors, mitigated = db.query(
+        func.count(func.distinct(Incident.sector)),
+        func.sum(case((Incident.is_mitigated.is_(True), 1), else_=0)),
+    ).one()
 
-    mitigated = db.query(Incident).filter(
-        Incident.is_mitigated.is_(True)
-    ).count()
+    return json_response({
+        "total_threats_today": today["total"],
+        "critical_incidents": (
+            today["by_priority"].get("HIGH", 0) + today["by_priority"].get("CRITICAL", 0)
+        ),
+        "affected_sectors": int(affected_sectors or 0),
+        "threats_mitigated": int(mitigated or 0),
+    })
 
-    db.close()
+@bp.route("/api/dashboard/today")
+def dashboard_today():
+    """Today's counts by priority / category / sector, served from the hot window."""
+    hot_window.refresh(get_db())
+    return json_response(
+        lambda: {"date": date.today().isoformat(), **hot_window.day_counts(date.today())},
+        cache_key=("today", date.today(), hot_window.version()),
+    )
 
-    return jsonify({
-        "total_threats_today": total_today,
-        "critical_incidents": critical_today,
-        "affected_sectors": affected_sectors,
-        "threats_mitigated": mitigated
-    })
-@app.route("/api/incidents/live")
+@bp.route("/api/incidents/live")
 def live_incidents():
-    db = SessionLocal()
+    db = get_db()
+    hot_window.refresh(db)
+
+    items = hot_window.live(50)
+    if items is not None:
+        return json_response(items, cache_key=("live-hot", hot_window.version()))
 
+    # window holds fewer than 50 rows: older ones come from the DB
     rows = (
-        db.query(Incident)
+        db.query(
+            Incident.title, Incident.text_hash, Incident.timestamp,
+            Incident.priority, Incident.url,
+        )
         .order_by(Incident.timestamp.desc())
         .limit(50)
         .all()
     )
+    rows = [tuple(r) for r in rows]
+
+    # unchanged rows → the cached, pre-compressed bytes are reused
+    # (bodies are only fetched and decoded on a cache miss)
+    def build():
+        summaries = text_store.fetch(db, [r[1] for r in rows])
+        return [
+            {
+                "title": title,
+                "summary": summaries.get(text_hash),
+                "timestamp": ts.isoformat() if ts else None,
+                "priority": priority or "LOW",
+                "url": url,  # ✅ correct column
+            }
+            for title, text_hash, ts, priority, url in rows
+        ]
+
+    return json_response(build, cache_key=("live", fingerprint(rows)))
+
+@bp.route("/api/incidents/top")
+def top_incidents():
+    """Highest composite threat scores (?limit=&days=), via the threat_score index."""
+    limit = _int_arg("limit", 20, 200)
+    query = get_db().query(
+        Incident.id, Incident.title, Incident.timestamp, Incident.priority,
+        Incident.source, Incident.url, Incident.threat_score,
+    ).filter(Incident.threat_score.isnot(None))
+    if request.args.get("days"):
+        since = datetime.utcnow() - timedelta(days=_int_arg("days", 7, 3660))
+        query = query.filter(Incident.timestamp >= since)
 
-    return jsonify([
+    rows = [tuple(r) for r in query.order_by(Incident.threat_score.desc()).limit(limit).all()]
+    return json_response(lambda: [
         {
-            "title": i.title,
-            "summary": i.summary,
-            "timestamp": i.timestamp.isoformat() if i.timestamp else None,
-            "priority": i.priority or "LOW",
-            "url": i.url,  # ✅ correct column
+            "id": id_,
+            "title": title,
+            "timestamp": ts.isoformat() if ts else None,
+            "priority": priority or "LOW",
+            "source": source,
+            "url": url,
+            "threat_score": score,
         }
-        for i in rows
-    ])
+        for id_, title, ts, priority, source, url, score in rows
+    ], cache_key=("top", fingerprint(rows)))
 
-@app.route("/api/analytics/threat-distribution")
-def threat_distribution():
-    db = get_db()
+@bp.route("/api/incidents/export")
+def export_incidents():
+    """
+    Stream incidents as NDJSON/CSV/Parquet for SIEM pulls.
+    ?format=&since=<watermark>&start=&end=&priority=&source=
+    The X-Export-Watermark header is the `since` for the next delta.
+    """
     try:
-        rows = (
-            db.query(Incident.category, func.count(Incident.id))
-            .group_by(Incident.category)
-            .all()
-        )
+        filters = export_service.parse_filters(request.args)
+    except export_service.ExportError as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify([
-            {"label": c or "Unknown", "value": int(n)}
-            for c, n in rows
-        ])
-    finally:
+    # own session: it must outlive the request while the body streams
+    db = SessionLocal()
+    try:
+        upper = export_service.watermark(db, filters)
+    except Exception:
         db.close()
+        raise
 
-@app.route("/api/analytics/trends")
-def threat_trends():
+    def generate():
+        try:
+            yield from export_service.export_chunks(db, filters, upper)
+        finally:
+            db.close()
+
+    fmt = filters["format"]
+    resp = Response(generate(), mimetype=export_service.FORMATS[fmt])
+    resp.headers["X-Export-Watermark"] = str(upper)
+    resp.headers["Content-Disposition"] = (
+        f'attachment; filename="incidents-{filters["since"]}-{upper}.{fmt}"'
+    )
+    return resp
+
+# ---------------- ENTITIES ----------------
+@bp.route("/api/entities/<kind>/<path:value>/incidents")
+def entity_incidents(kind, value):
+    """Incidents mentioning an entity, e.g. /api/entities/cve/CVE-2026-1234/incidents."""
+    if kind not in entity_extractor.KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(entity_extractor.KINDS)}"}), 400
+    value = entity_extractor.normalize(kind, value)
+
+    rows = (
+        get_db().query(
+            Incident.id, Incident.title, Incident.timestamp,
+            Incident.priority, Incident.url,
+        )
+        .join(IncidentEntity, IncidentEntity.incident_id == Incident.id)
+        .filter(IncidentEntity.kind == kind, IncidentEntity.value == value)
+        .order_by(IncidentEntity.timestamp.desc())
+        .limit(_int_arg("limit", 50, 500))
+        .all()
+    )
+    rows = [tuple(r) for r in rows]
+    return json_response(lambda: {
+        "kind": kind,
+        "value": value,
+        "incidents": [
+            {
+                "id": id_,
+                "title": title,
+                "timestamp": ts.isoformat() if ts else None,
+                "priority": priority or "LOW",
+                "url": url,
+            }
+            for id_, title, ts, priority, url in rows
+        ],
+    }, cache_key=("entity", kind, value, fingerprint(rows)))
+
+@bp.route("/api/entities/top")
+def top_entities():
+    """Most-mentioned entities of a kind, e.g. ?kind=apt&days=7 → top APT groups this week."""
+    kind = request.args.get("kind", "apt")
+    if kind not in entity_extractor.KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(entity_extractor.KINDS)}"}), 400
+    days = _int_arg("days", 7, 3660)
+    since = datetime.utcnow() - timedelta(days=days)
+
+    n = func.count(IncidentEntity.id)
+    rows = (
+        get_db().query(IncidentEntity.value, n)
+        .filter(IncidentEntity.kind == kind, IncidentEntity.timestamp >= since)
+        .group_by(IncidentEntity.value)
+        .order_by(n.desc())
+        .limit(_int_arg("limit", 10, 100))
+        .all()
+    )
+    return json_response({
+        "kind": kind,
+        "days": days,
+        "items": [{"value": v, "count": int(c)} for v, c in rows],
+    })
+
+@bp.route("/api/incidents/<int:incident_id>/entities")
+def incident_entities(incident_id):
+    rows = (
+        get_db().query(IncidentEntity.kind, IncidentEntity.value)
+        .filter(IncidentEntity.incident_id == incident_id)
+        .order_by(IncidentEntity.kind, IncidentEntity.value)
+        .all()
+    )
+    grouped = {}
+    for kind, value in rows:
+        grouped.setdefault(kind, []).append(value)
+    return json_response(grouped)
+
+@bp.route("/api/incidents/<int:incident_id>/related")
+def related_incidents(incident_id):
+    """
+    Most similar incidents from the vector index.
+    ?limit=&mode=auto|exact|approx&earlier=1 (only incidents stored before this one)
+    """
+    limit = _int_arg("limit", 10, 100)
     db = get_db()
     try:
-        rows = (
-            db.query(
-                func.date(Incident.timestamp),
-                func.count(Incident.id),
-                func.sum(case((Incident.is_mitigated == True, 1), else_=0))
-            )
-            .group_by(func.date(Incident.timestamp))
-            .order_by(func.date(Incident.timestamp))
-            .limit(14)
-            .all()
+        hits = vector_index.related(
+            db, incident_id, limit,
+            mode=request.args.get("mode") or "auto",
+            earlier=request.args.get("earlier") in ("1", "true"),
         )
+    except vector_index.VectorIndexError as e:
+        return jsonify({"error": str(e)}), 400
+    if hits is None:
+        if vector_index.load() is None:
+            return jsonify({"error": "vector index not built yet"}), 503
+        return jsonify({"error": "incident not found"}), 404
 
-        labels, detected, mitigated = [], [], []
-        for d, det, mit in rows:
-            labels.append(str(d))
-            detected.append(int(det))
-            mitigated.append(int(mit or 0))
-
-        return jsonify({
-            "labels": labels,
-            "datasets": [
-                {"label": "Detected", "values": detected},
-                {"label": "Mitigated", "values": mitigated},
-            ],
-        })
-    finally:
-        db.close()
+    # rows removed by retention since they were indexed are skipped
+    rows = {
+        r.id: r for r in db.query(
+            Incident.id, Incident.title, Incident.timestamp, Incident.priority,
+            Incident.source, Incident.url,
+        ).filter(Incident.id.in_([i for i, _ in hits])).all()
+    }
+    return json_response([
+        {
+            "id": i,
+            "title": rows[i].title,
+            "timestamp": rows[i].timestamp.isoformat() if rows[i].timestamp else None,
+            "priority": rows[i].priority or "LOW",
+            "source": rows[i].source,
+            "url": rows[i].url,
+            "similarity": round(score, 4),
+        }
+        for i, score in hits if i in rows
+    ][:limit])
+
+# ---------------- ALERT RULES ----------------
+@bp.route("/api/alerts/rules")
+def list_alert_rules():
+    rules = get_db().query(AlertRule).order_by(AlertRule.id).all()
+    return jsonify([alerts.rule_dict(r) for r in rules])
+
+@bp.route("/api/alerts/rules", methods=["POST"])
+def create_alert_rule():
+    """
+    {"name", "webhook_url", "priority": [...], "category": [...], "sector": [...],
+     "source": [...], "keywords": [...]}; matched against every new incident.
+    """
+    try:
+        values = alerts.parse_rule(request.get_json(silent=True))
+    except alerts.AlertRuleError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = get_db()
+    rule = AlertRule(**values)
+    db.add(rule)
+    db.commit()
+    return jsonify(alerts.rule_dict(rule)), 201
+
+@bp.route("/api/alerts/rules/<int:rule_id>", methods=["DELETE"])
+def delete_alert_rule(rule_id):
+    db = get_db()
+    deleted = db.query(AlertRule).filter(AlertRule.id == rule_id).delete()
+    db.commit()
+    if not deleted:
+        return jsonify({"error": "rule not found"}), 404
+    return "", 204
+
+@bp.route("/api/analytics/threat-distribution")
+def threat_distribution():
+    db = get_db()
+    rows = (
+        db.query(Incident.category, func.count(Incident.id))
+        .group_by(Incident.category)
+        .all()
+    )
+
+    return json_response([
+        {"label": c or "Unknown", "value": int(n)}
+        for c, n in rows
+    ])
+
+@bp.route("/api/analytics/trends")
+def threat_trends():
+    # most recent TREND_DAYS days (not the oldest rows in the table)
+    return json_response(recent_trends(get_db(), date.today()))
+
+@bp.route("/api/analytics/range")
+def analytics_range():
+    """
+    Day/week counts by category, source or priority over any window,
+    served from the columnar snapshot (never touches the OLTP table).
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD&interval=day|week&group_by=category|source|priority|sector
+    """
+    try:
+        query = analytics_store.parse_range(request.args)
+    except analytics_store.AnalyticsError as e:
+        return jsonify({"error": str(e)}), 400
+
+    store = analytics_store.load_store()
+    if store is None:
+        return jsonify({"error": "analytics store not built yet"}), 503
+
+    info = analytics_store.snapshot_info(store)
+    return json_response(
+        lambda: {**analytics_store.range_counts(store, **query), "snapshot": info},
+        cache_key=("range", info["max_id"], info["updated_at"], tuple(query.values())),
+    )
+
+# ---------------- REPORTS ----------------
+REPORT_OBJECT_MAX_AGE = 365 * 86400
+
+@bp.route("/api/reports")
+def list_reports():
+    """Prebuilt weekly/monthly reports (?period=week|month), newest first."""
+    try:
+        items = reports.listing(request.args.get("period") or None)
+    except reports.ReportError as e:
+        return jsonify({"error": str(e)}), 400
+    resp = json_response(
+        items, cache_key=("reports", reports.index_version(), request.args.get("period"))
+    )
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@bp.route("/api/reports/<key>")
+def get_report(key):
+    """Current report for a period key (?format=json|html); revalidated by ETag."""
+    entry = reports.lookup(key)
+    if entry is None:
+        return jsonify({"error": "report not found"}), 404
+    fmt = "html" if request.args.get("format") == "html" else "json"
+    path = reports.object_path(f"{entry[fmt]}.{fmt}")
+    if path is None:
+        return jsonify({"error": "report not found"}), 404
+    resp = send_from_directory(path.parent, path.name, etag=entry[fmt], max_age=0)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@bp.route("/api/reports/objects/<name>")
+def report_object(name):
+    """Content-addressed report file: its URL changes whenever its bytes do."""
+    path = reports.object_path(name)
+    if path is None:
+        return jsonify({"error": "report not found"}), 404
+    resp = send_from_directory(
+        path.parent, path.name, etag=path.stem, max_age=REPORT_OBJECT_MAX_AGE
+    )
+    resp.cache_control.immutable = True
+    return resp
 
 # ---------------- ML STATUS ----------------
-@app.route("/api/ml/status")
+@bp.route("/api/ml/status")
 def ml_status():
-    if DRIFT_STATE.exists():
-        state = json.loads(DRIFT_STATE.read_text())
-        return jsonify({
-            "status": "Active",
-            "drift_detected": state.get("drift_detected", False)
-        })
-    return jsonify({"status": "Not Trained", "drift_detected": False})
+    return json_response(current_ml_status())
 
 # ---------------- HIBP PASSWORD CHECK (FIXED) ----------------
-@app.route("/api/security/password-check", methods=["POST"])
+@bp.route("/api/security/password-check", methods=["POST"])
 def password_check():
     data = request.get_json(silent=True)
     if not data or "password" not in data:
@@ -170,6 +473,8 @@ def password_check():
     sha1 = hashlib.sha1(password.encode()).hexdigest().upper()
     prefix, suffix = sha1[:5], sha1[5:]
 
+    import requests  # only this route needs it; keeps app import light
+
     r = requests.get(
         f"https://api.pwnedpasswords.com/range/{prefix}",
         headers={"User-Agent": "CyberNow"}
@@ -182,6 +487,38 @@ def password_check():
 
     return jsonify({"pwned": False, "count": 0})
 
+# ---------------- APP FACTORY ----------------
+def create_app():
+    """
+    Build the Flask app. Does no DB DDL, so it is safe to call in every
+    gunicorn worker; backend/wsgi.py runs init_db() (which applies pending
+    schema upgrades) once in the master, and `flask init-db` does the same.
+    """
+    app = Flask(
+        __name__,
+        static_folder="static",
+        static_url_path="/static"
+    )
+    CORS(app)
+    app.register_blueprint(bp)
+
+    @app.teardown_appcontext
+    def remove_session(exc):
+        db_session.remove()
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        init_db()
+
+    return app
+
+
+app = create_app()
+
 # ---------------- RUN ----------------
+# Development server only. In production:
+#   gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
 if __name__ == "__main__":
+    init_db()
+    hot_window.rebuild()
     app.run(debug=True)
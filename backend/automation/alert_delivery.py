@@ -0,0 +1,164 @@
+# backend/automation/alert_delivery.py
+"""
+Webhook delivery for queued "alert" jobs (queued by backend/alerts.py).
+
+drain() claims up to CLAIM_LIMIT jobs and POSTs each webhook's alerts,
+packing whole jobs into requests of at most MAX_ALERTS_PER_JOB alerts:
+
+    {"sent_at": ..., "count": N, "alerts": [{"rule_id", "rule", "incident"}, ...]}
+
+A failed POST is retried in-call with exponential backoff; if it still
+fails, only the jobs in that request go back to the queue (job_queue.fail)
+and are retried on later drains until job_queue.MAX_ATTEMPTS. A 4xx
+rejection (other than 408/429) or a redirect marks them failed at once, and after a
+transient failure the webhook's remaining jobs are released untried for
+the next drain instead of each waiting out the backoff.
+
+The webhook URL is re-checked against alerts.check_webhook_url right
+before each POST (its DNS may have changed since the rule was saved), and
+redirects are not followed, so a receiver can't bounce the batch onto an
+internal address.
+
+Runs inside run_pipeline.py; for cron setups:
+    python -m backend.automation.alert_delivery [--loop]
+"""
+
+import argparse
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import requests
+
+from backend.automation import job_queue
+from backend.alerts import ALERT_JOB, MAX_ALERTS_PER_JOB, AlertRuleError, check_webhook_url
+from backend.database import init_db
+from backend import metrics
+
+CLAIM_LIMIT = 50
+REQUEST_TIMEOUT = 10
+RETRIES = 3
+BACKOFF_SECONDS = 1.0
+POLL_SECONDS = 5
+
+DELIVERED = metrics.counter(
+    "cybernow_alerts_delivered_total", "Alerts delivered to webhooks, by outcome"
+)
+
+
+class AlertDeliveryError(Exception):
+    """Webhook did not accept the batch (`permanent`: retrying won't help)."""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def deliver(webhook_url, alerts, session=None):
+    """POST one batch; raises AlertDeliveryError once retries are exhausted."""
+    session = session or requests
+    try:
+        check_webhook_url(webhook_url)
+    except AlertRuleError as e:
+        raise AlertDeliveryError(str(e), permanent=True)
+    body = {
+        "sent_at": datetime.now(timezone.utc).isoformat(),
+        "count": len(alerts),
+        "alerts": alerts,
+    }
+    error = None
+    permanent = False
+    for attempt in range(RETRIES):
+        try:
+            resp = session.post(webhook_url, json=body, timeout=REQUEST_TIMEOUT,
+                                allow_redirects=False)
+            if resp.status_code < 300:
+                return
+            error = f"HTTP {resp.status_code}"
+            # rejected (or redirected, which we don't follow); retrying won't help
+            if 300 <= resp.status_code < 500 and resp.status_code not in (408, 429):
+                permanent = True
+                break
+        except requests.RequestException as e:
+            error = str(e)
+        if attempt + 1 < RETRIES:
+            time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+    raise AlertDeliveryError(f"{webhook_url}: {error}", permanent=permanent)
+
+
+def _requests(jobs):
+    """Pack consecutive jobs into (job ids, alerts) of <= MAX_ALERTS_PER_JOB alerts."""
+    packed = []
+    job_ids, alerts = [], []
+    for job_id, job_alerts in jobs:
+        if job_ids and len(alerts) + len(job_alerts) > MAX_ALERTS_PER_JOB:
+            packed.append((job_ids, alerts))
+            job_ids, alerts = [], []
+        job_ids.append(job_id)
+        alerts.extend(job_alerts)
+    if job_ids:
+        packed.append((job_ids, alerts))
+    return packed
+
+
+def drain(session=None, limit=CLAIM_LIMIT):
+    """Deliver the pending alert jobs. Returns (jobs claimed, alerts delivered)."""
+    jobs = job_queue.claim(ALERT_JOB, limit=limit)
+    if not jobs:
+        return 0, 0
+
+    by_webhook = defaultdict(list)   # webhook → [(job id, alerts)]
+    for job in jobs:
+        payload = job["payload"] or {}
+        by_webhook[payload.get("webhook_url")].append(
+            (job["id"], payload.get("alerts") or [])
+        )
+
+    delivered = 0
+    for webhook_url, webhook_jobs in by_webhook.items():
+        packed = _requests(webhook_jobs)
+        for n, (job_ids, alerts) in enumerate(packed):
+            try:
+                with metrics.span("alerts.deliver", alerts=len(alerts)):
+                    if not webhook_url:
+                        raise AlertDeliveryError("job has no webhook_url", permanent=True)
+                    deliver(webhook_url, alerts, session)
+            except Exception as e:
+                permanent = getattr(e, "permanent", False)
+                DELIVERED.inc(len(alerts), outcome="failed")
+                print("❌ Alert delivery failed:", e)
+                for job_id in job_ids:
+                    job_queue.fail(job_id, e, retry=not permanent)
+                if not permanent:
+                    # receiver unreachable / erroring: leave the rest for the next drain
+                    for later_ids, _ in packed[n + 1:]:
+                        for job_id in later_ids:
+                            job_queue.release(job_id)
+                    break
+                continue
+            DELIVERED.inc(len(alerts), outcome="sent")
+            delivered += len(alerts)
+            for job_id in job_ids:
+                job_queue.complete(job_id)
+    return len(jobs), delivered
+
+
+def run_loop(poll_seconds=POLL_SECONDS):
+    session = requests.Session()
+    while True:
+        claimed, _ = drain(session)
+        if not claimed:
+            time.sleep(poll_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver queued alert webhooks")
+    parser.add_argument("--loop", action="store_true", help="keep polling the queue")
+    args = parser.parse_args()
+
+    init_db()
+    if args.loop:
+        run_loop()
+    else:
+        claimed, delivered = drain(requests.Session())
+        print(f"Alerts: {delivered} delivered from {claimed} jobs")
@@ -0,0 +1,290 @@
+# backend/automation/backup.py
+"""
+Online SQLite backups (safe while the collector and API are running).
+
+snapshot():
+- copies the live DB with SQLite's online backup API, PAGES_PER_STEP
+  pages at a time with a STEP_PAUSE_SECONDS sleep between steps, so
+  readers and writers keep getting the file. A read transaction held on
+  the source for the whole copy pins one consistent snapshot (WAL lets
+  writers carry on); without it every concurrent commit would restart
+  the copy. method="vacuum" uses VACUUM INTO instead (one pass, compacted
+  output, not throttled).
+- runs PRAGMA integrity_check on the copy, then gzips it to
+  BACKUP_DIR/cybernow-<UTC time>.db.gz with a .json sidecar (sha256,
+  sizes, timings)
+- keeps the newest KEEP_SNAPSHOTS snapshots
+
+restore() streams a snapshot back (checksum + integrity verified) to
+bootstrap a new node or replace a damaged DB.
+
+Run as:
+    python -m backend.automation.backup [--vacuum] [--loop --interval S]
+    python -m backend.automation.backup --list
+    python -m backend.automation.backup --restore [SNAPSHOT] [--target PATH] [--force]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from backend.database import engine
+from backend import metrics
+
+BACKUP_DIR = Path(os.environ.get(
+    "CYBERNOW_BACKUP_DIR", Path(__file__).resolve().parents[1] / "backups"
+))
+KEEP_SNAPSHOTS = int(os.environ.get("CYBERNOW_BACKUP_KEEP", "14"))
+INTERVAL_SECONDS = 6 * 3600
+
+PAGES_PER_STEP = 256            # 1 MiB per step with 4 KiB pages
+STEP_PAUSE_SECONDS = 0.005
+COMPRESS_LEVEL = 6
+CHUNK_BYTES = 1 << 20
+
+PREFIX = "cybernow-"
+SUFFIX = ".db.gz"
+
+BACKUPS = metrics.counter("cybernow_backups_total", "Backup runs, by outcome")
+LAST_BACKUP = metrics.gauge(
+    "cybernow_backup_last_success_timestamp", "Unix time of the last good snapshot"
+)
+
+
+class BackupError(Exception):
+    """Snapshot or restore failed verification."""
+
+
+# ================== HELPERS ==================
+def database_path():
+    if engine.dialect.name != "sqlite" or not engine.url.database:
+        raise BackupError("backups need a file-backed SQLite database")
+    return Path(engine.url.database).resolve()
+
+
+def _integrity(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    if result != ["ok"]:
+        raise BackupError(f"integrity_check failed for {path}: {result[:5]}")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_online(src_path, dst_path, pages, pause):
+    src = sqlite3.connect(str(src_path), isolation_level=None, timeout=30)
+    dst = sqlite3.connect(str(dst_path))
+    try:
+        # pin one snapshot: concurrent commits then can't restart the copy
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        def throttle(status, remaining, total):
+            if remaining and pause:
+                time.sleep(pause)
+
+        src.backup(dst, pages=pages, progress=throttle)
+        src.execute("COMMIT")
+        # the copy inherits WAL mode; make it a single self-contained file
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+        src.close()
+
+
+def _copy_vacuum(src_path, dst_path):
+    src = sqlite3.connect(str(src_path), timeout=30)
+    try:
+        src.execute("VACUUM INTO ?", (str(dst_path),))
+    finally:
+        src.close()
+
+
+def list_snapshots(backup_dir=None):
+    """Snapshot files, newest first."""
+    backup_dir = Path(backup_dir or BACKUP_DIR)
+    if not backup_dir.exists():
+        return []
+    return sorted(backup_dir.glob(f"{PREFIX}*{SUFFIX}"), reverse=True)
+
+
+def _sidecar(snapshot):
+    return snapshot.with_name(snapshot.name[: -len(SUFFIX)] + ".json")
+
+
+def rotate(keep=KEEP_SNAPSHOTS, backup_dir=None):
+    removed = []
+    for old in list_snapshots(backup_dir)[keep:]:
+        old.unlink(missing_ok=True)
+        _sidecar(old).unlink(missing_ok=True)
+        removed.append(old.name)
+    return removed
+
+
+# ================== SNAPSHOT ==================
+@metrics.timed("backup.snapshot")
+def snapshot(method="backup", backup_dir=None, pages=PAGES_PER_STEP,
+             pause=STEP_PAUSE_SECONDS, keep=KEEP_SNAPSHOTS):
+    """Take, verify, compress and rotate one snapshot. Returns its metadata."""
+    src_path = database_path()
+    backup_dir = Path(backup_dir or BACKUP_DIR)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    raw = backup_dir / f".{PREFIX}{stamp}.db.tmp"
+    target = backup_dir / f"{PREFIX}{stamp}{SUFFIX}"
+    partial = target.with_name(target.name + ".tmp")
+
+    try:
+        t0 = time.perf_counter()
+        raw.unlink(missing_ok=True)
+        if method == "vacuum":
+            _copy_vacuum(src_path, raw)
+        else:
+            _copy_online(src_path, raw, pages, pause)
+        copy_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        _integrity(raw)
+        check_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with open(raw, "rb") as fin, gzip.open(partial, "wb", compresslevel=COMPRESS_LEVEL) as fout:
+            shutil.copyfileobj(fin, fout, CHUNK_BYTES)
+        os.replace(partial, target)
+        compress_s = time.perf_counter() - t0
+
+        meta = {
+            "snapshot": target.name,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "method": method,
+            "source": str(src_path),
+            "db_bytes": raw.stat().st_size,
+            "gz_bytes": target.stat().st_size,
+            "sha256": _sha256(raw),
+            "integrity": "ok",
+            "copy_s": round(copy_s, 3),
+            "check_s": round(check_s, 3),
+            "compress_s": round(compress_s, 3),
+        }
+        _sidecar(target).write_text(json.dumps(meta, indent=2))
+    except Exception:
+        BACKUPS.inc(outcome="failed")
+        partial.unlink(missing_ok=True)
+        target.unlink(missing_ok=True)
+        raise
+    finally:
+        raw.unlink(missing_ok=True)
+
+    meta["rotated"] = rotate(keep, backup_dir)
+    BACKUPS.inc(outcome="ok")
+    LAST_BACKUP.set(time.time())
+    return meta
+
+
+def last_snapshot_age(backup_dir=None):
+    """Seconds since the newest snapshot was written (None if there is none)."""
+    snapshots = list_snapshots(backup_dir)
+    if not snapshots:
+        return None
+    return time.time() - snapshots[0].stat().st_mtime
+
+
+# ================== RESTORE ==================
+def restore(snapshot_path=None, target=None, force=False, backup_dir=None):
+    """
+    Decompress a snapshot (default: the newest) to `target` (default: the
+    configured DB path). Refuses to replace an existing DB unless force=True;
+    stop the app and collectors before forcing over a live database.
+    """
+    if snapshot_path is None:
+        snapshots = list_snapshots(backup_dir)
+        if not snapshots:
+            raise BackupError("no snapshots found")
+        snapshot_path = snapshots[0]
+    snapshot_path = Path(snapshot_path)
+    if not snapshot_path.exists():
+        snapshot_path = Path(backup_dir or BACKUP_DIR) / snapshot_path.name
+    target = Path(target) if target else database_path()
+
+    if target.exists() and not force:
+        raise BackupError(f"{target} exists (use force to replace it)")
+
+    partial = target.with_name(target.name + ".restore")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with gzip.open(snapshot_path, "rb") as fin, open(partial, "wb") as fout:
+            shutil.copyfileobj(fin, fout, CHUNK_BYTES)
+
+        sidecar = _sidecar(snapshot_path)
+        if sidecar.exists():
+            expected = json.loads(sidecar.read_text()).get("sha256")
+            if expected and _sha256(partial) != expected:
+                raise BackupError(f"checksum mismatch for {snapshot_path.name}")
+        _integrity(partial)
+
+        # a stale WAL would be replayed over the restored pages
+        for suffix in ("-wal", "-shm"):
+            Path(f"{target}{suffix}").unlink(missing_ok=True)
+        os.replace(partial, target)
+    finally:
+        partial.unlink(missing_ok=True)
+    return target
+
+
+# ================== MAIN ==================
+def run_backup(method="backup"):
+    try:
+        meta = snapshot(method)
+        print(f"💾 Snapshot {meta['snapshot']}: {meta['db_bytes'] / 1e6:.1f} MB → "
+              f"{meta['gz_bytes'] / 1e6:.1f} MB gz (copy {meta['copy_s']}s, "
+              f"check {meta['check_s']}s, gzip {meta['compress_s']}s)")
+        return meta
+    except Exception as e:
+        print("❌ Backup failed:", e)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Online backups of the CyberNow DB")
+    parser.add_argument("--vacuum", action="store_true", help="use VACUUM INTO")
+    parser.add_argument("--loop", action="store_true", help="snapshot every --interval s")
+    parser.add_argument("--interval", type=int, default=INTERVAL_SECONDS)
+    parser.add_argument("--list", action="store_true", help="list snapshots")
+    parser.add_argument("--restore", nargs="?", const="", metavar="SNAPSHOT",
+                        help="restore SNAPSHOT (default: newest)")
+    parser.add_argument("--target", help="restore to this path instead of the live DB")
+    parser.add_argument("--force", action="store_true", help="replace an existing DB")
+    args = parser.parse_args()
+    method = "vacuum" if args.vacuum else "backup"
+
+    if args.list:
+        for snap in list_snapshots():
+            print(f"{snap.name}  {snap.stat().st_size / 1e6:.1f} MB")
+    elif args.restore is not None:
+        try:
+            path = restore(args.restore or None, args.target, force=args.force)
+        except BackupError as e:
+            raise SystemExit(f"❌ Restore failed: {e}")
+        print(f"✅ Restored to {path}")
+    elif args.loop:
+        while True:
+            run_backup(method)
+            time.sleep(args.interval)
+    else:
+        run_backup(method)
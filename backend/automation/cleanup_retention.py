@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from backend.database import init_db, SessionLocal
-from backend.models import Incident
+from backend.models import Incident, IncidentEntity
+from backend import text_store
 
 LOW_RETENTION = 60   # days
 HIGH_RETENTION = 120  # days
@@ -34,6 +35,12 @@ def cleanup_old_incidents():
         .delete(synchronize_session=False)
     )
 
+    if low_deleted + high_deleted:
+        db.query(IncidentEntity).filter(
+            IncidentEntity.incident_id.notin_(db.query(Incident.id))
+        ).delete(synchronize_session=False)
+        text_store.purge_orphans(db)
+
     db.commit()
     db.close()
 
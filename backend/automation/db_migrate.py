@@ -1,20 +1,227 @@
+# backend/automation/db_migrate.py
+"""
+In-place schema upgrades for databases created by earlier releases.
+
+upgrade() is called by init_db(), so every entry point (collector, score
+job, pipeline, API master) brings the DB up to date before touching it;
+on a current schema it costs one PRAGMA. Pending steps run inside one
+BEGIN IMMEDIATE transaction, so concurrent workers wait for the first
+one instead of racing the same ALTERs:
+
+- NEW_COLUMNS / NEW_INDEXES added to incidents since the first release
+- inline summary/description moved to incident_texts (move_texts)
+- incidents rebuilt with AUTOINCREMENT (rebuild_incidents), so SQLite
+  never reissues the ids of deleted rows; everything that tracks
+  "id > last seen id" relies on that
+
+Run by hand (prints what it checked) as:
+    python -m backend.automation.db_migrate
+"""
+
+import os
+
 from sqlalchemy import text
-from backend.database import engine
+from backend.database import engine, init_db
+from backend.models import Incident
+from backend import text_store
+
+# columns added to incidents after the first release
+NEW_COLUMNS = {
+    "threat_score": "FLOAT DEFAULT 0.0",
+    "model_version": "VARCHAR(128)",
+    "confidence": "FLOAT",
+    "score_key": "VARCHAR(32)",
+    "text_hash": "INTEGER",
+}
+
+# indexes declared on the model after the table already existed
+NEW_INDEXES = {
+    "ix_incidents_threat_score": "incidents (threat_score)",
+    "ix_incidents_text_hash": "incidents (text_hash)",
+}
+
+# inline text columns moved to incident_texts (see backend/text_store.py)
+MOVED_TEXT_COLUMNS = ("summary", "description")
+MOVE_BATCH = 5000
+
+
+def _columns(conn):
+    return [r[1] for r in conn.execute(text("PRAGMA table_info(incidents)"))]
+
+
+def _autoincrement(conn):
+    sql = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'incidents'"
+    )).scalar()
+    return "AUTOINCREMENT" in (sql or "").upper()
+
+
+def pending(conn):
+    """Names of the steps upgrade() would apply (empty when up to date)."""
+    columns = _columns(conn)
+    steps = [f"column {name}" for name in NEW_COLUMNS if name not in columns]
+    steps += [f"move {name}" for name in MOVED_TEXT_COLUMNS if name in columns]
+    indexes = {r[0] for r in conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'incidents'")
+    )}
+    steps += [f"index {name}" for name in NEW_INDEXES if name not in indexes]
+    if not _autoincrement(conn):
+        steps.append("rebuild incidents with AUTOINCREMENT")
+    return steps
+
+
+def move_texts(conn):
+    """
+    Copy summary (or description) bodies into incident_texts and drop the
+    inline columns (caller commits, then VACUUMs). Returns True if it did.
+    """
+    present = [c for c in MOVED_TEXT_COLUMNS if c in _columns(conn)]
+    if not present:
+        return False
+
+    body = "COALESCE(" + ", ".join(present + ["NULL"]) + ")"
+    moved = last_id = 0
+    while True:
+        rows = conn.execute(text(
+            f"SELECT id, {body} FROM incidents "
+            "WHERE id > :last AND text_hash IS NULL ORDER BY id LIMIT :n"
+        ), {"last": last_id, "n": MOVE_BATCH}).all()
+        if not rows:
+            break
+        hashes = text_store.store(conn, [t for _, t in rows])
+        updates = [{"h": h, "id": i} for (i, _), h in zip(rows, hashes) if h]
+        if updates:
+            conn.execute(text("UPDATE incidents SET text_hash = :h WHERE id = :id"), updates)
+        moved += len(rows)
+        last_id = rows[-1][0]
+    print(f"➡ Moved {moved} incident texts to incident_texts")
+
+    for name in present:
+        conn.execute(text(f"ALTER TABLE incidents DROP COLUMN {name}"))
+        print(f"➖ Dropped {name} column")
+    return True
+
+
+def rebuild_incidents(conn):
+    """
+    Recreate incidents from the model (AUTOINCREMENT, unique (source,
+    external_id), model indexes) and copy the rows over, ids unchanged.
+    Legacy columns the model no longer has are dropped; of duplicate
+    (source, external_id) rows only the lowest id is kept. Returns True
+    if it rebuilt.
+    """
+    if _autoincrement(conn):
+        return False
+    old_columns = set(_columns(conn))
+    indexes = [r[0] for r in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'index' "
+        "AND tbl_name = 'incidents' AND sql IS NOT NULL"
+    ))]
+    for name in indexes:   # names are reused by the new table
+        conn.execute(text(f"DROP INDEX {name}"))
+    conn.execute(text("ALTER TABLE incidents RENAME TO incidents_old"))
+    Incident.__table__.create(conn)
+
+    columns = ", ".join(c.name for c in Incident.__table__.columns if c.name in old_columns)
+    before = conn.execute(text("SELECT COUNT(*) FROM incidents_old")).scalar()
+    conn.execute(text(
+        f"INSERT OR IGNORE INTO incidents ({columns}) "
+        f"SELECT {columns} FROM incidents_old ORDER BY id"
+    ))
+    after = conn.execute(text("SELECT COUNT(*) FROM incidents")).scalar()
+    conn.execute(text("DROP TABLE incidents_old"))
+    if after != before:
+        conn.execute(text(
+            "DELETE FROM incident_entities WHERE incident_id NOT IN (SELECT id FROM incidents)"
+        ))
+
+    dropped = sorted(old_columns - {c.name for c in Incident.__table__.columns})
+    print(f"🔁 Rebuilt incidents with AUTOINCREMENT: {after} rows"
+          + (f", {before - after} duplicates skipped" if before != after else "")
+          + (f", dropped {', '.join(dropped)}" if dropped else ""))
+    return True
+
+
+def reserve_ids(conn, upto):
+    """
+    Make new incidents get ids above `upto`, the last id a derived store
+    (analytics store, vector index, training fingerprint) has seen. Ids
+    handed out before the AUTOINCREMENT rebuild can exceed the table's
+    current max; once the sequence has passed them this only reads.
+    """
+    if engine.dialect.name != "sqlite" or not upto:
+        return
+    seq = conn.execute(
+        text("SELECT seq FROM sqlite_sequence WHERE name = 'incidents'")
+    ).scalar()
+    if seq is not None and seq >= upto:
+        return
+    if seq is None:
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('incidents', :n)"),
+                     {"n": int(upto)})
+    else:
+        conn.execute(text("UPDATE sqlite_sequence SET seq = :n WHERE name = 'incidents' AND seq < :n"),
+                     {"n": int(upto)})
+    conn.commit()
+    print(f"🔢 Incident ids reserved up to {upto}")
+
+
+def _vacuum():
+    """Give the pages freed by move_texts / rebuild_incidents back to the OS (best effort)."""
+    path = engine.url.database
+    before = os.path.getsize(path) if path and os.path.exists(path) else None
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    except Exception as e:
+        print("⚠️ VACUUM skipped (run it when the DB is idle):", e)
+        return
+    if before is not None:
+        print(f"🧹 VACUUM: {before / 1e6:.1f} MB → {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+def upgrade():
+    """Apply pending steps (tables must exist: init_db() calls this after create_all)."""
+    if engine.dialect.name != "sqlite":
+        return []
+    with engine.connect() as conn:
+        if not pending(conn):
+            return []
+
+    vacuum = False
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # takes the write lock; a worker that waited here sees the steps done
+        conn.execute(text("BEGIN IMMEDIATE"))
+        try:
+            steps = pending(conn)
+            columns = _columns(conn)
+            for name, ddl in NEW_COLUMNS.items():
+                if name not in columns:
+                    print(f"➕ Adding {name} column")
+                    conn.execute(text(f"ALTER TABLE incidents ADD COLUMN {name} {ddl}"))
+            for name, target in NEW_INDEXES.items():
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
+            vacuum = move_texts(conn)
+            vacuum = rebuild_incidents(conn) or vacuum
+            conn.execute(text("COMMIT"))
+        except Exception:
+            conn.execute(text("ROLLBACK"))
+            raise
+
+    if vacuum:
+        _vacuum()
+    if steps:
+        print(f"🛠 Schema upgraded: {', '.join(steps)}")
+    return steps
 
 
 def migrate():
+    init_db()   # creates new tables, then upgrade()
     with engine.connect() as conn:
-        res = conn.execute(text("PRAGMA table_info(incidents)"))
-        columns = [r[1] for r in res.fetchall()]
-
-        if "threat_score" not in columns:
-            print("➕ Adding threat_score column")
-            conn.execute(
-                text("ALTER TABLE incidents ADD COLUMN threat_score FLOAT DEFAULT 0.0")
-            )
-            conn.commit()
-        else:
-            print("✅ threat_score already exists")
+        left = pending(conn) if engine.dialect.name == "sqlite" else []
+    print("✅ Schema up to date" if not left else f"❌ Still pending: {', '.join(left)}")
+    return not left
+
 
 if __name__ == "__main__":
-    migrate()
+    raise SystemExit(0 if migrate() else 1)
@@ -0,0 +1,221 @@
+# backend/automation/job_queue.py
+"""
+Durable SQLite-backed job queue connecting the pipeline stages.
+
+Jobs live in the pipeline_jobs table, so work handed from the collector
+to the classifier or trainer survives a restart.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from backend.database import SessionLocal
+from backend.models import PipelineJob
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 3
+DONE_RETENTION = timedelta(days=1)
+
+
+def _as_dict(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "payload": json.loads(job.payload) if job.payload else None,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+    }
+
+
+def enqueue(kind: str, payload=None, unique: bool = False):
+    """
+    Add a job. With unique=True nothing is added when a job of the same
+    kind is already pending or running. Returns the job id or None.
+    """
+    db = SessionLocal()
+    try:
+        if unique:
+            busy = (
+                db.query(PipelineJob.id)
+                .filter(
+                    PipelineJob.kind == kind,
+                    PipelineJob.status.in_([PENDING, RUNNING]),
+                )
+                .first()
+            )
+            if busy:
+                return None
+
+        job = PipelineJob(
+            kind=kind,
+            payload=json.dumps(payload) if payload is not None else None,
+            status=PENDING,
+            attempts=0,
+            created_at=datetime.utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+
+def enqueue_many(kind: str, payloads):
+    """Add one job per payload in a single transaction. Returns the count."""
+    if not payloads:
+        return 0
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.add_all(
+            PipelineJob(kind=kind, payload=json.dumps(p), status=PENDING,
+                        attempts=0, created_at=now)
+            for p in payloads
+        )
+        db.commit()
+        return len(payloads)
+    finally:
+        db.close()
+
+
+def claim(kind: str, limit: int = 1):
+    """Atomically move up to `limit` pending jobs to running and return them."""
+    db = SessionLocal()
+    try:
+        ids = [
+            r[0]
+            for r in db.query(PipelineJob.id)
+            .filter(PipelineJob.kind == kind, PipelineJob.status == PENDING)
+            .order_by(PipelineJob.id)
+            .limit(limit)
+            .all()
+        ]
+
+        now = datetime.utcnow()
+        claimed = []
+        for job_id in ids:
+            # the status guard makes the claim safe against other workers
+            updated = (
+                db.query(PipelineJob)
+                .filter(PipelineJob.id == job_id, PipelineJob.status == PENDING)
+                .update(
+                    {
+                        PipelineJob.status: RUNNING,
+                        PipelineJob.started_at: now,
+                        PipelineJob.attempts: PipelineJob.attempts + 1,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            if updated:
+                claimed.append(job_id)
+        db.commit()
+
+        if not claimed:
+            return []
+        jobs = (
+            db.query(PipelineJob)
+            .filter(PipelineJob.id.in_(claimed))
+            .order_by(PipelineJob.id)
+            .all()
+        )
+        return [_as_dict(j) for j in jobs]
+    finally:
+        db.close()
+
+
+def complete(job_id: int):
+    db = SessionLocal()
+    try:
+        db.query(PipelineJob).filter(PipelineJob.id == job_id).update(
+            {PipelineJob.status: DONE, PipelineJob.finished_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def fail(job_id: int, error: str, retry: bool = True):
+    """Record a failure; the job is retried until MAX_ATTEMPTS (never if not `retry`)."""
+    db = SessionLocal()
+    try:
+        job = db.get(PipelineJob, job_id)
+        if job is None:
+            return
+        job.error = str(error)[:2000]
+        job.finished_at = datetime.utcnow()
+        job.status = PENDING if retry and (job.attempts or 0) < MAX_ATTEMPTS else FAILED
+        db.commit()
+    finally:
+        db.close()
+
+
+def release(job_id: int):
+    """Put a claimed job back untried; the claim doesn't count as an attempt."""
+    db = SessionLocal()
+    try:
+        db.query(PipelineJob).filter(
+            PipelineJob.id == job_id, PipelineJob.status == RUNNING
+        ).update(
+            {PipelineJob.status: PENDING, PipelineJob.attempts: PipelineJob.attempts - 1},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def requeue_running():
+    """Put jobs left running by a crashed process back in the queue."""
+    db = SessionLocal()
+    try:
+        n = (
+            db.query(PipelineJob)
+            .filter(PipelineJob.status == RUNNING)
+            .update({PipelineJob.status: PENDING}, synchronize_session=False)
+        )
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+def purge_done():
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - DONE_RETENTION
+        n = (
+            db.query(PipelineJob)
+            .filter(PipelineJob.status == DONE, PipelineJob.finished_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+def queue_depth():
+    """{kind: {status: count}} for pending/running/failed jobs."""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(PipelineJob.kind, PipelineJob.status, func.count(PipelineJob.id))
+            .filter(PipelineJob.status != DONE)
+            .group_by(PipelineJob.kind, PipelineJob.status)
+            .all()
+        )
+        depth = {}
+        for kind, status, n in rows:
+            depth.setdefault(kind, {})[status] = int(n)
+        return depth
+    finally:
+        db.close()
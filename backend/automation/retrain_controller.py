@@ -1,17 +1,44 @@
 # backend/automation/retrain_controller.py
+"""
+Decides whether to retrain: "full", "delta" or "skip", and logs why.
+
+The training-set fingerprint (backend/ml/fingerprint.py) written by the
+last run is compared with the current labelled data:
+- unchanged data → skip, whatever the model age says
+- a few appended rows → skip until MIN_NEW_ROWS have accumulated
+- appended rows only (up to DELTA_MAX_FRACTION of the set) → delta
+- edited labels/text above EDITED_MAX_FRACTION, new labels, many
+  appended rows, or a model older than RETRAIN_DAYS with new data → full
+
+drift_state.json's drift flag is not a trigger: run_train computes it
+against the model it has just fitted, so it says nothing about whether
+the data moved, and acting on it retrained every cycle.
+"""
 
 from datetime import datetime, timedelta
 import subprocess
-import json
 import sys
 from pathlib import Path
 
+from backend.database import SessionLocal
+from backend.ml import fingerprint
+from backend import metrics
+
 ML_DIR = Path(__file__).resolve().parent.parent / "ml"
 DRIFT_STATE = ML_DIR / "drift_state.json"
 
 RETRAIN_DAYS = 7
 LAST_TRAIN_FILE = ML_DIR / "last_trained.txt"
 
+MIN_NEW_ROWS = 50
+DELTA_MAX_FRACTION = 0.2
+EDITED_MAX_FRACTION = 0.02
+REMOVED_MAX_FRACTION = 0.5
+
+DECISIONS = metrics.counter(
+    "cybernow_retrain_decisions_total", "Retrain controller decisions, by mode"
+)
+
 
 def last_trained_time():
     if not LAST_TRAIN_FILE.exists():
@@ -24,45 +51,73 @@ def last_trained_time():
         return None
 
 
-def should_retrain():
-    now = datetime.utcnow()
-
-    # 1️⃣ No previous training record
-    last = last_trained_time()
-    if not last:
-        print("No previous training record → retrain required.")
-        return True
-
-    # 2️⃣ Time-based retraining
-    if now - last > timedelta(days=RETRAIN_DAYS):
-        print(f"Model older than {RETRAIN_DAYS} days → retrain.")
-        return True
-
-    # 3️⃣ Drift-based retraining (optional)
-    if DRIFT_STATE.exists():
-        try:
-            st = json.loads(DRIFT_STATE.read_text(encoding="utf-8"))
-            if st.get("drift_detected"):
-                print("drift_state.json indicates drift → retrain.")
-                return True
-        except Exception as e:
-            print("Warning: failed reading drift_state.json:", e)
+def decide(diff, last, now=None):
+    """(mode, reason) from the fingerprint diff and the last-training facts."""
+    now = now or datetime.utcnow()
+    old_rows = max(diff["old_rows"], 1)
+    appended, edited, removed = diff["appended"], diff["edited"], diff["removed"]
+    changed = appended or edited or removed
+    age = now - last
+
+    if not changed:
+        return "skip", f"training data unchanged since last run ({diff['rows']} rows, model age {age.days}d)"
+    if diff["new_labels"]:
+        return "full", f"new labels {diff['new_labels']}"
+    if edited / old_rows > EDITED_MAX_FRACTION:
+        return "full", (f"~{edited} rows relabelled/edited in "
+                        f"{len(diff['changed_partitions'])} partitions")
+    if removed / old_rows > REMOVED_MAX_FRACTION:
+        return "full", f"{removed} of {diff['old_rows']} training rows removed"
+    if age > timedelta(days=RETRAIN_DAYS):
+        return "full", f"model older than {RETRAIN_DAYS} days and data changed (+{appended} rows)"
+    if appended / old_rows > DELTA_MAX_FRACTION:
+        return "full", f"+{appended} rows ({appended / old_rows:.0%} of the set)"
+    if appended < MIN_NEW_ROWS:
+        return "skip", f"only {appended} new rows (< {MIN_NEW_ROWS}); edited {edited}, removed {removed}"
+    return "delta", f"+{appended} appended rows ({appended / old_rows:.1%}), no significant edits"
+
+
+def retrain_plan():
+    """("full" | "delta" | "skip", reason)."""
+    old_fp = fingerprint.load()
+    if old_fp is None or not last_trained_time():
+        return "full", "no record of the last training set"
+    if not fingerprint.is_current(old_fp):
+        return "full", "last fingerprint predates monotonic incident ids"
+
+    db = SessionLocal()
+    try:
+        current = fingerprint.from_db(db, boundary=old_fp["max_id"])
+    finally:
+        db.close()
+    diff = fingerprint.compare(old_fp, current)
 
-    print("No retrain necessary.")
-    return False
+    if current["rows"] < 5:
+        return "skip", f"only {current['rows']} labelled rows (need >=5)"
+    return decide(diff, last_trained_time())
 
 
-def run_training_process():
-    print("Running training process...")
+def should_retrain():
+    """Log and return the retrain mode ("full" | "delta" | "skip")."""
+    mode, reason = retrain_plan()
+    DECISIONS.inc(mode=mode)
+    print(f"Retrain decision: {mode} — {reason}")
+    return mode
+
+
+def run_training_process(mode="full"):
+    print(f"Running {mode} training process...")
+    cmd = [sys.executable, "-m", "backend.ml.train"]
+    if mode == "delta":
+        cmd.append("--delta")
     try:
-        subprocess.run(
-            [sys.executable, "-m", "backend.ml.train"],
-            check=True,
-        )
-        LAST_TRAIN_FILE.write_text(
-            datetime.utcnow().isoformat(),
-            encoding="utf-8",
-        )
+        subprocess.run(cmd, check=True)
+        # a delta doesn't refresh the vectorizer/forests, so it doesn't reset the age
+        if mode == "full":
+            LAST_TRAIN_FILE.write_text(
+                datetime.utcnow().isoformat(),
+                encoding="utf-8",
+            )
         return True
     except subprocess.CalledProcessError as e:
         print("Training subprocess failed:", e)
@@ -73,14 +128,16 @@ def run_retraining():
     Entry point for pipeline.
     Decides whether retraining is needed and runs it if required.
     """
-    if should_retrain():
-        return run_training_process()
-    return False
+    mode = should_retrain()
+    if mode == "skip":
+        return False
+    return run_training_process(mode)
 
 
 if __name__ == "__main__":
-    if should_retrain():
-        ok = run_training_process()
+    mode = should_retrain()
+    if mode != "skip":
+        ok = run_training_process(mode)
         print("Retrain success ✅" if ok else "Retrain failed ❌")
     else:
         print("Skipping retrain.")
@@ -1,44 +1,122 @@
 # backend/automation/update_scores.py
+"""
+Incremental threat-score job.
+
+Reads only the score inputs (priority, anomaly_score, source, timestamp,
+score_key) in id-ordered batches, recomputes scores with numpy
+(backend/scoring.py) and writes back just the rows whose score_key
+changed, in one executemany UPDATE per batch.
+
+Rows already in the final recency bucket only change when they are
+reclassified, and reclassification scores them itself, so they are
+skipped unless --full is given.
+
+Run as: python -m backend.automation.update_scores [--full]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, or_, select, update
 
 from backend.database import init_db, SessionLocal
 from backend.models import Incident
-from sqlalchemy.orm import Session
-
-# Simple priority-based threat normalization
-PRIORITY_MAP = {
-    "CRITICAL": 100.0,
-    "HIGH": 80.0,
-    "MEDIUM": 50.0,
-    "MED": 50.0,
-    "LOW": 10.0,
-    None: 0.0,
-}
+from backend import metrics, scoring
+
+BATCH_SIZE = 5000
+
+SCORES_UPDATED = metrics.counter(
+    "cybernow_threat_scores_updated_total", "Incidents whose threat score was rewritten"
+)
+
+_incidents = Incident.__table__
+_UPDATE = (
+    update(_incidents)
+    .where(_incidents.c.id == bindparam("b_id"))
+    .values(threat_score=bindparam("b_score"), score_key=bindparam("b_key"))
+)
+
 
 def compute_threat_score(priority: str) -> float:
+    """Priority component only (kept for callers of the old API)."""
     if not priority:
         return 0.0
-    return PRIORITY_MAP.get(priority.upper(), 0.0)
+    return scoring.PRIORITY_MAP.get(priority.upper(), 0.0)
 
-def run_update():
-    init_db()
-    db: Session = SessionLocal()
-    try:
-        rows = db.query(Incident).all()
 
-        # NOTE:
-        # Incident does NOT store threat_score in DB.
-        # We only compute it here for logging / future extension.
-        for inc in rows:
-            _ = compute_threat_score(inc.priority)
+def _candidates(full):
+    stmt = select(
+        Incident.id, Incident.priority, Incident.anomaly_score,
+        Incident.source, Incident.timestamp, Incident.score_key,
+    )
+    if not full:
+        stmt = stmt.where(or_(
+            Incident.score_key.is_(None),
+            ~Incident.score_key.startswith(f"{scoring.FINAL_BUCKET}:"),
+        ))
+    return stmt
 
-        print(f"Threat scores evaluated for {len(rows)} incidents")
+
+@metrics.timed("scores.update")
+def update_scores(db, full=False, batch_size=BATCH_SIZE, now=None):
+    """Returns (rows checked, rows updated)."""
+    now = now or datetime.utcnow()
+    checked = updated = 0
+    last_id = 0
+    base = _candidates(full)
+
+    while True:
+        rows = db.execute(
+            base.where(Incident.id > last_id).order_by(Incident.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids, priorities, anomalies, sources, timestamps, old_keys = zip(*rows)
+
+        scores, keys = scoring.compute_scores(priorities, anomalies, sources, timestamps, now)
+        changed = [
+            {"b_id": i, "b_score": s, "b_key": k}
+            for i, s, k, old in zip(ids, scores.tolist(), keys, old_keys)
+            if k != old
+        ]
+        if changed:
+            db.execute(_UPDATE, changed)
+            db.commit()
+
+        checked += len(rows)
+        updated += len(changed)
+        last_id = ids[-1]
+
+    SCORES_UPDATED.inc(updated)
+    return checked, updated
+
+
+def run_update(full=False):
+    """Score job entry point; init_db() applies pending schema upgrades first."""
+    init_db()
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        checked, updated = update_scores(db, full=full)
+        print(f"Threat scores: {updated} of {checked} checked incidents updated "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return updated
 
     except Exception as e:
+        db.rollback()
         print("update_scores error:", e)
+        raise
 
     finally:
         db.close()
 
+
 if __name__ == "__main__":
-    run_update()
+    parser = argparse.ArgumentParser(description="Recompute incident threat scores")
+    parser.add_argument("--full", action="store_true", help="check every incident")
+    try:
+        run_update(full=parser.parse_args().full)
+    except Exception:
+        raise SystemExit(1)   # already reported; fail the cron / CI step
     print("Threat scores update completed.")
@@ -0,0 +1,444 @@
+# backend/collector/backfill.py
+"""
+Bulk historical ingest of archived feed dumps (backend/run_backfill.py).
+
+Inputs, one parse task each (see tasks()):
+- saved RSS / Atom documents (.xml, .rss, .atom, optionally .gz); the
+  entries' source is the given --source, else the feed's rel="self"
+  link, else the file's file:// URL
+- OPML lists: every <outline xmlUrl=".."> feed is fetched once, in full
+- NDJSON (.ndjson, .jsonl): one entry per line, with the field names of
+  backend.run_export's output (guid/link/description/published are also
+  accepted); large files are split into NDJSON_SPLIT_BYTES byte ranges
+  so a single archive still parses on every worker
+
+Parsing, HTML stripping and entity extraction run in a process pool.
+The parent dedups on (source, external_id), classifies and scores
+BATCH_ROWS rows per call and writes each batch with multi-row INSERTs in
+one transaction. For the duration of the run its connection uses
+RELAXED_PRAGMAS: a large page cache and rare checkpoints, with
+synchronous=NORMAL, which in WAL mode only fsyncs at checkpoints. An OS
+crash or power loss can lose the last committed batches, but cannot
+corrupt the database (synchronous=OFF could). Once a run is large enough for it to
+pay off (DEFER_INDEXES_*), the non-unique indexes on incidents /
+incident_entities are dropped and rebuilt once at the end.
+The dropped DDL is kept in a sidecar file until then, so a run that was
+killed midway gets its indexes back on the next start.
+
+Entries that the collector's retention cleanup would delete right away
+are skipped unless keep_expired is set. Backfilled rows send no alerts.
+"""
+
+import gzip
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from pathlib import Path
+from xml.etree.ElementTree import ParseError, iterparse
+
+from sqlalchemy import insert, select, text
+
+from backend.database import engine, init_db
+from backend.models import Incident
+from backend.collector import rss_collector
+from backend.collector.entity_extractor import entity_rows, extract_batch, store_entities
+from backend.collector.feed_fetcher import (
+    CHUNK_BYTES, FeedError, parse_date, parse_entries, read_feed, sanitize_html,
+)
+from backend import metrics, scoring, text_store
+
+BACKFILLED = metrics.counter(
+    "cybernow_backfill_entries_total", "Archived entries seen by the backfill, by outcome"
+)
+
+BATCH_ROWS = 5000
+NDJSON_SPLIT_BYTES = 16 * 1024 * 1024
+MAX_ARCHIVE_FEED_BYTES = 100 * 1024 * 1024   # OPML feeds are read in full
+PROGRESS_SECONDS = 10
+
+XML_SUFFIXES = {".xml", ".rss", ".atom"}
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+OPML_SUFFIXES = {".opml"}
+
+# per-connection, restored to their previous values after the run
+RELAXED_PRAGMAS = {
+    "synchronous": "NORMAL",        # crash-safe under WAL; OFF is not
+    "cache_size": "-262144",        # 256 MB page cache
+    "temp_store": "MEMORY",
+    "wal_autocheckpoint": "10000",  # checkpoint every ~40 MB of WAL, not every 4 MB
+}
+DEFERRED_TABLES = ("incidents", "incident_entities")
+# indexes are only deferred once this many entries came in: rebuilding
+# them costs a full scan of the tables, small runs are cheaper without
+DEFER_INDEXES_MIN_ROWS = 50_000
+DEFER_INDEXES_FRACTION = 0.25      # ... or this share of the existing incidents
+
+# OR IGNORE: rows a concurrent collector stored meanwhile are skipped (and
+# not returned); unlike ON CONFLICT (..) it also runs on databases created
+# before uq_incident_source_ext existed
+_INSERT = (
+    insert(Incident)
+    .prefix_with("OR IGNORE")
+    .returning(Incident.id, Incident.source, Incident.external_id)
+)
+
+
+class BackfillError(ValueError):
+    """An input path that is neither a feed dump, an OPML list nor NDJSON."""
+
+
+# ================== TASKS ==================
+def _suffixes(path):
+    suffixes = [s.lower() for s in path.suffixes]
+    if suffixes and suffixes[-1] == ".gz":
+        suffixes.pop()
+    return suffixes[-1] if suffixes else ""
+
+
+def _opml_feeds(path):
+    feeds = []
+    try:
+        for _, elem in iterparse(str(path)):
+            if elem.tag == "outline" and elem.get("xmlUrl"):
+                feeds.append(elem.get("xmlUrl").strip())
+    except ParseError as e:
+        raise BackfillError(f"{path}: invalid OPML: {e}") from e
+    return feeds
+
+
+def _ndjson_ranges(path):
+    if path.suffix.lower() == ".gz":
+        return [(0, None)]
+    size = path.stat().st_size
+    return [(start, min(start + NDJSON_SPLIT_BYTES, size))
+            for start in range(0, size, NDJSON_SPLIT_BYTES)]
+
+
+def tasks(inputs, source=None, walking=False):
+    """
+    Parse tasks for the given paths / feed URLs. Directories are walked
+    (files of other types in them are ignored). Each task is
+    (kind, target, source, start, end) and is picklable.
+    """
+    out = []
+    for item in inputs:
+        if item.startswith(("http://", "https://")):
+            out.append(("feed", item, source, None, None))
+            continue
+        path = Path(item)
+        if path.is_dir():
+            files = [str(p) for p in sorted(path.rglob("*")) if p.is_file()]
+            out.extend(tasks(files, source, walking=True))
+            continue
+        if not path.exists():
+            raise BackfillError(f"{item}: no such file")
+
+        kind = _suffixes(path)
+        if kind in OPML_SUFFIXES:
+            out.extend(("feed", url, None, None, None) for url in _opml_feeds(path))
+        elif kind in NDJSON_SUFFIXES:
+            out.extend(("ndjson", str(path), source, a, b) for a, b in _ndjson_ranges(path))
+        elif kind in XML_SUFFIXES:
+            out.append(("xml", str(path), source, None, None))
+        elif not walking:
+            raise BackfillError(f"{item}: expected .xml/.rss/.atom, .opml or .ndjson/.jsonl")
+    return out
+
+
+# ================== PARSING (worker processes) ==================
+def _open(path):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _chunks(f):
+    return iter(lambda: f.read(CHUNK_BYTES), b"")
+
+
+def _ndjson_entry(obj):
+    link = obj.get("url") or obj.get("link")
+    ext_id = obj.get("external_id") or obj.get("guid")
+    if ext_id is None and isinstance(obj.get("id"), str):
+        ext_id = obj["id"]     # raw dumps; in export output "id" is our row id
+    return {
+        "title": sanitize_html(obj.get("title") or "", max_chars=500),
+        "summary": sanitize_html(obj.get("summary") or obj.get("description") or ""),
+        "link": link,
+        "id": str(ext_id).strip() if ext_id else link,
+        "published": parse_date(obj.get("timestamp") or obj.get("published")),
+    }
+
+
+def _ndjson_rows(path, source, start, end):
+    rows, invalid = [], 0
+    with _open(path) as f:
+        if start:
+            # the line running across `start` belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+                entry = _ndjson_entry(obj)
+            except (ValueError, AttributeError):
+                invalid += 1
+                continue
+            row_source = obj.get("source") or source
+            if not (row_source and entry["id"] and entry["title"]):
+                invalid += 1
+                continue
+            rows.append(rss_collector.entry_row(row_source, entry))
+    return rows, invalid
+
+
+def _xml_rows(kind, target, source):
+    meta = {}
+    if kind == "feed":
+        entries = list(read_feed(target, max_bytes=MAX_ARCHIVE_FEED_BYTES, meta=meta))
+        source = source or target
+    else:
+        with _open(target) as f:
+            entries = list(parse_entries(_chunks(f), target, meta=meta))
+        source = source or meta.get("self") or Path(target).resolve().as_uri()
+    rows = [rss_collector.entry_row(source, e) for e in entries if e["id"] and e["title"]]
+    return rows, len(entries) - len(rows)
+
+
+def parse_task(task):
+    """
+    Run one task: (label, rows, invalid, error). Rows are incident row
+    dicts plus their extracted "entities"; error is a message or None.
+    """
+    kind, target, source, start, end = task
+    label = target if start is None else f"{target}@{start}"
+    try:
+        if kind == "ndjson":
+            rows, invalid = _ndjson_rows(target, source, start, end)
+        else:
+            rows, invalid = _xml_rows(kind, target, source)
+    except (FeedError, OSError) as e:
+        return label, [], 0, str(e)
+    found = extract_batch(f"{r['title']} {r['summary']}" for r in rows)
+    for row, entities in zip(rows, found):
+        row["entities"] = entities
+    return label, rows, invalid, None
+
+
+def _parsed(task_list, workers):
+    """parse_task() results as they finish, with a bounded number in flight."""
+    if workers <= 1:
+        yield from map(parse_task, task_list)
+        return
+    pending_tasks = iter(task_list)
+    with ProcessPoolExecutor(workers) as pool:
+        running = {pool.submit(parse_task, t) for _, t in zip(range(2 * workers), pending_tasks)}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                for t in pending_tasks:
+                    running.add(pool.submit(parse_task, t))
+                    break
+
+
+# ================== DB SETUP ==================
+def _index_state_path():
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or not database or database == ":memory:":
+        return None
+    return Path(f"{database}.backfill-indexes.json")
+
+
+def relax(conn):
+    """Apply RELAXED_PRAGMAS; returns the previous values for restore()."""
+    previous = {}
+    for name, value in RELAXED_PRAGMAS.items():
+        previous[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+    return previous
+
+
+def restore(conn, previous):
+    for name, value in previous.items():
+        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+
+
+def drop_indexes(conn):
+    """
+    Drop the non-unique indexes of DEFERRED_TABLES (unique ones back the
+    dedup and ON CONFLICT) and record their DDL. Returns {name: sql}.
+    """
+    dropped = {}
+    for table in DEFERRED_TABLES:
+        for _, name, unique, origin, *_ in conn.exec_driver_sql(f"PRAGMA index_list({table})"):
+            if unique or origin != "c":
+                continue
+            dropped[name] = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = :n"),
+                {"n": name},
+            ).scalar()
+    state = _index_state_path()
+    if state is not None and dropped:
+        state.write_text(json.dumps(dropped, indent=2), encoding="utf-8")
+    for name in dropped:
+        conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+    conn.commit()
+    return dropped
+
+
+def rebuild_indexes(conn, dropped=None):
+    """Recreate dropped indexes (default: those recorded by an interrupted run)."""
+    state = _index_state_path()
+    if dropped is None:
+        if state is None or not state.exists():
+            return 0
+        dropped = json.loads(state.read_text(encoding="utf-8"))
+    existing = set(conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index'")
+    ).scalars())
+    built = 0
+    for name, sql in dropped.items():
+        if name not in existing:
+            conn.exec_driver_sql(sql)
+            built += 1
+    conn.exec_driver_sql("ANALYZE")
+    conn.commit()
+    if state is not None and state.exists():
+        state.unlink()
+    return built
+
+
+# ================== WRITE ==================
+def _known(conn, cache, source):
+    if source not in cache:
+        cache[source] = set(conn.execute(
+            select(Incident.external_id).where(Incident.source == source)
+        ).scalars())
+    return cache[source]
+
+
+def write_batch(conn, rows):
+    """Insert classified row dicts, their texts and entities; one commit. Returns new ids."""
+    if not rows:
+        return []
+    entities = [r.pop("entities", ()) for r in rows]
+    hashes = text_store.store(conn, [r.pop("summary") for r in rows])
+    for row, h in zip(rows, hashes):
+        row["text_hash"] = h
+    ids = {
+        (source, ext_id): new_id
+        for new_id, source, ext_id in conn.execute(_INSERT, rows)
+    }
+    store_entities(conn, [
+        e for row, found in zip(rows, entities)
+        if (row["source"], row["external_id"]) in ids
+        for e in entity_rows(ids[row["source"], row["external_id"]], row["timestamp"], found)
+    ])
+    conn.commit()
+    return list(ids.values())
+
+
+def _prepare(rows, keep_expired, now, stats):
+    """Classify + score a batch; drops rows retention would delete at once."""
+    if not keep_expired:
+        # past the longest retention whatever the priority: skip classifying them
+        cutoff = now - timedelta(days=rss_collector.HIGH_RETENTION_DAYS)
+        kept = [r for r in rows if r["timestamp"] >= cutoff]
+        stats["expired"] += len(rows) - len(kept)
+        rows = kept
+    rss_collector.classify_rows(rows)
+    scoring.score_fields(rows, now=now)
+    if not keep_expired:
+        kept = [r for r in rows if not rss_collector.is_expired(r, now)]
+        stats["expired"] += len(rows) - len(kept)
+        rows = kept
+    return rows
+
+
+def _defer_threshold(conn):
+    """Entries after which dropping + rebuilding indexes beats maintaining them."""
+    rows = conn.execute(text("SELECT COUNT(*) FROM incidents")).scalar()
+    return max(DEFER_INDEXES_MIN_ROWS, int(rows * DEFER_INDEXES_FRACTION))
+
+
+# ================== MAIN ==================
+def backfill(task_list, workers=None, batch_rows=BATCH_ROWS, defer_indexes=True,
+             keep_expired=False, now=None):
+    """
+    Ingest parse tasks (see tasks()). Returns a stats dict: entries,
+    new, duplicate, expired, invalid, failed (tasks), seconds, entries_per_s.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    now = now or datetime.utcnow()
+    stats = dict.fromkeys(("entries", "new", "duplicate", "expired", "invalid", "failed"), 0)
+    t0 = last_report = time.perf_counter()
+
+    init_db()
+    with engine.connect() as conn:
+        sqlite = engine.dialect.name == "sqlite"
+        if sqlite and rebuild_indexes(conn):
+            print("🧱 Restored indexes dropped by an interrupted backfill")
+        previous = relax(conn) if sqlite else {}
+        defer_at = _defer_threshold(conn) if sqlite and defer_indexes else None
+        dropped = {}
+
+        known = {}
+        pending = []
+
+        def flush(rows):
+            if defer_at is not None and not dropped and stats["entries"] >= defer_at:
+                dropped.update(drop_indexes(conn))
+                print(f"⏸  Deferred {len(dropped)} indexes until the backfill ends")
+            with metrics.span("backfill.write", rows=len(rows)):
+                rows = _prepare(rows, keep_expired, now, stats)
+                new_ids = write_batch(conn, rows)
+            stats["new"] += len(new_ids)
+            stats["duplicate"] += len(rows) - len(new_ids)
+
+        try:
+            for label, rows, invalid, error in _parsed(task_list, workers):
+                if error:
+                    stats["failed"] += 1
+                    print(f"⚠ {label}: {error}")
+                    continue
+                stats["entries"] += len(rows) + invalid
+                stats["invalid"] += invalid
+                for row in rows:
+                    seen = _known(conn, known, row["source"])
+                    if row["external_id"] in seen:
+                        stats["duplicate"] += 1
+                        continue
+                    seen.add(row["external_id"])
+                    pending.append(row)
+                while len(pending) >= batch_rows:
+                    flush(pending[:batch_rows])
+                    del pending[:batch_rows]
+
+                if time.perf_counter() - last_report > PROGRESS_SECONDS:
+                    last_report = time.perf_counter()
+                    rate = stats["entries"] / (last_report - t0)
+                    print(f"⏩ {stats['entries']} entries, {stats['new']} new ({rate:,.0f} entries/s)")
+            flush(pending)
+        finally:
+            # a batch that failed mid-write leaves its transaction open; end it
+            # before the index rebuild / pragma restore run on this connection
+            conn.rollback()
+            if dropped:
+                t1 = time.perf_counter()
+                rebuild_indexes(conn, dropped)
+                print(f"🧱 Rebuilt {len(dropped)} indexes in {time.perf_counter() - t1:.1f}s")
+            if sqlite:
+                restore(conn, previous)
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    for outcome in ("new", "duplicate", "expired", "invalid"):
+        BACKFILLED.inc(stats[outcome], outcome=outcome)
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    stats["entries_per_s"] = round(stats["entries"] / max(stats["seconds"], 1e-9), 1)
+    return stats
@@ -1,5 +1,7 @@
 # backend/collector/collector_sources.py
 
+from urllib.parse import urlparse
+
 SOURCES = [
     # ================= GOVERNMENT / NATIONAL =================
     {
@@ -107,3 +109,15 @@ HIGH_FREQUENCY_FEEDS = [
     "https://www.cisa.gov/news.xml",
     "https://www.exploit-db.com/rss.xml",
 ]
+
+
+# ---------------- CATEGORY LOOKUP ----------------
+_CATEGORY_BY_URL = {s["url"]: s["category"] for s in SOURCES}
+_CATEGORY_BY_HOST = {urlparse(s["url"]).hostname: s["category"] for s in SOURCES}
+
+
+def source_category(url):
+    """Registry category for a feed URL (exact URL, else a source on the same host)."""
+    if not url:
+        return None
+    return _CATEGORY_BY_URL.get(url) or _CATEGORY_BY_HOST.get(urlparse(url).hostname)
@@ -0,0 +1,217 @@
+# backend/collector/entity_extractor.py
+"""
+Entity extraction for incidents: CVE ids, APT groups (with aliases),
+vendors and IOCs (IPv4, domains, file hashes) from title + summary.
+
+All matchers are compiled once at import; extract_batch() runs them over
+a feed's new entries before insert, and the results are stored in the
+incident_entities inverted index (kind, value) → incident.
+
+Backfill existing rows:  python -m backend.collector.entity_extractor --backfill
+"""
+
+import argparse
+import re
+import time
+
+from sqlalchemy import delete, insert, select
+
+from backend.models import Incident, IncidentEntity
+from backend import text_store
+
+KINDS = ("cve", "apt", "vendor", "ip", "domain", "hash")
+BACKFILL_BATCH = 1000
+MAX_ENTITIES_PER_KIND = 20
+
+# ================== DICTIONARIES ==================
+# canonical name → aliases (matched case-insensitively, whole words)
+APT_GROUPS = {
+    "APT28": ["Fancy Bear", "Sofacy", "Sednit", "Strontium", "Forest Blizzard"],
+    "APT29": ["Cozy Bear", "Nobelium", "Midnight Blizzard", "The Dukes"],
+    "Lazarus Group": ["Lazarus", "Hidden Cobra", "Diamond Sleet"],
+    "APT41": ["Double Dragon", "Winnti", "Brass Typhoon"],
+    "Sandworm": ["Voodoo Bear", "Seashell Blizzard", "APT44"],
+    "Kimsuky": ["Velvet Chollima", "Emerald Sleet"],
+    "Turla": ["Venomous Bear", "Secret Blizzard"],
+    "APT10": ["Stone Panda", "MenuPass"],
+    "APT33": ["Elfin", "Peach Sandstorm"],
+    "APT34": ["OilRig", "Helix Kitten"],
+    "APT35": ["Charming Kitten", "Mint Sandstorm"],
+    "APT38": ["BlueNoroff"],
+    "Volt Typhoon": ["Bronze Silhouette"],
+    "Salt Typhoon": ["GhostEmperor"],
+    "Scattered Spider": ["Octo Tempest", "UNC3944"],
+    "FIN7": ["Carbanak"],
+    "Transparent Tribe": ["APT36", "Mythic Leopard"],
+    "SideWinder": ["Rattlesnake"],
+    "MuddyWater": ["Mango Sandstorm", "Static Kitten"],
+    "Gamaredon": ["Primitive Bear", "Aqua Blizzard"],
+}
+
+# matched case-sensitively: "Chrome"/"Exchange" are products, "exchange" is not
+VENDORS = [
+    "Microsoft", "Cisco", "Fortinet", "Ivanti", "VMware", "Citrix",
+    "Palo Alto Networks", "Juniper", "SonicWall", "F5", "Apple", "Google",
+    "Oracle", "Adobe", "SAP", "Atlassian", "Zyxel", "MOVEit",
+    "Apache", "Linux", "Android", "Chrome", "Windows", "Exchange",
+    "SharePoint", "Confluence", "Jenkins", "GitLab", "WordPress", "Okta",
+    "Cloudflare", "CrowdStrike", "Veeam", "Check Point", "Barracuda",
+    "Synology", "QNAP", "D-Link", "TP-Link", "Mozilla", "Firefox",
+]
+
+# ================== MATCHERS ==================
+CVE_RE = re.compile(r"\bCVE-(\d{4})-(\d{4,7})\b", re.IGNORECASE)
+APT_NUMBER_RE = re.compile(r"\bAPT[\s-]?(\d{1,3})\b", re.IGNORECASE)
+IPV4_RE = re.compile(
+    r"(?<![\d.])(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}"
+    r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?!\d|\.\d)"
+)
+DOMAIN_RE = re.compile(
+    r"\b((?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+"
+    r"(?:com|net|org|info|biz|io|co|me|xyz|top|online|site|ru|cn|su|ir|kp|in|uk|de|fr|tk|cc|pw|onion))\b",
+    re.IGNORECASE,
+)
+HASH_RE = re.compile(r"\b(?:[a-f0-9]{64}|[a-f0-9]{40}|[a-f0-9]{32})\b", re.IGNORECASE)
+# defanged IOCs: 1.2.3[.]4, evil(.)com, hxxp://
+REFANG_RE = re.compile(r"\[\.\]|\(\.\)|\{\.\}|\[dot\]", re.IGNORECASE)
+
+
+def _alternation(names, flags=0):
+    # longest first so "Palo Alto Networks" wins over a shorter overlap
+    ordered = sorted(names, key=len, reverse=True)
+    return re.compile(
+        r"(?<![\w-])(" + "|".join(re.escape(n) for n in ordered) + r")(?![\w-])",
+        flags,
+    )
+
+
+_APT_LOOKUP = {}
+for canonical, aliases in APT_GROUPS.items():
+    for name in [canonical, *aliases]:
+        _APT_LOOKUP[name.lower()] = canonical
+APT_RE = _alternation(_APT_LOOKUP, re.IGNORECASE)
+VENDOR_RE = _alternation(VENDORS)
+
+# domains that show up in every feed and say nothing about the incident
+IGNORED_DOMAINS = {"example.com", "example.org", "example.net", "www.w3.org"}
+
+
+# ================== EXTRACTION ==================
+def _limited(values):
+    return sorted(values)[:MAX_ENTITIES_PER_KIND]
+
+
+def extract(text):
+    """{(kind, value)} for one text; values are normalized."""
+    if not text:
+        return set()
+
+    found = {("cve", f"CVE-{y}-{n}") for y, n in CVE_RE.findall(text)}
+
+    apts = {_APT_LOOKUP[m.lower()] for m in APT_RE.findall(text)}
+    for n in APT_NUMBER_RE.findall(text):
+        apts.add(_APT_LOOKUP.get(f"apt{int(n)}", f"APT{int(n)}"))
+    found.update(("apt", a) for a in _limited(apts))
+
+    found.update(("vendor", v) for v in _limited(set(VENDOR_RE.findall(text))))
+
+    iocs = REFANG_RE.sub(".", text)
+    found.update(("ip", ip) for ip in _limited(set(IPV4_RE.findall(iocs))))
+    domains = {d.lower() for d in DOMAIN_RE.findall(iocs)} - IGNORED_DOMAINS
+    found.update(("domain", d) for d in _limited(domains))
+    found.update(("hash", h) for h in _limited({h.lower() for h in HASH_RE.findall(iocs)}))
+    return found
+
+
+def normalize(kind, value):
+    """Query-side normalization, matching what extract() stores."""
+    value = value.strip()
+    if kind == "cve":
+        return value.upper()
+    if kind == "apt":
+        return _APT_LOOKUP.get(value.lower(), value)
+    if kind in ("domain", "hash"):
+        return REFANG_RE.sub(".", value).lower()
+    if kind == "ip":
+        return REFANG_RE.sub(".", value)
+    return value
+
+
+def extract_batch(texts):
+    """One entity set per text, in order."""
+    return [extract(t) for t in texts]
+
+
+def entity_rows(incident_id, timestamp, entities):
+    return [
+        {"incident_id": incident_id, "kind": kind, "value": value, "timestamp": timestamp}
+        for kind, value in entities
+    ]
+
+
+def store_entities(db, rows):
+    """Bulk insert entity_rows() dicts (caller commits)."""
+    if rows:
+        db.execute(insert(IncidentEntity), rows)
+
+
+# ================== BACKFILL ==================
+def backfill(db, batch_size=BACKFILL_BATCH):
+    """Re-extract entities for every stored incident (idempotent)."""
+    last_id = 0
+    total = 0
+    while True:
+        rows = db.execute(
+            text_store.outerjoin(
+                select(Incident.id, Incident.timestamp, Incident.title, *text_store.JOIN_COLUMNS)
+            )
+            .where(Incident.id > last_id)
+            .order_by(Incident.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        ids = [r.id for r in rows]
+        found = extract_batch(
+            f"{r.title or ''} {text_store.decode(r.codec, r.body) or ''}" for r in rows
+        )
+        db.execute(delete(IncidentEntity).where(IncidentEntity.incident_id.in_(ids)))
+        store_entities(db, [
+            e for r, entities in zip(rows, found)
+            for e in entity_rows(r.id, r.timestamp, entities)
+        ])
+        db.commit()
+
+        total += sum(len(e) for e in found)
+        last_id = ids[-1]
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incident entity extraction")
+    parser.add_argument("--backfill", action="store_true",
+                        help="extract entities for all existing incidents")
+    parser.add_argument("text", nargs="?", help="print the entities found in TEXT")
+    args = parser.parse_args(argv)
+
+    if args.backfill:
+        from backend.database import init_db, SessionLocal
+
+        init_db()
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            total = backfill(db)
+            print(f"🔎 Indexed {total} entity mentions in {time.perf_counter() - t0:.1f}s")
+        finally:
+            db.close()
+    elif args.text:
+        for kind, value in sorted(extract(args.text)):
+            print(f"{kind:<8} {value}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
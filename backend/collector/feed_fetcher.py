@@ -0,0 +1,230 @@
+# backend/collector/feed_fetcher.py
+"""
+Bounded fetch + streaming parse of RSS 2.0 / Atom feeds.
+
+- the body is streamed with a connect/read timeout, an overall deadline
+  and a MAX_FEED_BYTES cap; nothing past the cap is downloaded
+- chunks go straight into an XMLPullParser, and each <item>/<entry> is
+  cleared once read, so memory stays flat however large the feed is
+- iter_entries() stops once `limit` unseen entries were found (feeds are
+  newest-first), or after MAX_SCAN_ENTRIES entries in total
+- parse_entries() is the parser on its own, for saved dumps (backfill)
+- summaries are HTML-stripped and unescaped in one parser pass
+"""
+
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import requests
+
+MAX_FEED_BYTES = 5 * 1024 * 1024
+CHUNK_BYTES = 64 * 1024
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+DEADLINE_SECONDS = 60
+MAX_SCAN_ENTRIES = 200
+MAX_SUMMARY_CHARS = 4000
+
+USER_AGENT = "CyberNow-Collector/1.0 (+https://github.com/cybernow)"
+ENTRY_TAGS = {"item", "entry"}
+
+_WS_RE = re.compile(r"\s+")
+
+
+class FeedError(Exception):
+    """Feed could not be fetched or parsed."""
+
+
+# ================== HTML ==================
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "noscript", "iframe", "svg"}
+    BLOCK = {"p", "br", "div", "li", "tr", "h1", "h2", "h3", "h4", "blockquote"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skipping += 1
+        elif tag in self.BLOCK:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self.skipping:
+            self.skipping -= 1
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+
+def sanitize_html(value, max_chars=MAX_SUMMARY_CHARS):
+    """Strip tags/scripts, decode entities and collapse whitespace."""
+    if not value:
+        return ""
+    if "<" not in value and "&" not in value:
+        return _WS_RE.sub(" ", value).strip()[:max_chars]
+    parser = _TextExtractor()
+    parser.feed(value)
+    parser.close()
+    return _WS_RE.sub(" ", "".join(parser.parts)).strip()[:max_chars]
+
+
+# ================== XML ==================
+def _local(tag):
+    return tag.rsplit("}", 1)[-1] if "}" in tag else tag
+
+
+def parse_date(value):
+    """RFC 822 (RSS) or ISO 8601 (Atom) → naive UTC datetime."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _entry_dict(elem):
+    fields = {}
+    link = None
+    for child in elem:
+        name = _local(child.tag)
+        if name == "link":
+            # Atom: <link rel="alternate" href=".."/>; RSS: <link>..</link>
+            href = child.get("href")
+            if href and child.get("rel", "alternate") == "alternate":
+                link = link or href
+            elif child.text and not href:
+                link = link or child.text.strip()
+        elif name not in fields:
+            fields[name] = "".join(child.itertext()) if len(child) else (child.text or "")
+
+    summary = (
+        fields.get("description") or fields.get("summary")
+        or fields.get("encoded") or fields.get("content") or ""
+    )
+    return {
+        "title": sanitize_html(fields.get("title", ""), max_chars=500),
+        "summary": sanitize_html(summary),
+        "link": link,
+        "id": (fields.get("guid") or fields.get("id") or "").strip() or link,
+        "published": parse_date(
+            fields.get("pubDate") or fields.get("published")
+            or fields.get("updated") or fields.get("date")
+        ),
+    }
+
+
+def _stream(url, max_bytes, timeout):
+    """Yield body chunks, stopping at max_bytes or the overall deadline."""
+    deadline = time.monotonic() + DEADLINE_SECONDS
+    try:
+        resp = requests.get(
+            url, stream=True, timeout=timeout,
+            headers={"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"},
+        )
+    except requests.RequestException as e:
+        raise FeedError(f"fetch failed: {e}") from e
+
+    with resp:
+        if resp.status_code != 200:
+            raise FeedError(f"HTTP {resp.status_code}")
+        declared = resp.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            print(f"⚠ {url}: {declared} bytes exceeds cap, reading first {max_bytes}")
+
+        received = 0
+        try:
+            for chunk in resp.iter_content(CHUNK_BYTES):
+                received += len(chunk)
+                if received > max_bytes:
+                    print(f"⚠ {url}: truncated at {max_bytes} bytes")
+                    return
+                if time.monotonic() > deadline:
+                    print(f"⚠ {url}: deadline exceeded, stopping read")
+                    return
+                yield chunk
+        except requests.RequestException as e:
+            raise FeedError(f"read failed: {e}") from e
+
+
+def parse_entries(chunks, label, max_entries=None, meta=None):
+    """
+    Yield entry dicts (title, summary, link, id, published) from XML byte
+    chunks, stopping after `max_entries` entries. With `meta` (a dict),
+    the feed's own rel="self" link is stored under "self".
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    depth = scanned = 0
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if root is None and event == "start":
+                    root = elem
+                name = _local(elem.tag)
+                if name in ENTRY_TAGS:
+                    depth += 1 if event == "start" else -1
+                if event != "end":
+                    continue
+                if name == "link" and not depth:
+                    if meta is not None and elem.get("rel") == "self" and elem.get("href"):
+                        meta.setdefault("self", elem.get("href").strip())
+                    continue
+                if name not in ENTRY_TAGS:
+                    continue
+
+                entry = _entry_dict(elem)
+                elem.clear()
+                if root is not None:
+                    # drop finished entries from the tree (RSS nests them in <channel>)
+                    for parent in (root, *root):
+                        if len(parent) and parent[-1] is elem:
+                            parent.remove(elem)
+                            break
+
+                scanned += 1
+                yield entry
+                if max_entries and scanned >= max_entries:
+                    return
+    except ParseError as e:
+        if not scanned:
+            raise FeedError(f"invalid XML: {e}") from e
+        # truncated or malformed tail: keep what was parsed
+        print(f"⚠ {label}: XML error after {scanned} entries: {e}")
+
+
+def iter_entries(url, known_ids=(), limit=25, max_bytes=MAX_FEED_BYTES,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+    """
+    Yield (entry, is_new) for the newest feed entries until `limit` new
+    ones were seen. `entry` has title, summary, link, id, published.
+    """
+    new = 0
+    for entry in parse_entries(_stream(url, max_bytes, timeout), url, MAX_SCAN_ENTRIES):
+        is_new = bool(entry["id"]) and entry["id"] not in known_ids
+        yield entry, is_new
+        new += is_new
+        if new >= limit:
+            return
+
+
+def read_feed(url, max_bytes=MAX_FEED_BYTES, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+              meta=None):
+    """Every entry of a feed, with no known-id or scan cut-off (backfill)."""
+    return parse_entries(_stream(url, max_bytes, timeout), url, meta=meta)
@@ -1,17 +1,102 @@
 # backend/collector/ml_classifier.py
 
-import joblib
+import os
+import json
 from pathlib import Path
 
+from sqlalchemy import or_
+
+import numpy as np
+
 from backend.database import SessionLocal
 from backend.models import Incident
+from backend.ml import embedding, source_priors
+from backend import alerts, hot_window, metrics, scoring, text_store
+
+CLASSIFIED = metrics.counter(
+    "cybernow_incidents_classified_total", "Incidents scored by the classifier"
+)
+PRIOR_SHORTCUTS = metrics.counter(
+    "cybernow_classify_source_prior_total",
+    "Incidents labelled from their source prior without model inference",
+)
 
 # ---------------- ML ASSETS ----------------
 ML_DIR = Path(__file__).resolve().parent.parent / "ml"
 
-vectorizer = joblib.load(ML_DIR / "vectorizer.joblib")
-classifier = joblib.load(ML_DIR / "model.joblib")
-isolation_forest = joblib.load(ML_DIR / "isolation_forest.joblib")
+# Which classifier to score with. "forest" is the full 200-tree model;
+# "linear" and "compact_forest" are the smaller models written by train.py.
+INFERENCE_MODEL_FILES = {
+    "forest": ML_DIR / "model.joblib",
+    "linear": ML_DIR / "linear_model.joblib",
+    "compact_forest": ML_DIR / "compact_forest.joblib",
+}
+INFERENCE_MODEL = os.environ.get("CYBERNOW_INFERENCE_MODEL", "forest")
+DRIFT_STATE = ML_DIR / "drift_state.json"
+
+
+def _inference_model_path(name: str) -> Path:
+    path = INFERENCE_MODEL_FILES.get(name)
+    if path is None:
+        print(f"Unknown inference model '{name}', using forest")
+        return INFERENCE_MODEL_FILES["forest"]
+    if not path.exists():
+        print(f"{path.name} not found (retrain to build it), using forest")
+        return INFERENCE_MODEL_FILES["forest"]
+    return path
+
+
+def read_model_version():
+    """Version stamped by train.py into drift_state.json, or None."""
+    try:
+        return json.loads(DRIFT_STATE.read_text(encoding="utf-8")).get("model_version")
+    except Exception:
+        return None
+
+
+# Loaded on first use (ensure_models), not at import: unpickling the
+# models pulls in sklearn and takes seconds, which entry points that only
+# touch the DB (run_collector with nothing new, update_scores) never need.
+vectorizer = classifier = isolation_forest = EMBEDDING = SOURCE_PRIORS = None
+MODEL_VERSION = None
+_loaded = False
+
+
+def load_models():
+    """(Re)load the vectorizer, classifier, embedding, isolation forest and source priors."""
+    global vectorizer, classifier, isolation_forest, EMBEDDING, SOURCE_PRIORS, MODEL_VERSION
+    global _loaded
+    import joblib
+
+    vectorizer = joblib.load(ML_DIR / "vectorizer.joblib")
+    classifier = joblib.load(_inference_model_path(INFERENCE_MODEL))
+    isolation_forest = joblib.load(ML_DIR / "isolation_forest.joblib")
+    # forests from before the embedding stage were fitted on raw TF-IDF
+    EMBEDDING = embedding.load()
+    if EMBEDDING is not None and isolation_forest.n_features_in_ != EMBEDDING["dim"]:
+        EMBEDDING = None
+    SOURCE_PRIORS = source_priors.load_priors()
+    MODEL_VERSION = read_model_version()
+    _loaded = True
+
+
+def ensure_models():
+    if not _loaded:
+        load_models()
+
+
+def anomaly_features(X):
+    """Isolation-forest input for TF-IDF rows: the dense embedding when available."""
+    return embedding.transform(EMBEDDING, X) if EMBEDDING is not None else X
+
+
+def reload_models_if_stale():
+    """Pick up a retrained model. Returns True when models were reloaded."""
+    if not _loaded or read_model_version() == MODEL_VERSION:
+        return False    # not loaded yet: the next ensure_models() reads the new one
+    load_models()
+    return True
+
 
 CATEGORY_TO_SEVERITY = {
     # Critical
@@ -69,8 +154,73 @@ SEVERITY_KEYWORDS = {
     ]
 }
 
-# ---------------- SINGLE TEXT CLASSIFIER ----------------
-def classify(text: str):
+# ---------------- TEXT CLASSIFIER ----------------
+def _keyword_priority(text_l: str, default: str) -> str:
+    for sev, keywords in SEVERITY_KEYWORDS.items():
+        if any(kw in text_l for kw in keywords):
+            return sev
+    return default
+
+
+def _result(text, classes, proba, anomaly_score, confidence):
+    category = classes[proba.argmax()].lower()
+    priority = _keyword_priority(
+        text.lower(), CATEGORY_TO_SEVERITY.get(category, "LOW")
+    )
+    return {
+        "priority": priority,
+        "category": category,
+        "proba": {cls: float(p) for cls, p in zip(classes, proba)},
+        "anomaly_score": anomaly_score,
+        "confidence": confidence,
+        "model_version": MODEL_VERSION,
+    }
+
+
+def classify_batch(texts, sources=None):
+    """
+    Classify a batch of incident texts with one vectorize/predict call.
+
+    With `sources` (feed URL per text), model probabilities are combined
+    with the per-source prior, and texts from near-deterministic sources
+    are labelled from the prior alone (no anomaly score for those).
+
+    Returns a list of dicts in input order (see classify()).
+    """
+    if not texts:
+        return []
+
+    ensure_models()
+    classes = classifier.classes_
+    entries = [source_priors.lookup(SOURCE_PRIORS, s) for s in (sources or [None] * len(texts))]
+    results = [None] * len(texts)
+
+    model_idx = []
+    for i, entry in enumerate(entries):
+        if source_priors.is_deterministic(entry):
+            prior = np.array([entry["prior"].get(str(c), 0.0) for c in classes])
+            results[i] = _result(texts[i], classes, prior, None, float(prior.max()))
+        else:
+            model_idx.append(i)
+    PRIOR_SHORTCUTS.inc(len(texts) - len(model_idx))
+
+    if model_idx:
+        model_texts = [texts[i] for i in model_idx]
+        with metrics.span("classify.vectorize", rows=len(model_texts)):
+            X = vectorizer.transform(model_texts)
+        with metrics.span("classify.predict", rows=len(model_texts)):
+            probas = classifier.predict_proba(X)
+            anomaly_scores = isolation_forest.score_samples(anomaly_features(X))
+
+        for i, proba, anomaly_score in zip(model_idx, probas, anomaly_scores):
+            entry = entries[i]
+            posterior = source_priors.combine(proba, classes, SOURCE_PRIORS, entry)
+            confidence = source_priors.calibrated_confidence(posterior.max(), entry)
+            results[i] = _result(texts[i], classes, posterior, float(anomaly_score), confidence)
+    return results
+
+
+def classify(text: str, source=None):
     """
     Classify a single incident text.
 
@@ -79,83 +229,117 @@ def classify(text: str):
         priority: str,
         category: str,
         proba: dict,
-        anomaly_score: float
+        anomaly_score: float | None,
+        confidence: float,
+        model_version: str | None
     }
     """
-    X = vectorizer.transform([text])
+    return classify_batch([text], [source])[0]
 
-    proba = classifier.predict_proba(X)[0]
-    category = classifier.classes_[proba.argmax()].lower()
-    anomaly_score = isolation_forest.score_samples(X)[0]
-    text_l = text.lower()
-    priority = CATEGORY_TO_SEVERITY.get(category.lower(), "LOW")
-    for sev, keywords in SEVERITY_KEYWORDS.items():
-        if any(kw in text_l for kw in keywords):
-            priority = sev
-            break
+
+# ---------------- PIPELINE / BATCH CLASSIFIER ----------------
+def incident_fields(result):
+    """Incident column values for a classify()/classify_batch() result."""
+    category = result["category"]
+    priority = result["priority"]
     return {
-        "priority": priority,
         "category": category,
-        "proba": {
-            cls: float(p)
-            for cls, p in zip(classifier.classes_, proba)
-        },
-        "anomaly_score": float(anomaly_score),
+        "priority": priority,
+        "anomaly_score": result["anomaly_score"],
+        # ✅ sector mapping (safe)
+        "sector": CATEGORY_TO_SECTOR.get(
+            category.lower() if category else "",
+            "General"
+        ),
+        # ✅ mitigation logic (unchanged intent)
+        "is_mitigated": priority == "LOW",
+        "confidence": result.get("confidence"),
+        "model_version": result["model_version"],
     }
 
 
-# ---------------- PIPELINE / BATCH CLASSIFIER ----------------
-def classify_new_incidents():
+def _apply_result(inc, result):
+    for field, value in incident_fields(result).items():
+        setattr(inc, field, value)
+
+
+def _row(inc, fields, summaries):
+    return {
+        f: summaries.get(inc.text_hash) if f == "summary" else getattr(inc, f)
+        for f in fields
+    }
+
+
+def classify_incidents(incident_ids, executor=None, chunk_size=64):
     """
-    Classifies incidents in DB that are not yet categorized.
-    Used by run_pipeline.py
+    Classify the given incidents and write the results back.
+
+    When `executor` (e.g. a ProcessPoolExecutor) is given, prediction runs
+    in its workers in chunks of `chunk_size`; DB writes stay in this process.
     """
-    db = SessionLocal()
-    classified_count = 0
+    if not incident_ids:
+        return 0
 
+    db = SessionLocal()
     try:
         incidents = (
             db.query(Incident)
-            .filter(
-    (Incident.priority.is_(None)) |
-    (Incident.priority == "LOW")
-)
+            .filter(Incident.id.in_(list(incident_ids)))
             .all()
         )
-
+        summaries = text_store.fetch(db, [inc.text_hash for inc in incidents])
+        pending = []
         for inc in incidents:
-            text = f"{inc.title or ''} {inc.summary or ''}".strip()
-            if not text:
-                continue
-
-            result = classify(text)
-
-            category = result["category"]
-            priority = result["priority"]
+            text = f"{inc.title or ''} {summaries.get(inc.text_hash) or ''}".strip()
+            if text:
+                pending.append((inc, text))
 
-            inc.category = category
-            inc.priority = priority
-            inc.anomaly_score = result["anomaly_score"]
+        texts = [text for _, text in pending]
+        sources = [inc.source for inc, _ in pending]
+        if executor is None:
+            results = classify_batch(texts, sources)
+        else:
+            starts = range(0, len(texts), chunk_size)
+            results = [
+                r
+                for batch in executor.map(
+                    classify_batch,
+                    [texts[i:i + chunk_size] for i in starts],
+                    [sources[i:i + chunk_size] for i in starts],
+                )
+                for r in batch
+            ]
 
-            # ✅ sector mapping (safe)
-            inc.sector = CATEGORY_TO_SECTOR.get(
-                category.lower() if category else "",
-                "General"
-            )
+        # rows stored without a model get their alerts on first classification
+        unlabelled = {inc.id for inc, _ in pending if inc.model_version is None}
+        for (inc, _), result in zip(pending, results):
+            _apply_result(inc, result)
 
-            # ✅ mitigation logic (unchanged intent)
-            inc.is_mitigated = priority == "LOW"
-
-            # ✅ use existing DB columns properly
-            inc.is_critical = priority in ["HIGH", "CRITICAL"]
-            inc.threat_score = max(result["proba"].values())
-
-            classified_count += 1
-
-        if classified_count > 0:
-            db.commit()
+        # new priority/anomaly → new composite score, same compute as ingest
+        scored = [inc for inc, _ in pending]
+        scores, keys = scoring.compute_scores(
+            [inc.priority for inc in scored],
+            [inc.anomaly_score for inc in scored],
+            [inc.source for inc in scored],
+            [inc.timestamp for inc in scored],
+        )
+        for inc, score, key in zip(scored, scores.tolist(), keys):
+            inc.threat_score = score
+            inc.score_key = key
 
-        print(f"🧠 Classified {classified_count} new incidents")
+        # snapshot before commit expires the objects
+        published = [_row(inc, hot_window.FIELDS, summaries) for inc in scored]
+        first_seen = [
+            _row(inc, alerts.ROW_FIELDS, summaries)
+            for inc in scored if inc.id in unlabelled and inc.model_version
+        ]
+        if pending:
+            with metrics.span("classify.commit", rows=len(pending)):
+                db.commit()
+        hot_window.publish(published)
+        alerts.dispatch(db, first_seen)
+        CLASSIFIED.inc(len(pending))
+        return len(pending)
 
     except Exception:
         db.rollback()
@@ -163,3 +347,50 @@ def classify_new_incidents():
 
     finally:
         db.close()
+
+
+@metrics.timed("classify.reclassify")
+def classify_new_incidents(executor=None, batch_size=500):
+    """
+    Reclassify incidents whose model_version differs from the loaded model.
+
+    New incidents are classified at ingest by rss_collector, so this pass
+    only does work after a retrain (or for rows ingested without a model).
+    Used by run_pipeline.py
+    """
+    ensure_models()
+    if MODEL_VERSION is None:
+        # unversioned model: "!= None" would match every row, and rows
+        # classified by it would stay NULL and be redone on every run
+        print("🧠 No model_version recorded (drift_state.json); skipping reclassification")
+        return 0
+    classified_count = 0
+    last_id = 0
+
+    while True:
+        db = SessionLocal()
+        try:
+            ids = [
+                r[0]
+                for r in db.query(Incident.id)
+                .filter(
+                    Incident.id > last_id,
+                    or_(
+                        Incident.model_version.is_(None),
+                        Incident.model_version != MODEL_VERSION,
+                    ),
+                )
+                .order_by(Incident.id)
+                .limit(batch_size)
+                .all()
+            ]
+        finally:
+            db.close()
+
+        if not ids:
+            break
+        classified_count += classify_incidents(ids, executor=executor)
+        last_id = ids[-1]
+
+    print(f"🧠 Classified {classified_count} new incidents")
+    return classified_count
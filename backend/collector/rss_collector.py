@@ -2,25 +2,41 @@
 RSS Collector with:
 - Govt + trusted sources
 - Deduplication
-- Optional ML-based priority prediction
+- Optional ML classification at ingest (one batch per feed)
+- Entity extraction (CVE / APT / vendor / IOC) into incident_entities
+- Summary bodies stored once per distinct text in incident_texts
+- Alert rules matched against each stored batch (backend/alerts.py)
 - Retention policy (1 month / 2 months for HIGH/CRITICAL)
 """
 
-import feedparser
-import html
-import time
-import os
 from datetime import datetime, timedelta
 
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select
 
 from backend.database import init_db, SessionLocal
-from backend.models import Incident
+from backend.models import Incident, IncidentEntity
+from backend.collector.entity_extractor import entity_rows, extract_batch, store_entities
+from backend.collector.feed_fetcher import iter_entries
+from backend.collector import sharding
+from backend import alerts, hot_window, metrics, scoring, text_store
 
-import joblib
+ENTRIES = metrics.counter(
+    "cybernow_collector_entries_total", "Feed entries seen, by outcome"
+)
+FEED_ERRORS = metrics.counter(
+    "cybernow_collector_feed_errors_total", "Feeds that failed to fetch or insert"
+)
+LEASES = metrics.counter(
+    "cybernow_collector_leases_total", "Feed lease attempts, by outcome"
+)
 
 # ================== FEEDS ==================
+ENTRIES_PER_FEED = 25   # newest unseen entries taken per poll
+
+# polled feeds; incidents.source is the feed URL, so changing one breaks
+# dedup against what's stored. Scoring and the classifier's source priors
+# take each feed's category from collector_sources.source_category().
 FEEDS = [
     "https://www.cert-in.org.in/rss.xml",
     "https://pib.gov.in/AllReleaseRSS.aspx?Language=0",
@@ -29,34 +45,34 @@ FEEDS = [
     "https://threatpost.com/feed/",
 ]
 
-# ================== ML ARTIFACTS (OPTIONAL) ==================
-BASE_DIR = os.path.dirname(__file__)
-MODEL_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "ml"))
+# ================== ML CLASSIFIER (OPTIONAL) ==================
+# New entries are classified (and scored) in one batch per feed before
+# insert, so category/priority/sector/anomaly/threat score land in the
+# same write. The models are loaded by the first batch, so polls that
+# find nothing new never load sklearn.
+try:
+    from backend.collector.ml_classifier import classify_batch, ensure_models, incident_fields
+except Exception as e:
+    print("Classifier unavailable, storing entries unclassified:", e)
+    classify_batch = ensure_models = incident_fields = None
 
-MODEL_PATH = os.path.join(MODEL_DIR, "model.joblib")
-VECT_PATH = os.path.join(MODEL_DIR, "vectorizer.joblib")
+# ================== RETENTION ==================
+RETENTION_DAYS = 30          # LOW / MEDIUM
+HIGH_RETENTION_DAYS = 60     # HIGH / CRITICAL
+LONG_RETENTION = ("HIGH", "CRITICAL")
 
-clf = vec = None
 
-try:
-    if os.path.exists(MODEL_PATH):
-        clf = joblib.load(MODEL_PATH)
-    if os.path.exists(VECT_PATH):
-        vec = joblib.load(VECT_PATH)
-except Exception:
-    clf = vec = None
-
-# ================== HELPERS ==================
-def clean_text(s):
-    if not s:
-        return ""
-    return html.unescape(s).strip()
+def is_expired(row, now=None):
+    """True when cleanup_old_incidents() would delete this row dict."""
+    age = (now or datetime.utcnow()) - row["timestamp"]
+    days = HIGH_RETENTION_DAYS if row.get("priority") in LONG_RETENTION else RETENTION_DAYS
+    return age > timedelta(days=days)
+
 
-# ================== RETENTION ==================
 def cleanup_old_incidents(db):
     now = datetime.utcnow()
-    one_month = now - timedelta(days=30)
-    two_months = now - timedelta(days=60)
+    one_month = now - timedelta(days=RETENTION_DAYS)
+    two_months = now - timedelta(days=HIGH_RETENTION_DAYS)
 
     deleted = (
         db.query(Incident)
@@ -65,7 +81,7 @@ def cleanup_old_incidents(db):
                 Incident.timestamp < two_months,
                 and_(
                     Incident.timestamp < one_month,
-                    Incident.priority.notin_(["HIGH", "CRITICAL"])
+                    Incident.priority.notin_(LONG_RETENTION)
                 )
             )
         )
@@ -73,85 +89,192 @@ def cleanup_old_incidents(db):
     )
 
     if deleted:
+        db.query(IncidentEntity).filter(
+            IncidentEntity.incident_id.notin_(db.query(Incident.id))
+        ).delete(synchronize_session=False)
+        text_store.purge_orphans(db)
         print(f"🧹 Retention cleanup removed {deleted} old incidents")
 
-# ================== MAIN ==================
-def run_once():
-    init_db()
-    db = SessionLocal()
+# ================== INSERT ==================
+def entry_row(source, entry):
+    """Incident row dict for a parsed feed entry, before classification."""
+    return {
+        "source": source,
+        "external_id": entry["id"],
+        "title": entry["title"],
+        "summary": entry["summary"],
+        "url": entry["link"],
+        "timestamp": entry["published"] or datetime.utcnow(),
+        "priority": None,
+        "category": None,
+        "sector": None,
+        "geo_scope": "Global",
+        "is_mitigated": False,
+    }
+
 
+def classify_rows(rows):
+    """Classify row dicts in place, in one batch (no-op without a classifier)."""
+    global classify_batch
+    if not (classify_batch and rows):
+        return
     try:
-        cleanup_old_incidents(db)
+        ensure_models()
+    except Exception as e:
+        print("Classifier unavailable, storing entries unclassified:", e)
+        classify_batch = None
+        return
+    try:
+        texts = [f"{r['title']} {r['summary']}".strip() for r in rows]
+        sources = [r["source"] for r in rows]
+        for row, result in zip(rows, classify_batch(texts, sources)):
+            row.update(incident_fields(result))
+    except Exception as e:
+        print("Classification failed, storing entries unclassified:", e)
 
-        for feed_url in FEEDS:
-            try:
-                feed = feedparser.parse(feed_url)
-            except Exception as e:
-                print("Feed error:", feed_url, e)
-                continue
 
-            for entry in feed.entries[:25]:
-                title = clean_text(entry.get("title"))
-                summary = clean_text(entry.get("summary") or entry.get("description"))
-                link = entry.get("link")
-                ext_id = entry.get("id") or link
+def _extract_entities(rows):
+    return extract_batch(f"{r['title']} {r['summary']}" for r in rows)
 
-                if not ext_id:
-                    continue
 
-                # Deduplication
-                exists = (
-                    db.query(Incident)
-                    .filter(Incident.external_id == ext_id)
-                    .first()
-                )
-                if exists:
+def _incident(row, text_hash):
+    """Incident for a row dict (its summary is stored in incident_texts)."""
+    return Incident(**{k: v for k, v in row.items() if k != "summary"}, text_hash=text_hash)
+
+
+def insert_incidents(db, rows, entities=None):
+    """
+    Insert a feed's new rows (and their extracted entities) in one
+    transaction. If a concurrent writer already stored one of them,
+    retry row by row so the rest still land. Returns the new incident ids
+    (and sets row["id"] on the rows that were stored).
+    """
+    entities = entities or [()] * len(rows)
+    hashes = text_store.store(db, [r.get("summary") for r in rows])
+    incidents = [_incident(row, h) for row, h in zip(rows, hashes)]
+    try:
+        db.add_all(incidents)
+        db.flush()
+        ids = [inc.id for inc in incidents]
+        store_entities(db, [
+            e for inc, found in zip(incidents, entities)
+            for e in entity_rows(inc.id, inc.timestamp, found)
+        ])
+        db.commit()
+        for row, new_id in zip(rows, ids):
+            row["id"] = new_id
+        return ids
+    except IntegrityError:
+        db.rollback()
+
+    new_ids = []
+    for row, found in zip(rows, entities):
+        try:
+            inc = _incident(row, text_store.store(db, [row.get("summary")])[0])
+            db.add(inc)
+            db.flush()
+            new_id = inc.id
+            store_entities(db, entity_rows(new_id, inc.timestamp, found))
+            db.commit()
+            row["id"] = new_id
+            new_ids.append(new_id)
+        except IntegrityError:
+            db.rollback()
+    return new_ids
+
+
+# ================== MAIN ==================
+def collect_feed(db, feed_url):
+    """Fetch, classify and store one feed. Returns the new incident ids."""
+    with metrics.span("collect.dedup", feed=feed_url):
+        # one indexed read per feed instead of a query per entry
+        known = set(db.scalars(
+            select(Incident.external_id).where(Incident.source == feed_url)
+        ))
+
+    rows = []
+    seen = set()
+    try:
+        with metrics.span("collect.fetch", feed=feed_url):
+            for entry, is_new in iter_entries(feed_url, known, limit=ENTRIES_PER_FEED):
+                ext_id = entry["id"]
+                if not is_new or ext_id in seen:
+                    ENTRIES.inc(outcome="duplicate")
                     continue
+                seen.add(ext_id)
+                rows.append(entry_row(feed_url, entry))
+    except Exception as e:
+        # FeedError, or anything else a broken feed raises: skip this feed only
+        FEED_ERRORS.inc(stage="fetch")
+        print("Feed error:", feed_url, e)
+        return []
 
-                # Timestamp
-                ts = datetime.utcnow()
-                try:
-                    if entry.get("published_parsed"):
-                        ts = datetime(*entry.published_parsed[:6])
-                except Exception:
-                    pass
-
-                # Optional ML-based priority prediction
-                priority = None
-                try:
-                    if clf and vec:
-                        X = vec.transform([summary or title])
-                        priority = clf.predict(X)[0]
-                except Exception:
-                    pass
-
-                inc = Incident(
-                    source=feed_url,
-                    external_id=ext_id,
-                    title=title,
-                    summary=summary,
-                    description=summary,
-                    url=link,
-                    timestamp=ts,
-                    priority=priority,
-                    category=None,
-                    sector=None,
-                    geo_scope="Global",
-                    is_mitigated=False,
-                )
+    with metrics.span("collect.classify", feed=feed_url, rows=len(rows)):
+        classify_rows(rows)
+        scoring.score_fields(rows)
+
+    # already past retention: cleanup would delete them and the next poll
+    # would insert them again under new ids (double-counted downstream)
+    now = datetime.utcnow()
+    fresh = [r for r in rows if not is_expired(r, now)]
+    if len(fresh) < len(rows):
+        ENTRIES.inc(len(rows) - len(fresh), outcome="expired")
+    rows = fresh
+
+    with metrics.span("collect.extract", feed=feed_url, rows=len(rows)):
+        entities = _extract_entities(rows)
+
+    try:
+        with metrics.span("collect.commit", feed=feed_url, rows=len(rows)):
+            ids = insert_incidents(db, rows, entities)
+        ENTRIES.inc(len(ids), outcome="new")
+        stored = [r for r in rows if "id" in r]
+        hot_window.publish(stored)
+        # unclassified rows alert once the classifier has labelled them
+        alerts.dispatch(db, [r for r in stored if r.get("model_version")])
+        return ids
+    except Exception as e:
+        db.rollback()
+        FEED_ERRORS.inc(stage="insert")
+        print("Insert failed:", feed_url, e)
+        return []
 
-                try:
-                    db.add(inc)
-                    db.commit()
-                except IntegrityError:
-                    db.rollback()
-                except Exception as e:
-                    db.rollback()
-                    print("Insert failed:", e)
 
-                time.sleep(0.05)
+@metrics.timed("collect.run_once")
+def run_once(feeds=None, lease_owner=None, min_interval=0):
+    """
+    Poll every feed once. Returns the ids of newly inserted incidents.
+
+    With `lease_owner`, each feed is polled only after taking its
+    collector lease (see sharding.py), so concurrent collectors never
+    poll the same feed within `min_interval` seconds.
+    """
+    init_db()
+    db = SessionLocal()
+    new_ids = []
+    feeds = FEEDS if feeds is None else feeds
+
+    try:
+        with metrics.span("collect.retention"):
+            cleanup_old_incidents(db)
+            db.commit()
+
+        if lease_owner:
+            sharding.ensure_sources(db, feeds)
+
+        for feed_url in feeds:
+            if lease_owner and not sharding.acquire(db, feed_url, lease_owner, min_interval):
+                LEASES.inc(outcome="skipped")
+                continue
+            try:
+                new_ids.extend(collect_feed(db, feed_url))
+            finally:
+                if lease_owner:
+                    LEASES.inc(outcome="polled")
+                    sharding.release(db, feed_url, lease_owner)
 
         print("Collector run completed.")
+        return new_ids
 
     finally:
         db.close()
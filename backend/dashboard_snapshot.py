@@ -0,0 +1,178 @@
+# backend/dashboard_snapshot.py
+"""
+Everything the dashboard shows on page load, computed together:
+summary cards, threat distribution, 14-day trend, ML status and the
+live feed. Three indexed/aggregate queries instead of ~8, and
+drift_state.json is re-read only when its mtime changes.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import case, func
+
+from .models import Incident
+from .serialization import dumps
+from . import hot_window, text_store
+
+ML_DIR = Path(__file__).resolve().parent / "ml"
+DRIFT_STATE = ML_DIR / "drift_state.json"
+
+TREND_DAYS = 14
+LIVE_LIMIT = 50
+SNAPSHOT_TTL_SECONDS = 10
+
+_drift_cache = {"mtime": None, "state": None}
+_snapshot_lock = threading.Lock()
+_snapshot_cache = {"expires": 0.0, "entry": None}
+
+
+# ================== ML STATUS ==================
+def read_drift_state():
+    """drift_state.json contents, cached until the file changes."""
+    try:
+        mtime = DRIFT_STATE.stat().st_mtime
+    except OSError:
+        return None
+    if _drift_cache["mtime"] != mtime:
+        try:
+            state = json.loads(DRIFT_STATE.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        _drift_cache.update(mtime=mtime, state=state)
+    return _drift_cache["state"]
+
+
+def ml_status():
+    state = read_drift_state()
+    if state is None:
+        return {"status": "Not Trained", "drift_detected": False}
+    return {"status": "Active", "drift_detected": state.get("drift_detected", False)}
+
+
+# ================== QUERIES ==================
+def _summary_and_distribution(db, today_start, today_end):
+    """One GROUP BY scan → summary cards + category distribution."""
+    is_today = Incident.timestamp.between(today_start, today_end)
+    rows = (
+        db.query(
+            Incident.category,
+            Incident.sector,
+            func.count(Incident.id),
+            func.sum(case((is_today, 1), else_=0)),
+            func.sum(case((is_today & Incident.priority.in_(["HIGH", "CRITICAL"]), 1), else_=0)),
+            func.sum(case((Incident.is_mitigated.is_(True), 1), else_=0)),
+        )
+        .group_by(Incident.category, Incident.sector)
+        .all()
+    )
+
+    by_category = {}
+    sectors = set()
+    total_today = critical_today = mitigated = 0
+    for category, sector, n, today_n, critical_n, mitigated_n in rows:
+        by_category[category] = by_category.get(category, 0) + int(n)
+        if sector is not None:
+            sectors.add(sector)
+        total_today += int(today_n or 0)
+        critical_today += int(critical_n or 0)
+        mitigated += int(mitigated_n or 0)
+
+    summary = {
+        "total_threats_today": total_today,
+        "critical_incidents": critical_today,
+        "affected_sectors": len(sectors),
+        "threats_mitigated": mitigated,
+    }
+    distribution = [
+        {"label": c or "Unknown", "value": n} for c, n in by_category.items()
+    ]
+    return summary, distribution
+
+
+def recent_trends(db, today):
+    """Most recent TREND_DAYS days, via a timestamp index range scan."""
+    since = datetime.combine(today - timedelta(days=TREND_DAYS - 1), datetime.min.time())
+    day = func.date(Incident.timestamp)
+    rows = (
+        db.query(
+            day,
+            func.count(Incident.id),
+            func.sum(case((Incident.is_mitigated.is_(True), 1), else_=0)),
+        )
+        .filter(Incident.timestamp >= since)
+        .group_by(day)
+        .order_by(day)
+        .all()
+    )
+    return {
+        "labels": [str(d) for d, _, _ in rows],
+        "datasets": [
+            {"label": "Detected", "values": [int(n) for _, n, _ in rows]},
+            {"label": "Mitigated", "values": [int(m or 0) for _, _, m in rows]},
+        ],
+    }
+
+
+def _live(db):
+    items = hot_window.live(LIVE_LIMIT)
+    if items is not None:
+        return items
+    rows = (
+        db.query(
+            Incident.title, Incident.text_hash, Incident.timestamp,
+            Incident.priority, Incident.url,
+        )
+        .order_by(Incident.timestamp.desc())
+        .limit(LIVE_LIMIT)
+        .all()
+    )
+    summaries = text_store.fetch(db, [r.text_hash for r in rows])
+    return [
+        {
+            "title": title,
+            "summary": summaries.get(text_hash),
+            "timestamp": ts.isoformat() if ts else None,
+            "priority": priority or "LOW",
+            "url": url,
+        }
+        for title, text_hash, ts, priority, url in rows
+    ]
+
+
+# ================== SNAPSHOT ==================
+def build_snapshot(db):
+    hot_window.refresh(db)
+    today = date.today()
+    today_start = datetime.combine(today, datetime.min.time())
+    today_end = datetime.combine(today, datetime.max.time())
+
+    summary, distribution = _summary_and_distribution(db, today_start, today_end)
+    return {
+        "summary": summary,
+        "threat_distribution": distribution,
+        "trends": recent_trends(db, today),
+        "ml_status": ml_status(),
+        "live": _live(db),
+    }
+
+
+def get_snapshot(db):
+    """
+    Cached snapshot dict (with a content "version"). Recomputed at most
+    every SNAPSHOT_TTL_SECONDS, so concurrent dashboards share one build.
+    """
+    now = time.monotonic()
+    with _snapshot_lock:
+        if _snapshot_cache["entry"] and now < _snapshot_cache["expires"]:
+            return _snapshot_cache["entry"]
+
+        snapshot = build_snapshot(db)
+        snapshot["version"] = hashlib.sha1(dumps(snapshot)).hexdigest()[:16]
+
+        _snapshot_cache.update(entry=snapshot, expires=now + SNAPSHOT_TTL_SECONDS)
+        return snapshot
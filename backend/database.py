@@ -1,22 +1,44 @@
 # backend/database.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, declarative_base, scoped_session
 import os
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "cybernow.db")
 
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+# CYBERNOW_DATABASE_URL points tools (benchmarks, scratch runs) at another DB
+SQLALCHEMY_DATABASE_URL = os.environ.get(
+    "CYBERNOW_DATABASE_URL", f"sqlite:///{DB_PATH}"
+)
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    # pipeline workers share the file; wait on locks instead of failing
+    connect_args={"check_same_thread": False, "timeout": 30}
 )
 
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _):
+    if engine.dialect.name != "sqlite":
+        return
+    # WAL lets API readers run while the collector writes
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# thread-local session for web requests; the app removes it on teardown
+db_session = scoped_session(SessionLocal)
 Base = declarative_base()
 
 def init_db():
+    """Create missing tables and apply pending upgrades (automation/db_migrate.py)."""
     from .models import Incident
+    from .automation import db_migrate
     Base.metadata.create_all(bind=engine)
+    db_migrate.upgrade()
     print("Database initialized.")
\ No newline at end of file
@@ -0,0 +1,20 @@
+# backend/gunicorn.conf.py
+# Production serving: gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get("CYBERNOW_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("CYBERNOW_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("CYBERNOW_THREADS", "4"))
+worker_class = "gthread"
+timeout = 30
+keepalive = 5
+
+# import the app once in the master; workers fork from it
+preload_app = True
+
+
+def post_fork(server, worker):
+    # never share the master's SQLite connections across processes
+    from backend.database import engine
+    engine.dispose(close=False)
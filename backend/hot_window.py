@@ -0,0 +1,236 @@
+# backend/hot_window.py
+"""
+Process-local hot window of recent incidents (last WINDOW_HOURS).
+
+Incidents are kept as compact tuples in a list sorted by (timestamp, id)
+with per-day counters by priority / category / sector / mitigated, so
+the live feed and "today" numbers are answered from memory.
+
+Keeping it current:
+- rebuild(): full load of the window (startup, or after a retrain
+  changed labels; detected through the model version)
+- refresh(db): throttled incremental load of ids > the newest seen id,
+  which picks up rows written by other processes (collector, pipeline)
+- publish(rows): in-process push from the collector / classifier right
+  after their commit
+
+Older ranges still come from the database.
+"""
+
+import bisect
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from .models import Incident
+from . import text_store
+
+WINDOW_HOURS = 48
+MAX_ITEMS = 50_000
+REFRESH_SECONDS = 2.0
+
+FIELDS = ("id", "timestamp", "title", "summary", "url",
+          "priority", "category", "sector", "is_mitigated")
+ID, TS, TITLE, SUMMARY, URL, PRIORITY, CATEGORY, SECTOR, MITIGATED = range(len(FIELDS))
+COUNTED = {"priority": PRIORITY, "category": CATEGORY, "sector": SECTOR}
+
+_lock = threading.RLock()
+_items = []          # tuples, sorted by (timestamp, id)
+_keys = []           # (timestamp, id), parallel to _items for bisect
+_by_id = {}
+_counts = defaultdict(Counter)   # (date, field) → Counter(value)
+_state = {"built": False, "max_id": 0, "model_version": None,
+          "checked_at": 0.0, "version": 0}
+
+
+# ================== INTERNAL ==================
+def _cutoff(now=None):
+    return (now or datetime.utcnow()) - timedelta(hours=WINDOW_HOURS)
+
+
+def _count(item, delta):
+    day = item[TS].date()
+    for field, idx in COUNTED.items():
+        _counts[(day, field)][item[idx] or "Unknown"] += delta
+    _counts[(day, "total")]["all"] += delta
+    if item[MITIGATED]:
+        _counts[(day, "mitigated")]["all"] += delta
+
+
+def _remove(item_id):
+    old = _by_id.pop(item_id, None)
+    if old is None:
+        return
+    i = bisect.bisect_left(_keys, (old[TS], old[ID]))
+    del _items[i]
+    del _keys[i]
+    _count(old, -1)
+
+
+def _add(item, cutoff):
+    if item[TS] is None or item[TS] < cutoff:
+        return False
+    _remove(item[ID])
+    key = (item[TS], item[ID])
+    i = bisect.bisect_right(_keys, key)
+    _items.insert(i, item)
+    _keys.insert(i, key)
+    _by_id[item[ID]] = item
+    _count(item, +1)
+    _state["max_id"] = max(_state["max_id"], item[ID])
+    return True
+
+
+def _evict(cutoff):
+    n = bisect.bisect_left(_keys, (cutoff, -1))
+    n = max(n, len(_items) - MAX_ITEMS)
+    if n <= 0:
+        return
+    for item in _items[:n]:
+        del _by_id[item[ID]]
+        _count(item, -1)
+    del _items[:n]
+    del _keys[:n]
+    for key in [k for k, c in _counts.items() if not +c]:
+        del _counts[key]
+
+
+def _as_item(row):
+    get = row.get if isinstance(row, dict) else (lambda f: getattr(row, f))
+    return tuple(
+        bool(get(f)) if f == "is_mitigated" else get(f) for f in FIELDS
+    )
+
+
+_DB_FIELDS = tuple(f for f in FIELDS if f != "summary")
+
+
+def _query(db, after_id=0, cutoff=None):
+    stmt = (
+        text_store.outerjoin(
+            select(*(getattr(Incident, f) for f in _DB_FIELDS), *text_store.JOIN_COLUMNS)
+        )
+        .where(Incident.timestamp >= cutoff, Incident.id > after_id)
+    )
+    return [
+        {**dict(zip(_DB_FIELDS, row)), "summary": text_store.decode(row.codec, row.body)}
+        for row in db.execute(stmt)
+    ]
+
+
+def _model_version():
+    from .dashboard_snapshot import read_drift_state
+    state = read_drift_state() or {}
+    return state.get("model_version")
+
+
+# ================== UPDATES ==================
+def rebuild(db=None):
+    """Reload the whole window from the database."""
+    from .database import SessionLocal
+
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        cutoff = _cutoff()
+        rows = _query(db, cutoff=cutoff)
+        with _lock:
+            _items.clear()
+            _keys.clear()
+            _by_id.clear()
+            _counts.clear()
+            _state["max_id"] = 0
+            for row in rows:
+                _add(_as_item(row), cutoff)
+            _evict(cutoff)
+            _state.update(built=True, model_version=_model_version(),
+                          checked_at=time.monotonic())
+            _state["version"] += 1
+        return len(_items)
+    finally:
+        if own_session:
+            db.close()
+
+
+def refresh(db, force=False):
+    """Build on first use, then pick up new rows at most every REFRESH_SECONDS."""
+    now = time.monotonic()
+    if not _state["built"] or _model_version() != _state["model_version"]:
+        return rebuild(db)
+    if not force and now - _state["checked_at"] < REFRESH_SECONDS:
+        return 0
+
+    cutoff = _cutoff()
+    rows = _query(db, after_id=_state["max_id"], cutoff=cutoff)
+    with _lock:
+        added = sum(_add(_as_item(r), cutoff) for r in rows)
+        before = len(_items)
+        _evict(cutoff)
+        if added or len(_items) != before:
+            _state["version"] += 1
+        _state["checked_at"] = now
+    return added
+
+
+def publish(rows):
+    """Push committed incidents (dicts or Incident objects with ids) into the window."""
+    if not _state["built"] or not rows:
+        return 0
+    cutoff = _cutoff()
+    with _lock:
+        added = sum(_add(_as_item(r), cutoff) for r in rows)
+        if added:
+            _state["version"] += 1
+    return added
+
+
+# ================== READS ==================
+def version():
+    """Changes whenever the window contents do (use as a cache key)."""
+    return _state["version"]
+
+
+def live(limit=50):
+    """
+    Newest `limit` incidents as dicts, or None when the window holds
+    fewer (older rows may exist → caller falls back to the DB).
+    """
+    with _lock:
+        if len(_items) < limit:
+            return None
+        newest = _items[-limit:]
+    return [
+        {
+            "title": it[TITLE],
+            "summary": it[SUMMARY],
+            "timestamp": it[TS].isoformat(),
+            "priority": it[PRIORITY] or "LOW",
+            "url": it[URL],
+        }
+        for it in reversed(newest)
+    ]
+
+
+def day_counts(day):
+    """Counts for one calendar day inside the window."""
+    with _lock:
+        return {
+            "total": _counts[(day, "total")]["all"],
+            "mitigated": _counts[(day, "mitigated")]["all"],
+            "by_priority": dict(+_counts[(day, "priority")]),
+            "by_category": dict(+_counts[(day, "category")]),
+            "by_sector": dict(+_counts[(day, "sector")]),
+        }
+
+
+def stats():
+    with _lock:
+        return {
+            "items": len(_items),
+            "max_id": _state["max_id"],
+            "oldest": _keys[0][0].isoformat() if _keys else None,
+            "version": _state["version"],
+        }
@@ -0,0 +1,243 @@
+# backend/metrics.py
+"""
+In-process metrics with Prometheus text exposition, plus optional
+span tracing.
+
+- counter(), gauge(), histogram() return process-wide metrics
+- span("collect.fetch") / @timed(...) time a block into
+  cybernow_stage_duration_seconds, track it in cybernow_stage_in_flight
+  and, when CYBERNOW_TRACE_FILE is set, append one JSON line per span
+  to that file
+- render() produces the /metrics text; serve() exposes it from
+  processes without Flask (the pipeline)
+"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_FILE = os.environ.get("CYBERNOW_TRACE_FILE")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0
+)
+
+_lock = threading.Lock()
+_registry = {}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+# ================== METRIC TYPES ==================
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, doc):
+        self.name, self.doc = name, doc
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        return [(self.name, key, (), v) for key, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[_label_key(labels)] = value
+
+    def clear(self):
+        with _lock:
+            self._values.clear()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, doc, buckets=DEFAULT_BUCKETS):
+        self.name, self.doc = name, doc
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    counts[i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        out = []
+        for key, (counts, total, n) in self._values.items():
+            for upper, c in zip(self.buckets, counts):
+                out.append((self.name + "_bucket", key, (("le", _format_value(upper)),), c))
+            out.append((self.name + "_bucket", key, (("le", "+Inf"),), n))
+            out.append((self.name + "_sum", key, (), total))
+            out.append((self.name + "_count", key, (), n))
+        return out
+
+
+def _get_or_create(cls, name, doc, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, doc, **kwargs)
+        return metric
+
+
+def counter(name, doc=""):
+    return _get_or_create(Counter, name, doc)
+
+
+def gauge(name, doc=""):
+    return _get_or_create(Gauge, name, doc)
+
+
+def histogram(name, doc="", buckets=DEFAULT_BUCKETS):
+    return _get_or_create(Histogram, name, doc, buckets=buckets)
+
+
+# ================== SPANS ==================
+STAGE_SECONDS = histogram(
+    "cybernow_stage_duration_seconds", "Time spent in a pipeline stage"
+)
+STAGE_IN_FLIGHT = gauge(
+    "cybernow_stage_in_flight", "Pipeline stages currently executing"
+)
+STAGE_ERRORS = counter(
+    "cybernow_stage_errors_total", "Pipeline stages that raised"
+)
+
+_span_ids = itertools.count(1)
+_local = threading.local()
+_trace_lock = threading.Lock()
+
+
+def _write_trace(record):
+    with _trace_lock:
+        with open(TRACE_FILE, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time a block as `stage`. Extra keyword args go to the trace only."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    span_id = next(_span_ids)
+    parent = stack[-1] if stack else None
+    stack.append(span_id)
+
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start_wall = time.time()
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        stack.pop()
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if TRACE_FILE:
+            _write_trace({
+                "span": span_id,
+                "parent": parent,
+                "pid": os.getpid(),
+                "thread": threading.current_thread().name,
+                "stage": stage,
+                "start": start_wall,
+                "duration_ms": round(elapsed * 1000, 3),
+                "error": error,
+                **attrs,
+            })
+
+
+def timed(stage: str):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ================== EXPOSITION ==================
+def render() -> str:
+    lines = []
+    with _lock:
+        for name in sorted(_registry):
+            metric = _registry[name]
+            if metric.doc:
+                lines.append(f"# HELP {name} {metric.doc}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample, key, extra, value in metric.samples():
+                lines.append(f"{sample}{_format_labels(key, extra)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, host: str = "0.0.0.0"):
+    """Expose /metrics on `port` from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,267 @@
+# backend/ml/benchmark.py
+"""
+Compare the inference model families on a held-out split of our incidents:
+load time, artifact size, load memory, per-batch latency and accuracy.
+
+--anomaly compares anomaly scoring instead: the isolation forest on raw
+TF-IDF (sparse, and densified as the legacy predict.py did) against the
+forest on the SVD embedding (fit time/memory, artifact size, per-batch
+scoring latency and memory).
+
+Run as: python -m backend.ml.benchmark [--anomaly] [--batch-size 64] [--json out.json]
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import train_test_split
+
+from ..database import init_db, SessionLocal
+from . import embedding
+from .train import (
+    _load_training_data,
+    build_classifier,
+    fit_inference_models,
+)
+
+TEST_SIZE = 0.25
+LATENCY_ROUNDS = 20
+
+
+def _split(texts, labels):
+    try:
+        return train_test_split(
+            texts, labels, test_size=TEST_SIZE, random_state=42, stratify=labels
+        )
+    except ValueError:
+        # a label with a single example cannot be stratified
+        return train_test_split(
+            texts, labels, test_size=TEST_SIZE, random_state=42
+        )
+
+
+def _measure_load(path: Path):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    model = joblib.load(path)
+    load_s = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return model, load_s, peak
+
+
+def _measure_latency(model, X, batch_size: int):
+    batches = [X[i:i + batch_size] for i in range(0, X.shape[0], batch_size)]
+    timings = []
+    for _ in range(LATENCY_ROUNDS):
+        for batch in batches:
+            t0 = time.perf_counter()
+            model.predict_proba(batch)
+            timings.append(time.perf_counter() - t0)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000,
+    }
+
+
+def run_benchmark(batch_size: int = 64):
+    init_db()
+    db = SessionLocal()
+    try:
+        texts, labels = _load_training_data(db)
+    finally:
+        db.close()
+
+    if len(texts) < 8:
+        print("Not enough labelled data to benchmark (need >=8).")
+        return None
+
+    train_texts, test_texts, train_labels, test_labels = _split(texts, labels)
+
+    vec = TfidfVectorizer(max_features=10000, ngram_range=(1, 2))
+    X_train = vec.fit_transform(train_texts)
+    X_test = vec.transform(test_texts)
+
+    forest = build_classifier()
+    forest.fit(X_train, train_labels)
+    models = {"forest": forest, **fit_inference_models(forest, X_train, train_labels)}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, model in models.items():
+            path = Path(tmp) / f"{name}.joblib"
+            joblib.dump(model, path)
+
+            loaded, load_s, load_peak = _measure_load(path)
+            results[name] = {
+                "file_bytes": path.stat().st_size,
+                "load_ms": load_s * 1000,
+                "load_peak_bytes": load_peak,
+                "batch_size": batch_size,
+                **_measure_latency(loaded, X_test, batch_size),
+                "accuracy": float(loaded.score(X_test, test_labels)),
+            }
+
+    return {
+        "train_rows": len(train_texts),
+        "test_rows": len(test_texts),
+        "models": results,
+    }
+
+
+def _traced(fn):
+    """(result, seconds, peak traced bytes) of fn()."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _score_latency(score, X, batch_size: int):
+    batches = [X[i:i + batch_size] for i in range(0, X.shape[0], batch_size)]
+    timings = []
+    for _ in range(LATENCY_ROUNDS):
+        for batch in batches:
+            t0 = time.perf_counter()
+            score(batch)
+            timings.append(time.perf_counter() - t0)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings) * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000,
+    }
+
+
+def _iforest(seed=42):
+    return IsolationForest(n_estimators=200, contamination=0.05, random_state=seed)
+
+
+def _seed_agreement(X_train, X_test, scores):
+    """Correlation with a forest grown from another seed: how much of a score is noise."""
+    other = _iforest(seed=7).fit(X_train).score_samples(X_test)
+    return float(np.corrcoef(scores, other)[0, 1])
+
+
+def run_anomaly_benchmark(batch_size: int = 64):
+    init_db()
+    db = SessionLocal()
+    try:
+        texts, labels = _load_training_data(db)
+    finally:
+        db.close()
+
+    if len(texts) < 8:
+        print("Not enough labelled data to benchmark (need >=8).")
+        return None
+
+    train_texts, test_texts, _, _ = _split(texts, labels)
+    vec = TfidfVectorizer(max_features=10000, ngram_range=(1, 2))
+    X_train = vec.fit_transform(train_texts)
+    X_test = vec.transform(test_texts)
+
+    sparse_if, sparse_fit_s, sparse_fit_peak = _traced(lambda: _iforest().fit(X_train))
+    (bundle, Z_train), embed_fit_s, embed_fit_peak = _traced(lambda: embedding.fit(X_train))
+    embed_if, embed_if_s, embed_if_peak = _traced(lambda: _iforest().fit(Z_train))
+
+    variants = {
+        "tfidf_sparse": (sparse_if, lambda b: sparse_if.score_samples(b)),
+        "tfidf_densified": (sparse_if, lambda b: sparse_if.score_samples(b.toarray())),
+        "svd_embedding": (
+            {"iforest": embed_if, "embedding": bundle},
+            lambda b: embed_if.score_samples(embedding.transform(bundle, b)),
+        ),
+    }
+    fit = {
+        "tfidf_sparse": (sparse_fit_s, sparse_fit_peak),
+        "tfidf_densified": (sparse_fit_s, sparse_fit_peak),
+        "svd_embedding": (embed_fit_s + embed_if_s, max(embed_fit_peak, embed_if_peak)),
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (artifact, score) in variants.items():
+            path = Path(tmp) / f"{name}.joblib"
+            joblib.dump(artifact, path)
+            _, score_s, score_peak = _traced(lambda: score(X_test))
+            results[name] = {
+                "fit_s": fit[name][0],
+                "fit_peak_bytes": fit[name][1],
+                "file_bytes": path.stat().st_size,
+                "score_all_s": score_s,
+                "score_peak_bytes": score_peak,
+                "batch_size": batch_size,
+                **_score_latency(score, X_test, batch_size),
+            }
+    results["tfidf_sparse"]["seed_agreement"] = results["tfidf_densified"]["seed_agreement"] = (
+        _seed_agreement(X_train, X_test, sparse_if.score_samples(X_test))
+    )
+    Z_test = embedding.transform(bundle, X_test)
+    results["svd_embedding"]["seed_agreement"] = _seed_agreement(
+        Z_train, Z_test, embed_if.score_samples(Z_test)
+    )
+
+    return {
+        "train_rows": len(train_texts),
+        "test_rows": len(test_texts),
+        "tfidf_dim": X_train.shape[1],
+        "embedding_dim": bundle["dim"],
+        "variants": results,
+    }
+
+
+def _print_anomaly_table(report):
+    print(f"train={report['train_rows']} held-out={report['test_rows']} "
+          f"tfidf={report['tfidf_dim']} → embedding={report['embedding_dim']}")
+    print(f"{'variant':<18}{'fit s':>8}{'fit MB':>9}{'file KB':>10}"
+          f"{'score MB':>10}{'p50 ms':>9}{'p99 ms':>9}{'seed r':>8}")
+    for name, r in report["variants"].items():
+        print(
+            f"{name:<18}{r['fit_s']:>8.2f}{r['fit_peak_bytes'] / 1e6:>9.1f}"
+            f"{r['file_bytes'] / 1024:>10.1f}{r['score_peak_bytes'] / 1e6:>10.2f}"
+            f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['seed_agreement']:>8.2f}"
+        )
+
+
+def _print_table(report):
+    print(f"train={report['train_rows']} held-out={report['test_rows']}")
+    print(f"{'model':<16}{'file KB':>10}{'load ms':>10}{'load MB':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'acc':>8}")
+    for name, r in report["models"].items():
+        print(
+            f"{name:<16}{r['file_bytes'] / 1024:>10.1f}{r['load_ms']:>10.1f}"
+            f"{r['load_peak_bytes'] / 1e6:>10.2f}{r['p50_ms']:>10.2f}"
+            f"{r['p99_ms']:>10.2f}{r['accuracy']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--anomaly", action="store_true",
+                        help="benchmark anomaly scoring (TF-IDF vs SVD embedding)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.anomaly:
+        report = run_anomaly_benchmark(args.batch_size)
+        if report:
+            _print_anomaly_table(report)
+    else:
+        report = run_benchmark(args.batch_size)
+        if report:
+            _print_table(report)
+    if report and args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
@@ -0,0 +1,73 @@
+# backend/ml/embedding.py
+"""
+Compact dense embedding of the TF-IDF space.
+
+TruncatedSVD (LSA) down to EMBED_DIM components, then L2-normalised, so
+a dot product of two embeddings is their cosine similarity. Fitted by
+train.py next to the vectorizer and saved as embedding.joblib:
+
+    {"embedder": Pipeline(svd, normalizer), "centroid": unit mean vector,
+     "dim": EMBED_DIM}
+
+The isolation forest and drift statistics run on these vectors instead
+of the 10k-wide sparse rows (nothing is ever densified at full width).
+
+sklearn and joblib are imported inside the functions that need them, so
+importing this module (the collector does) costs numpy only.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+ML_DIR = Path(__file__).resolve().parent
+EMBEDDING_FILE = ML_DIR / "embedding.joblib"
+
+EMBED_DIM = 64
+
+
+def fit(X, dim=EMBED_DIM):
+    """Fit on the training TF-IDF matrix. Returns (bundle, embeddings)."""
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import Normalizer
+
+    dim = max(1, min(dim, X.shape[1] - 1, X.shape[0] - 1))
+    embedder = make_pipeline(
+        TruncatedSVD(n_components=dim, random_state=42),
+        Normalizer(copy=False),
+    )
+    Z = embedder.fit_transform(X).astype(np.float32)
+    bundle = {"embedder": embedder, "centroid": centroid(Z), "dim": dim}
+    return bundle, Z
+
+
+def transform(bundle, X):
+    """TF-IDF rows → unit-length float32 embeddings."""
+    return bundle["embedder"].transform(X).astype(np.float32, copy=False)
+
+
+def centroid(Z):
+    mean = Z.mean(axis=0)
+    norm = np.linalg.norm(mean)
+    return mean / norm if norm else mean
+
+
+def centroid_shift(bundle, Z):
+    """1 - cosine(training centroid, centroid of Z); 0 = same topic mix."""
+    if not len(Z):
+        return 0.0
+    return float(1.0 - np.dot(bundle["centroid"], centroid(Z)))
+
+
+def save(bundle, path=None):
+    import joblib
+
+    joblib.dump(bundle, path or EMBEDDING_FILE)
+
+
+def load(path=None):
+    import joblib
+
+    path = Path(path or EMBEDDING_FILE)
+    return joblib.load(path) if path.exists() else None
@@ -0,0 +1,159 @@
+# backend/ml/fingerprint.py
+"""
+Training-set fingerprint, used by retrain_controller to skip retrains
+(or reduce them to a delta) when the labelled data hasn't meaningfully
+changed.
+
+A fingerprint covers the rows train.py learns from (id, label, and the
+content hash of the text, so no body is decompressed to build it) and
+holds the row count, max id, label counts and, per id partition of
+PARTITION_SIZE ids, a row count and an order-independent hash. It is
+written next to the model (train_fingerprint.json) after every
+successful training run.
+
+compare() recomputes the current fingerprint with `boundary` = the old
+max id, so old partitions are compared row-for-row and anything above
+the boundary is reported separately as appended rows. That split needs
+ids that are never reissued (incidents is AUTOINCREMENT, see
+automation/db_migrate.py); fingerprints from before that lack
+"monotonic_ids" and are not compared (is_current()).
+"""
+
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import select
+
+from ..models import Incident
+from .. import text_store
+
+ML_DIR = Path(__file__).resolve().parent
+FINGERPRINT_FILE = ML_DIR / "train_fingerprint.json"
+
+PARTITION_SIZE = 5000
+_MASK = (1 << 64) - 1
+
+
+# ================== BUILD ==================
+def training_rows_query(after_id=0, upto_id=None, with_text=False):
+    """The rows train.py trains on, in id order (with_text: + codec, body)."""
+    columns = [Incident.id, Incident.text_hash, Incident.title,
+               Incident.priority, Incident.source]
+    stmt = select(*columns)
+    if with_text:
+        stmt = text_store.outerjoin(select(*columns, *text_store.JOIN_COLUMNS))
+    stmt = (
+        stmt.where(Incident.priority.isnot(None), Incident.text_hash.isnot(None))
+        .where(Incident.id > after_id)
+        .order_by(Incident.id)
+    )
+    if upto_id is not None:
+        stmt = stmt.where(Incident.id <= upto_id)
+    return stmt
+
+
+def _row_hash(row_id, label, text):
+    digest = hashlib.blake2b(
+        f"{row_id}\x1f{label}\x1f{text}".encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def compute(rows, boundary=None):
+    """
+    Fingerprint of (id, label, text or text hash) rows. With `boundary`, rows with
+    id > boundary are summarised under "appended" instead of partitions.
+    """
+    partitions = {}
+    labels = Counter()
+    appended = Counter()
+    n = max_id = 0
+    for row_id, label, text in rows:
+        n += 1
+        max_id = max(max_id, row_id)
+        labels[label] += 1
+        if boundary is not None and row_id > boundary:
+            appended[label] += 1
+            continue
+        part = partitions.setdefault(str(row_id // PARTITION_SIZE), [0, 0])
+        part[0] += 1
+        part[1] = (part[1] + _row_hash(row_id, label, text)) & _MASK
+
+    fp = {
+        "rows": n,
+        "max_id": max_id,
+        "labels": dict(labels),
+        "monotonic_ids": True,
+        "partitions": {k: {"rows": r, "hash": f"{h:016x}"} for k, (r, h) in partitions.items()},
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if boundary is not None:
+        fp["boundary"] = boundary
+        fp["appended"] = {"rows": sum(appended.values()), "labels": dict(appended)}
+    return fp
+
+
+def from_db(db, boundary=None, upto_id=None):
+    rows = db.execute(training_rows_query(upto_id=upto_id))
+    return compute(
+        ((r.id, r.priority, r.text_hash) for r in rows), boundary
+    )
+
+
+def save(fp, path=None):
+    with open(path or FINGERPRINT_FILE, "w", encoding="utf-8") as fh:
+        json.dump(fp, fh, indent=2)
+
+
+def load(path=None):
+    try:
+        with open(path or FINGERPRINT_FILE, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+# ================== COMPARE ==================
+def is_current(fp):
+    """False for fingerprints taken while ids could still be reissued."""
+    return bool(fp and fp.get("monotonic_ids"))
+
+
+def compare(old, current):
+    """
+    Differences between the last training set and the current data
+    (`current` computed with boundary=old["max_id"]).
+    """
+    edited = removed = 0
+    changed_partitions = []
+    for key, before in old["partitions"].items():
+        after = current["partitions"].get(key, {"rows": 0, "hash": None})
+        if after["hash"] == before["hash"]:
+            continue
+        changed_partitions.append(key)
+        if after["rows"] < before["rows"]:
+            # rows deleted (retention); any edits in the same block are not separable
+            removed += before["rows"] - after["rows"]
+        else:
+            # same rows, different label/text (e.g. relabelled by a reclassify)
+            edited += after["rows"]
+
+    for key, after in current["partitions"].items():
+        if key not in old["partitions"]:
+            # old ids that became trainable later (labelled after the last run)
+            changed_partitions.append(key)
+            edited += after["rows"]
+
+    appended = current.get("appended", {"rows": 0, "labels": {}})
+    return {
+        "old_rows": old["rows"],
+        "rows": current["rows"],
+        "appended": appended["rows"],
+        "new_labels": sorted(set(current["labels"]) - set(old["labels"])),
+        "edited": edited,
+        "removed": removed,
+        "changed_partitions": changed_partitions,
+    }
@@ -0,0 +1,151 @@
+# backend/ml/source_priors.py
+"""
+Per-source label priors and calibration, computed by train.py from the
+training rows and their out-of-fold predictions.
+
+source_priors.json holds, per feed URL:
+- prior:       label distribution, shrunk toward the global distribution
+               by PRIOR_STRENGTH pseudo-counts
+- accuracy /   out-of-fold accuracy and mean confidence of the model on
+  mean_confidence   that source (calibration of recorded confidence)
+and a prior per registry source category (collector_sources.source_category)
+for feeds with little history of their own.
+
+At inference, ml_classifier combines the model probabilities with the
+source prior (p(c|x,s) ∝ p(c|x) · p(c|s) / p(c)). Sources whose labels
+are near-deterministic skip the model entirely.
+"""
+
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from ..collector.collector_sources import source_category
+
+ML_DIR = Path(__file__).resolve().parent
+PRIORS_FILE = ML_DIR / "source_priors.json"
+
+PRIOR_STRENGTH = 20          # pseudo-counts pulling small sources to the global prior
+MIN_SOURCE_SAMPLES = 10      # below this, fall back to the source-category prior
+SHORTCUT_MIN_SAMPLES = 50
+SHORTCUT_MIN_PROBABILITY = 0.97
+
+
+# ================== BUILD ==================
+def _shrunk(counts, n, global_prior, classes):
+    return {
+        c: (counts.get(c, 0) + PRIOR_STRENGTH * global_prior[c]) / (n + PRIOR_STRENGTH)
+        for c in classes
+    }
+
+
+def compute_priors(labels, sources, classes, oof_proba=None):
+    """
+    Priors (and, given out-of-fold probabilities aligned with `labels`,
+    calibration stats) per source and per registry source category.
+    """
+    classes = [str(c) for c in classes]
+    n_total = len(labels)
+    overall = Counter(labels)
+    global_prior = {c: overall.get(c, 0) / n_total for c in classes}
+
+    by_source = defaultdict(Counter)
+    by_category = defaultdict(Counter)
+    for label, source in zip(labels, sources):
+        by_source[source][label] += 1
+        category = source_category(source)
+        if category:
+            by_category[category][label] += 1
+
+    calibration = defaultdict(lambda: [0, 0.0, 0])  # correct, sum confidence, n
+    if oof_proba is not None:
+        predicted = np.asarray(classes)[oof_proba.argmax(axis=1)]
+        confidence = oof_proba.max(axis=1)
+        for source, label, pred, conf in zip(sources, labels, predicted, confidence):
+            stats = calibration[source]
+            stats[0] += int(pred == label)
+            stats[1] += float(conf)
+            stats[2] += 1
+
+    out_sources = {}
+    for source, counts in by_source.items():
+        n = sum(counts.values())
+        entry = {"n": n, "prior": _shrunk(counts, n, global_prior, classes)}
+        if source in calibration:
+            correct, conf_sum, m = calibration[source]
+            entry["accuracy"] = correct / m
+            entry["mean_confidence"] = conf_sum / m
+        out_sources[source] = entry
+
+    return {
+        "classes": classes,
+        "global": global_prior,
+        "sources": out_sources,
+        "source_categories": {
+            category: {
+                "n": sum(counts.values()),
+                "prior": _shrunk(counts, sum(counts.values()), global_prior, classes),
+            }
+            for category, counts in by_category.items()
+        },
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def save_priors(priors, path=None):
+    with open(path or PRIORS_FILE, "w", encoding="utf-8") as fh:
+        json.dump(priors, fh, indent=2)
+
+
+def load_priors(path=None):
+    try:
+        with open(path or PRIORS_FILE, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+# ================== INFERENCE ==================
+def lookup(priors, source):
+    """The usable prior entry for a source (own history, else its category)."""
+    if not priors or not source:
+        return None
+    entry = priors["sources"].get(source)
+    if entry and entry["n"] >= MIN_SOURCE_SAMPLES:
+        return entry
+    category = priors["source_categories"].get(source_category(source))
+    if category and category["n"] >= MIN_SOURCE_SAMPLES:
+        return category
+    return None
+
+
+def is_deterministic(entry):
+    """True when a source's label is predictable without the model."""
+    return (
+        entry is not None
+        and entry["n"] >= SHORTCUT_MIN_SAMPLES
+        and max(entry["prior"].values()) >= SHORTCUT_MIN_PROBABILITY
+    )
+
+
+def combine(proba, classes, priors, entry):
+    """Posterior over `classes`: model probabilities reweighted by the source prior."""
+    if entry is None:
+        return proba
+    weights = np.array([
+        entry["prior"].get(str(c), 0.0) / max(priors["global"].get(str(c), 0.0), 1e-6)
+        for c in classes
+    ])
+    posterior = proba * weights
+    total = posterior.sum()
+    return posterior / total if total > 0 else proba
+
+
+def calibrated_confidence(confidence, entry):
+    """Scale a model confidence by the source's observed accuracy/confidence ratio."""
+    if not entry or "accuracy" not in entry or not entry.get("mean_confidence"):
+        return float(confidence)
+    return float(min(1.0, confidence * entry["accuracy"] / entry["mean_confidence"]))
@@ -3,60 +3,145 @@
 Train classification model + isolation forest, compute drift,
 and save artifacts + drift_state.json.
 
-Run as: python -m backend.ml.train
+Alongside the full forest, two compact inference models are saved
+(linear_model.joblib, compact_forest.joblib). ml_classifier picks one
+via CYBERNOW_INFERENCE_MODEL.
+
+Per-source priors and calibration (source_priors.json) are computed from
+the labels and the forest's out-of-fold probabilities.
+
+The isolation forest and the drift statistics run on a 64-dim SVD
+embedding of the TF-IDF rows (embedding.py, saved as embedding.joblib),
+not on the 10k-wide sparse matrix.
+
+Every run writes train_fingerprint.json (see fingerprint.py) describing
+the rows it learned from. --delta only folds rows appended since that
+fingerprint into the linear model (partial_fit on the existing
+vocabulary); retrain_controller decides which mode to run.
+
+Run as: python -m backend.ml.train [--delta]
 """
 
 from datetime import datetime, timezone
 from pathlib import Path
+import argparse
 import json
+import sys
 import numpy as np
 import joblib
 
 from sklearn.ensemble import RandomForestClassifier, IsolationForest
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import cross_val_score
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import cross_val_predict
 
 from ..database import init_db, SessionLocal
+from sqlalchemy import select
+
 from ..models import Incident
+from ..collector.ml_classifier import INFERENCE_MODEL
+from .. import metrics, text_store
+from . import embedding, fingerprint, source_priors
 
 # ================== PATHS ==================
 ML_DIR = Path(__file__).resolve().parent
 MODEL_FILE = ML_DIR / "model.joblib"
 VECT_FILE = ML_DIR / "vectorizer.joblib"
 IFOREST_FILE = ML_DIR / "isolation_forest.joblib"
+LINEAR_MODEL_FILE = ML_DIR / "linear_model.joblib"
+COMPACT_FOREST_FILE = ML_DIR / "compact_forest.joblib"
 DRIFT_STATE = ML_DIR / "drift_state.json"
+SOURCE_PRIORS_FILE = ML_DIR / "source_priors.json"
+EMBEDDING_FILE = embedding.EMBEDDING_FILE
 
 DRIFT_THRESHOLD = 0.45
 
 
 # ================== DATA ==================
-def _load_training_data(db):
-    rows = (
-        db.query(Incident)
-        .filter(Incident.priority.isnot(None))
-        .filter(Incident.summary.isnot(None))
-        .all()
-    )
-    texts = [r.summary or r.title or "" for r in rows]
+def _fetch_training_rows(db, after_id=0):
+    return db.execute(fingerprint.training_rows_query(after_id, with_text=True)).all()
+
+
+def _text(row):
+    return text_store.decode(row.codec, row.body) or row.title or ""
+
+
+def _columns(rows):
+    texts = [_text(r) for r in rows]
     labels = [r.priority for r in rows]
+    sources = [r.source for r in rows]
+    return texts, labels, sources
+
+
+def _load_training_rows(db):
+    return _columns(_fetch_training_rows(db))
+
+
+def _load_training_data(db):
+    texts, labels, _ = _load_training_rows(db)
     return texts, labels
 
 
+# ================== MODELS ==================
+def build_classifier():
+    """Full 200-tree forest (reference model)."""
+    return RandomForestClassifier(n_estimators=200, random_state=42)
+
+
+def build_linear_classifier():
+    """Logistic-loss linear model: one sparse dot product per class."""
+    return SGDClassifier(
+        loss="log_loss", alpha=1e-5, max_iter=50, tol=1e-4, random_state=42
+    )
+
+
+def distill_compact_forest(teacher, X):
+    """
+    Small, depth-limited forest fitted on the teacher's predictions.
+    Mimics the full forest at a fraction of the trees and file size.
+    """
+    compact = RandomForestClassifier(
+        n_estimators=25, max_depth=24, min_samples_leaf=2, random_state=42
+    )
+    compact.fit(X, teacher.predict(X))
+    return compact
+
+
+def fit_inference_models(clf, X, labels):
+    """Train the optional inference models alongside the full forest."""
+    linear = build_linear_classifier()
+    linear.fit(X, labels)
+    return {
+        "linear": linear,
+        "compact_forest": distill_compact_forest(clf, X),
+    }
+
+
 # ================== DRIFT ==================
-def compute_drift_score(iforest, vec, recent_texts):
+def compute_drift_score(iforest, vec, recent_texts, embedder=None):
     if not recent_texts:
         return 0.0
     Xr = vec.transform(recent_texts)
+    if embedder is not None:
+        Xr = embedding.transform(embedder, Xr)
     scores = iforest.decision_function(Xr)
     mean = float(np.mean(scores))
     return float(np.clip(1 - ((mean + 1) / 2), 0.0, 1.0))
 
 
 # ================== SAVE ==================
-def save_artifacts(clf, vec, iforest):
+def save_artifacts(clf, vec, iforest, inference_models=None, embedder=None):
     joblib.dump(clf, MODEL_FILE)
     joblib.dump(vec, VECT_FILE)
     joblib.dump(iforest, IFOREST_FILE)
+    if embedder is not None:
+        embedding.save(embedder, EMBEDDING_FILE)
+
+    inference_models = inference_models or {}
+    if "linear" in inference_models:
+        joblib.dump(inference_models["linear"], LINEAR_MODEL_FILE)
+    if "compact_forest" in inference_models:
+        joblib.dump(inference_models["compact_forest"], COMPACT_FOREST_FILE)
 
 
 def persist_drift_state(state: dict):
@@ -65,48 +150,71 @@ def persist_drift_state(state: dict):
 
 
 # ================== TRAIN ==================
+@metrics.timed("train.run_train")
 def run_train():
     init_db()
     db = SessionLocal()
 
     try:
-        texts, labels = _load_training_data(db)
+        with metrics.span("train.load"):
+            rows = _fetch_training_rows(db)
+            texts, labels, sources = _columns(rows)
+            fp = fingerprint.compute((r.id, r.priority, r.text_hash) for r in rows)
         if len(texts) < 5:
             print("Not enough labelled data to train (need >=5).")
             return False
 
-        vec = TfidfVectorizer(max_features=10000, ngram_range=(1, 2))
-        X = vec.fit_transform(texts)
+        with metrics.span("train.vectorize", rows=len(texts)):
+            vec = TfidfVectorizer(max_features=10000, ngram_range=(1, 2))
+            X = vec.fit_transform(texts)
 
-        clf = RandomForestClassifier(n_estimators=200, random_state=42)
-        clf.fit(X, labels)
+        with metrics.span("train.fit"):
+            clf = build_classifier()
+            clf.fit(X, labels)
 
-        try:
-            scores = cross_val_score(clf, X, labels, cv=3, scoring="accuracy")
-            accuracy = float(np.mean(scores))
-        except Exception:
-            accuracy = float(clf.score(X, labels))
+        with metrics.span("train.cross_val"):
+            # out-of-fold probabilities give both accuracy and per-source calibration
+            try:
+                oof_proba = cross_val_predict(clf, X, labels, cv=3, method="predict_proba")
+                accuracy = float(np.mean(clf.classes_[oof_proba.argmax(axis=1)] == np.asarray(labels)))
+            except Exception:
+                oof_proba = None
+                accuracy = float(clf.score(X, labels))
 
-        iforest = IsolationForest(
-            n_estimators=200, contamination=0.05, random_state=42
-        )
-        iforest.fit(X)
+        with metrics.span("train.source_priors"):
+            priors = source_priors.compute_priors(labels, sources, clf.classes_, oof_proba)
+
+        with metrics.span("train.fit_inference_models"):
+            inference_models = fit_inference_models(clf, X, labels)
+
+        with metrics.span("train.embed", rows=len(texts)):
+            embedder, Z = embedding.fit(X)
+
+        with metrics.span("train.fit_iforest"):
+            iforest = IsolationForest(
+                n_estimators=200, contamination=0.05, random_state=42
+            )
+            iforest.fit(Z)
 
-        recent_rows = (
-            db.query(Incident)
-            .filter(Incident.summary.isnot(None))
+        recent_rows = db.execute(
+            text_store.outerjoin(select(Incident.title, *text_store.JOIN_COLUMNS))
+            .where(Incident.text_hash.isnot(None))
             .order_by(Incident.timestamp.desc().nullslast(), Incident.id.desc())
             .limit(200)
-            .all()
-        )
-        recent_texts = [r.summary or r.title or "" for r in recent_rows]
+        ).all()
+        recent_texts = [_text(r) for r in recent_rows]
 
-        drift_score = compute_drift_score(iforest, vec, recent_texts)
+        drift_score = compute_drift_score(iforest, vec, recent_texts, embedder)
         drift_detected = drift_score >= DRIFT_THRESHOLD
+        centroid_shift = embedding.centroid_shift(
+            embedder, embedding.transform(embedder, vec.transform(recent_texts))
+        ) if recent_texts else 0.0
 
         version = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
 
-        save_artifacts(clf, vec, iforest)
+        with metrics.span("train.save"):
+            save_artifacts(clf, vec, iforest, inference_models, embedder)
+            source_priors.save_priors(priors, SOURCE_PRIORS_FILE)
 
         persist_drift_state(
             {
@@ -114,9 +222,13 @@ def run_train():
                 "accuracy": accuracy,
                 "drift_score": drift_score,
                 "drift_detected": drift_detected,
+                "centroid_shift": centroid_shift,
+                "embedding_dim": embedder["dim"],
+                "mode": "full",
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             }
         )
+        fingerprint.save(fp)
 
         print(
             f"Trained model {version} | "
@@ -134,5 +246,78 @@ def run_train():
         db.close()
 
 
+@metrics.timed("train.run_delta")
+def run_delta():
+    """
+    Fold rows appended since the last fingerprint into the linear model.
+    The vectorizer, forests and priors are left as they are; a full run
+    refreshes those. Returns True when the linear model was updated.
+
+    The update is stamped as linear_version; model_version (which makes
+    ml_classifier reload and reclassify every row) only moves when the
+    linear model is the one being served (CYBERNOW_INFERENCE_MODEL).
+    """
+    old_fp = fingerprint.load()
+    if not fingerprint.is_current(old_fp) or not LINEAR_MODEL_FILE.exists():
+        print("No usable fingerprint or linear model to update → full training.")
+        return run_train()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        with metrics.span("train.load"):
+            rows = _fetch_training_rows(db, after_id=old_fp["max_id"])
+            texts, labels, _ = _columns(rows)
+        if not rows:
+            print("No new labelled rows since the last training run.")
+            return False
+
+        vec = joblib.load(VECT_FILE)
+        linear = joblib.load(LINEAR_MODEL_FILE)
+        unknown = set(labels) - {str(c) for c in linear.classes_}
+        if unknown:
+            print(f"New labels {sorted(unknown)} → full training.")
+            return run_train()
+
+        with metrics.span("train.partial_fit", rows=len(rows)):
+            linear.partial_fit(vec.transform(texts), labels)
+
+        try:
+            state = json.loads(DRIFT_STATE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        version = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+
+        with metrics.span("train.save"):
+            joblib.dump(linear, LINEAR_MODEL_FILE)
+        served = INFERENCE_MODEL == "linear"
+        persist_drift_state({
+            **state,
+            **({"model_version": version} if served else {}),
+            "linear_version": version,
+            "mode": "delta",
+            "base_version": state.get("base_version") or state.get("model_version"),
+            "delta_rows": len(rows),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
+        # rows stored since the fetch above are left for the next run
+        fingerprint.save(fingerprint.from_db(db, upto_id=rows[-1].id))
+
+        print(f"Delta-trained linear model {version} on {len(rows)} new rows"
+              + ("" if served else f" (serving {INFERENCE_MODEL}: model_version unchanged)"))
+        return True
+
+    except Exception as e:
+        print("Delta training failed:", e)
+        return False
+
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
-    run_train()
+    parser = argparse.ArgumentParser(description="Train the CyberNow models")
+    parser.add_argument("--delta", action="store_true",
+                        help="only fold rows added since the last run into the linear model")
+    ok = run_delta() if parser.parse_args().delta else run_train()
+    sys.exit(0 if ok else 1)
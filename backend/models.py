@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, UniqueConstraint
+from sqlalchemy import (
+    Column, Integer, String, Boolean, DateTime, Float, Text, LargeBinary, Index, UniqueConstraint,
+)
 from datetime import datetime
 from .database import Base
 
@@ -10,8 +12,7 @@ class Incident(Base):
     external_id = Column(String, nullable=False)
 
     title = Column(String, nullable=False)
-    summary = Column(String)
-    description = Column(String)
+    text_hash = Column(Integer, index=True)     # body in incident_texts, see backend/text_store.py
     url = Column(String)
 
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
@@ -24,8 +25,85 @@ class Incident(Base):
 
     is_mitigated = Column(Boolean, default=False)
     anomaly_score = Column(Float)
-    threat_score = Column(Float)
+    threat_score = Column(Float, index=True)
+    score_key = Column(String)               # inputs hash, see backend/scoring.py
+    confidence = Column(Float)
+    model_version = Column(String)
 
     __table_args__ = (
         UniqueConstraint("source", "external_id", name="uq_incident_source_ext"),
+        # ids are never reissued after deletes: exports, the analytics store,
+        # the vector index and training fingerprints all track "id > last id"
+        {"sqlite_autoincrement": True},
     )
+
+
+class IncidentText(Base):
+    """Incident summary bodies, one row per distinct text (compressed)."""
+    __tablename__ = "incident_texts"
+
+    hash = Column(Integer, primary_key=True, autoincrement=False)   # content hash
+    codec = Column(String(8), nullable=False)
+    body = Column(LargeBinary, nullable=False)
+    size = Column(Integer)
+
+
+class IncidentEntity(Base):
+    """Inverted index: one row per (incident, entity) mention."""
+    __tablename__ = "incident_entities"
+
+    id = Column(Integer, primary_key=True)
+    incident_id = Column(Integer, nullable=False, index=True)
+    kind = Column(String, nullable=False)    # cve | apt | vendor | ip | domain | hash
+    value = Column(String, nullable=False)   # normalized (CVE upper-case, canonical APT name)
+    timestamp = Column(DateTime)             # copy of the incident timestamp
+
+    __table_args__ = (
+        UniqueConstraint("incident_id", "kind", "value", name="uq_entity_incident"),
+        Index("ix_entity_kind_value", "kind", "value"),
+        Index("ix_entity_kind_timestamp", "kind", "timestamp"),
+    )
+
+
+class CollectorLease(Base):
+    """Per-source poll lease so concurrent collectors never double-poll a feed."""
+    __tablename__ = "collector_leases"
+
+    source = Column(String, primary_key=True)
+    owner = Column(String)
+    lease_until = Column(DateTime)
+    last_polled_at = Column(DateTime)
+
+
+class PipelineJob(Base):
+    """Durable work item passed between pipeline stages."""
+    __tablename__ = "pipeline_jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False, index=True)
+    payload = Column(Text)
+    status = Column(String, default="pending", index=True)
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class AlertRule(Base):
+    """
+    Subscription: alert `webhook_url` about new incidents matching all of
+    the set conditions (JSON: priority/category/sector/source lists and
+    keywords; each list matches any of its values). See backend/alerts.py.
+    """
+    __tablename__ = "alert_rules"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    webhook_url = Column(String, nullable=False)
+    conditions = Column(Text, nullable=False, default="{}")
+    enabled = Column(Boolean, default=True, index=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,419 @@
+# backend/reports.py
+"""
+Precomputed weekly / monthly threat reports for the /reports page.
+
+build_due() (run_pipeline calls it after each analytics refresh) renders
+one report per ISO week and per calendar month from the analytics column
+store, never from the incidents table:
+
+    totals, daily counts                 rows of the period (day-sorted store)
+    categories, priorities, sectors,     np.bincount over the same rows
+    sources
+    notable anomalies                    lowest IsolationForest scores in the
+                                         period; titles/urls fetched by id
+
+Each report is written as JSON and HTML to REPORTS_DIR/objects/, named by
+the sha256 of its content, so a file never changes once written and is
+served with an immutable Cache-Control. REPORTS_DIR/index.json maps a
+period key ("week-2026-W42", "month-2026-10") to its current objects.
+
+A period is final once SETTLE_DAYS have passed since its end (late feed
+items land by then) and is not rebuilt after that; the running period is
+rebuilt at most every REFRESH_SECONDS. Opening a report only reads the
+index and one file.
+
+Run as: python -m backend.reports [--period week|month] [--rebuild]
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+from sqlalchemy import select
+
+from .models import Incident
+from . import analytics_store, metrics
+
+BACKEND_DIR = Path(__file__).resolve().parent
+REPORTS_DIR = Path(os.environ.get("CYBERNOW_REPORTS_DIR", BACKEND_DIR / "report_store"))
+OBJECTS_DIR = REPORTS_DIR / "objects"
+INDEX_FILE = REPORTS_DIR / "index.json"
+
+PERIODS = ("week", "month")
+MAX_PERIODS = {"week": 104, "month": 36}   # history built on the first run
+REFRESH_SECONDS = 3600
+SETTLE_DAYS = 2
+TOP_N = 10
+TOP_ANOMALIES = 10
+ORPHAN_TTL_SECONDS = 7 * 86400             # superseded objects kept for old links
+
+OBJECT_RE = re.compile(r"^[0-9a-f]{64}\.(json|html)$")
+_EPOCH = date(1970, 1, 1)
+
+BUILT = metrics.counter("cybernow_reports_built_total", "Reports rendered, by period")
+
+_build_lock = threading.Lock()
+_index_cache = {"mtime": None, "index": None}
+
+
+class ReportError(ValueError):
+    """Unknown period or report key (reported to the client as 400/404)."""
+
+
+# ================== PERIODS ==================
+def period_bounds(period, day):
+    """(key, first day, last day) of the week/month containing `day`."""
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        year, week, _ = start.isocalendar()
+        return f"week-{year}-W{week:02d}", start, start + timedelta(days=6)
+    if period == "month":
+        start = day.replace(day=1)
+        nxt = (start + timedelta(days=32)).replace(day=1)
+        return f"month-{start:%Y-%m}", start, nxt - timedelta(days=1)
+    raise ReportError(f"period must be one of {', '.join(PERIODS)}")
+
+
+def iter_periods(period, first, last):
+    """Periods overlapping [first, last], newest first."""
+    out = []
+    day = last
+    while day >= first:
+        key, start, end = period_bounds(period, day)
+        out.append((key, start, end))
+        day = start - timedelta(days=1)
+    return out
+
+
+# ================== INDEX / OBJECTS ==================
+def load_index():
+    """{"reports": {key: entry}}, cached until index.json changes."""
+    try:
+        mtime = INDEX_FILE.stat().st_mtime
+    except OSError:
+        return {"reports": {}}
+    if _index_cache["mtime"] != mtime:
+        with open(INDEX_FILE, encoding="utf-8") as fh:
+            _index_cache.update(mtime=mtime, index=json.load(fh))
+    return _index_cache["index"]
+
+
+def index_version():
+    return _index_cache["mtime"]
+
+
+def _save_index(index):
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = INDEX_FILE.with_name(INDEX_FILE.name + ".tmp")
+    tmp.write_text(json.dumps(index, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, INDEX_FILE)
+
+
+def _put_object(body: bytes, ext):
+    """Store `body` under its sha256; returns the digest."""
+    digest = hashlib.sha256(body).hexdigest()
+    path = OBJECTS_DIR / f"{digest}.{ext}"
+    if not path.exists():
+        OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+    return digest
+
+
+def object_path(name):
+    """Path of a stored object by file name ("<sha256>.json|html"), or None."""
+    if not OBJECT_RE.match(name or ""):
+        return None
+    path = OBJECTS_DIR / name
+    return path if path.exists() else None
+
+
+def _collect_garbage(index):
+    live = {f"{e[ext]}.{ext}" for e in index["reports"].values() for ext in ("json", "html")}
+    cutoff = time.time() - ORPHAN_TTL_SECONDS
+    removed = 0
+    for path in OBJECTS_DIR.glob("*.*"):
+        if path.name not in live and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+# ================== BUILD ==================
+def _day_sorted(store):
+    """Row order by day plus the sorted days, for searchsorted period slices."""
+    order = np.argsort(store["day"], kind="stable")
+    return order, store["day"][order]
+
+
+def _slice(sorted_days, order, start, end):
+    lo = np.searchsorted(sorted_days, (start - _EPOCH).days, side="left")
+    hi = np.searchsorted(sorted_days, (end - _EPOCH).days, side="right")
+    return order[lo:hi]
+
+
+def _top(store, col, rows, n=None):
+    names = store[f"dict_{col}"]
+    counts = np.bincount(store[col][rows], minlength=len(names))
+    ranked = [i for i in np.argsort(-counts, kind="stable") if counts[i]]
+    return [{"label": str(names[i]), "value": int(counts[i])} for i in ranked[:n]]
+
+
+def _anomalies(db, store, rows):
+    scores = store["anomaly"][rows]
+    scored = ~np.isnan(scores)
+    if not scored.any():
+        return []
+    pick = np.argsort(scores[scored], kind="stable")[:TOP_ANOMALIES]
+    ids = store["id"][rows][scored][pick]
+    by_id = {
+        r.id: r for r in db.execute(
+            select(Incident.id, Incident.title, Incident.url, Incident.source,
+                   Incident.timestamp, Incident.priority, Incident.category,
+                   Incident.threat_score)
+            .where(Incident.id.in_([int(i) for i in ids]))
+        )
+    }
+    out = []
+    for incident_id, score in zip(ids.tolist(), scores[scored][pick].tolist()):
+        r = by_id.get(incident_id)
+        if r is None:   # past retention since it was ingested
+            continue
+        out.append({
+            "id": r.id,
+            "title": r.title,
+            "url": r.url,
+            "source": r.source,
+            "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+            "priority": r.priority,
+            "category": r.category,
+            "anomaly_score": round(score, 4),
+            "threat_score": r.threat_score,
+        })
+    return out
+
+
+def build_report(db, store, sorted_index, period, key, start, end, today):
+    """Report payload for one period (a plain dict; no timestamps, so it hashes stably)."""
+    order, sorted_days = sorted_index
+    rows = _slice(sorted_days, order, start, end)
+    _, prev_start, prev_end = period_bounds(period, start - timedelta(days=1))
+    previous = len(_slice(sorted_days, order, prev_start, prev_end))
+
+    first = (start - _EPOCH).days
+    daily = np.bincount(store["day"][rows] - first, minlength=(end - start).days + 1)
+
+    return {
+        "key": key,
+        "period": period,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "complete": (today - end).days > SETTLE_DAYS,
+        "total": int(len(rows)),
+        "previous_total": int(previous),
+        "mitigated": int(store["mitigated"][rows].sum()),
+        "daily": [
+            {"day": (start + timedelta(days=i)).isoformat(), "value": int(v)}
+            for i, v in enumerate(daily.tolist())
+        ],
+        "priorities": _top(store, "priority", rows),
+        "categories": _top(store, "category", rows, TOP_N),
+        "sectors": _top(store, "sector", rows, TOP_N),
+        "sources": _top(store, "source", rows, TOP_N),
+        "anomalies": _anomalies(db, store, rows),
+    }
+
+
+# ================== HTML ==================
+_PAGE = """<!doctype html>
+<html lang="en"><head><meta charset="utf-8">
+<title>CyberNow report {key}</title>
+<style>
+body{{font-family:system-ui,sans-serif;margin:2rem;max-width:960px;color:#1b1f24}}
+table{{border-collapse:collapse;margin:0 0 1.5rem;min-width:320px}}
+th,td{{border-bottom:1px solid #d0d7de;padding:.3rem .6rem;text-align:left}}
+td.n{{text-align:right}}
+</style></head><body>
+<h1>Threat report {key}</h1>
+<p>{start} – {end}{status}</p>
+<p><b>{total}</b> incidents ({change} vs previous {period}), <b>{mitigated}</b> mitigated.</p>
+{sections}
+</body></html>
+"""
+
+
+def _table(title, items):
+    rows = "".join(
+        f"<tr><td>{html.escape(i['label'])}</td><td class=n>{i['value']}</td></tr>"
+        for i in items
+    ) or "<tr><td colspan=2>none</td></tr>"
+    return f"<h2>{html.escape(title)}</h2><table>{rows}</table>"
+
+
+def _link(url, title):
+    """Anchor for http(s) URLs only; feed-supplied javascript:/data: links render as text."""
+    if urlparse(url or "").scheme in ("http", "https"):
+        return f"<a href=\"{html.escape(url)}\">{html.escape(title)}</a>"
+    return html.escape(title)
+
+
+def _anomaly_table(items):
+    rows = "".join(
+        "<tr><td>{ts}</td><td>{title}</td><td>{src}</td>"
+        "<td>{prio}</td><td class=n>{score}</td></tr>".format(
+            ts=html.escape((a["timestamp"] or "")[:10]),
+            title=_link(a["url"], a["title"] or ""),
+            src=html.escape(a["source"] or ""),
+            prio=html.escape(a["priority"] or ""),
+            score=a["anomaly_score"],
+        )
+        for a in items
+    ) or "<tr><td colspan=5>none</td></tr>"
+    return ("<h2>Notable anomalies</h2><table><tr><th>Date</th><th>Title</th>"
+            f"<th>Source</th><th>Priority</th><th>Score</th></tr>{rows}</table>")
+
+
+def render_html(report):
+    prev = report["previous_total"]
+    change = (f"{(report['total'] - prev) / prev:+.0%}" if prev else "n/a")
+    sections = "".join([
+        _table("Priority mix", report["priorities"]),
+        _table("Top categories", report["categories"]),
+        _table("Sectors", report["sectors"]),
+        _table("Sources", report["sources"]),
+        _anomaly_table(report["anomalies"]),
+    ])
+    return _PAGE.format(
+        key=html.escape(report["key"]),
+        start=report["start"],
+        end=report["end"],
+        status="" if report["complete"] else " (in progress)",
+        total=report["total"],
+        change=change,
+        period=report["period"],
+        mitigated=report["mitigated"],
+        sections=sections,
+    )
+
+
+# ================== SCHEDULE ==================
+def _due(entry, today, now, rebuild):
+    if rebuild or entry is None:
+        return True
+    if entry.get("complete"):
+        return False
+    generated = datetime.fromisoformat(entry["generated_at"])
+    return (now - generated).total_seconds() >= REFRESH_SECONDS or (
+        today - date.fromisoformat(entry["end"])
+    ).days > SETTLE_DAYS
+
+
+@metrics.timed("reports.build")
+def build_due(db=None, periods=PERIODS, rebuild=False, today=None):
+    """Render missing, running and newly final reports. Returns keys built."""
+    from .database import SessionLocal
+
+    store = analytics_store.load_store()
+    if store is None or not len(store["id"]):
+        return []
+    for period in periods:
+        if period not in PERIODS:
+            raise ReportError(f"period must be one of {', '.join(PERIODS)}")
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        with _build_lock:
+            today = today or date.today()
+            now = datetime.now(timezone.utc)
+            index = load_index()
+            reports = dict(index["reports"])
+            sorted_index = _day_sorted(store)
+            days = sorted_index[1]
+            dated = days[days >= 0]
+            if not len(dated):
+                return []
+            first = _EPOCH + timedelta(days=int(dated[0]))
+
+            built = []
+            for period in periods:
+                for key, start, end in iter_periods(period, first, today)[:MAX_PERIODS[period]]:
+                    if not _due(reports.get(key), today, now, rebuild):
+                        continue
+                    report = build_report(db, store, sorted_index, period, key, start, end, today)
+                    if not report["total"] and report["complete"]:
+                        continue   # nothing was collected in that period
+                    reports[key] = {
+                        "period": period,
+                        "start": report["start"],
+                        "end": report["end"],
+                        "complete": report["complete"],
+                        "total": report["total"],
+                        "json": _put_object(
+                            json.dumps(report, sort_keys=True, separators=(",", ":")).encode(),
+                            "json",
+                        ),
+                        "html": _put_object(render_html(report).encode(), "html"),
+                        "generated_at": now.isoformat(),
+                    }
+                    BUILT.inc(period=period)
+                    built.append(key)
+
+            if built:
+                index = {"reports": reports}
+                _save_index(index)
+                _collect_garbage(index)
+            return built
+    finally:
+        if own_session:
+            db.close()
+
+
+def listing(period=None):
+    """Index entries, newest first, with their object URLs."""
+    if period is not None and period not in PERIODS:
+        raise ReportError(f"period must be one of {', '.join(PERIODS)}")
+    items = [
+        {
+            "key": key,
+            **{k: v for k, v in entry.items() if k not in ("json", "html")},
+            "json_url": f"/api/reports/objects/{entry['json']}.json",
+            "html_url": f"/api/reports/objects/{entry['html']}.html",
+        }
+        for key, entry in load_index()["reports"].items()
+        if period is None or entry["period"] == period
+    ]
+    items.sort(key=lambda e: (e["start"], e["period"]), reverse=True)
+    return items
+
+
+def lookup(key):
+    """Index entry for a period key, or None."""
+    return load_index()["reports"].get(key)
+
+
+# ================== CLI ==================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the weekly/monthly reports")
+    parser.add_argument("--period", choices=PERIODS, help="only this period kind")
+    parser.add_argument("--rebuild", action="store_true", help="re-render every period")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    built = build_due(periods=(args.period,) if args.period else PERIODS, rebuild=args.rebuild)
+    print(f"🗞 Reports: {len(built)} built in {time.perf_counter() - t0:.2f}s → {REPORTS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# backend/run_backfill.py
+# CLI to bulk-ingest archived feed dumps (bootstrap / outage recovery).
+#
+#   python -m backend.run_backfill dumps/                       # *.xml, *.opml, *.ndjson
+#   python -m backend.run_backfill cisa-2025.xml --source https://www.cisa.gov/news.xml
+#   python -m backend.run_backfill export.ndjson --workers 8
+#
+# Unlike run_collector (newest ENTRIES_PER_FEED entries per poll, one
+# transaction per feed), entries are parsed across processes and written
+# in large batches with relaxed durability and deferred index builds; see
+# backend/collector/backfill.py. Pass --keep-indexes when the API serves
+# from the same database during the run.
+import argparse
+import sys
+
+from backend.collector import backfill
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill CyberNow from archived feeds")
+    parser.add_argument("inputs", nargs="+",
+                        help="feed dumps (.xml/.rss/.atom[.gz]), OPML lists, NDJSON files, "
+                             "directories of them, or feed URLs")
+    parser.add_argument("--source", help="feed URL to file entries under (default: the "
+                                         "dump's self link, or the NDJSON 'source' field)")
+    parser.add_argument("--workers", type=int, help="parser processes (default: CPU count)")
+    parser.add_argument("--batch", type=int, default=backfill.BATCH_ROWS,
+                        help="rows classified and committed per transaction")
+    parser.add_argument("--keep-indexes", action="store_true",
+                        help="keep indexes in place instead of rebuilding them at the end")
+    parser.add_argument("--include-expired", action="store_true",
+                        help="also store entries the retention cleanup would delete")
+    args = parser.parse_args(argv)
+    if args.batch < 1:
+        parser.error("--batch must be positive")
+
+    try:
+        tasks = backfill.tasks(args.inputs, source=args.source)
+    except backfill.BackfillError as e:
+        parser.error(str(e))
+    print(f"📦 Backfill: {len(tasks)} parse tasks")
+
+    stats = backfill.backfill(
+        tasks,
+        workers=args.workers,
+        batch_rows=args.batch,
+        defer_indexes=not args.keep_indexes,
+        keep_expired=args.include_expired,
+    )
+    print(
+        f"✅ {stats['new']} new of {stats['entries']} entries in {stats['seconds']}s "
+        f"({stats['entries_per_s']:,.0f} entries/s); {stats['duplicate']} duplicate, "
+        f"{stats['expired']} expired, {stats['invalid']} invalid, "
+        f"{stats['failed']} inputs failed"
+    )
+    return stats["failed"] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
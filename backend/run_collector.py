@@ -1,7 +1,45 @@
 # backend/run_collector.py
-# Simple CLI to run collector once.
-from backend.collector.rss_collector import run_once
+# CLI to run the collector once, or as one shard of N in a loop.
+#
+#   python -m backend.run_collector                      # all feeds, once
+#   python -m backend.run_collector --shard 1/3 --loop   # feeds of shard 1
+#
+# Every run takes per-feed leases (collector_leases), so cron,
+# run_pipeline and sharded workers never poll a feed twice per interval.
+import argparse
+import time
+
+from backend.collector import sharding
+from backend.collector.rss_collector import FEEDS, run_once
+
+COLLECT_INTERVAL_SECONDS = 600
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CyberNow feed collector")
+    parser.add_argument("--shard", default="0/1", help="INDEX/TOTAL, e.g. 0/4")
+    parser.add_argument("--loop", action="store_true", help="keep polling every --interval")
+    parser.add_argument("--interval", type=float, default=COLLECT_INTERVAL_SECONDS,
+                        help="min seconds between polls of the same feed")
+    args = parser.parse_args(argv)
+
+    try:
+        index, total = sharding.parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+
+    feeds = sharding.shard_sources(FEEDS, index, total)
+    owner = sharding.default_owner(f"shard-{index}")
+    print(f"🧩 Shard {index}/{total}: {len(feeds)} of {len(FEEDS)} feeds")
+
+    while True:
+        new_ids = run_once(feeds, lease_owner=owner, min_interval=args.interval)
+        print(f"   → {len(new_ids)} new incidents")
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
 
 if __name__ == "__main__":
-    run_once()
+    main()
     print("Collector run completed.")
@@ -0,0 +1,78 @@
+# backend/run_export.py
+# CLI to export incidents for SIEM ingestion (NDJSON / CSV / Parquet).
+#
+#   python -m backend.run_export --format ndjson --out incidents.ndjson \
+#       --state export_state.json --priority HIGH,CRITICAL
+#
+# With --state, the run exports only incidents newer than the stored
+# watermark and records the new one after a successful write, so hourly
+# syncs transfer deltas only.
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from backend.database import SessionLocal
+from backend import export_service
+
+
+def _read_watermark(state_path):
+    if state_path and state_path.exists():
+        return json.loads(state_path.read_text(encoding="utf-8")).get("watermark", 0)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export CyberNow incidents")
+    parser.add_argument("--format", default="ndjson", choices=list(export_service.FORMATS))
+    parser.add_argument("--out", default="-", help="output file, or - for stdout")
+    parser.add_argument("--since", type=int, help="id watermark (overrides --state)")
+    parser.add_argument("--state", help="JSON file holding the last watermark")
+    parser.add_argument("--start", help="ISO timestamp lower bound")
+    parser.add_argument("--end", help="ISO timestamp upper bound (exclusive)")
+    parser.add_argument("--priority", help="comma-separated priorities")
+    parser.add_argument("--source", help="comma-separated source URLs")
+    args = parser.parse_args(argv)
+
+    state_path = Path(args.state) if args.state else None
+    since = args.since if args.since is not None else _read_watermark(state_path)
+
+    try:
+        filters = export_service.parse_filters({
+            "format": args.format,
+            "since": since,
+            "start": args.start,
+            "end": args.end,
+            "priority": args.priority,
+            "source": args.source,
+        })
+    except export_service.ExportError as e:
+        parser.error(str(e))
+
+    db = SessionLocal()
+    try:
+        upper = export_service.watermark(db, filters)
+        if args.out == "-":
+            out = sys.stdout.buffer
+        else:
+            tmp_path = args.out + ".part"
+            out = open(tmp_path, "wb")
+        try:
+            for chunk in export_service.export_chunks(db, filters, upper):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        if args.out != "-":
+            os.replace(tmp_path, args.out)
+    finally:
+        db.close()
+
+    if state_path:
+        state_path.write_text(json.dumps({"watermark": upper}), encoding="utf-8")
+    print(f"Exported ids ({since}, {upper}]", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,249 @@
+# backend/run_pipeline.py
+"""
+Staged CyberNow pipeline.
+
+Workers connected by the durable job queue (automation/job_queue.py):
+- collector:  polls feeds (entries are classified at insert), appends
+              them to the analytics column store and the related-incidents
+              vector index, refreshes the weekly/monthly reports and
+              enqueues a "retrain" check every RETRAIN_CHECK_SECONDS
+- classifier: claims "reclassify" jobs and re-scores rows from an older
+              model version in a process pool
+- trainer:    claims "retrain" jobs; a long training run only blocks
+              this worker, never ingest
+- alerts:     delivers "alert" jobs (rule matches queued at ingest) to
+              their webhooks in batches, with retries
+- backup:     throttled online snapshot every backup.INTERVAL_SECONDS
+
+Run as: python -m backend.run_pipeline
+"""
+
+import multiprocessing
+import os
+import statistics
+import threading
 import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 
+import requests
+
+from backend.database import init_db
 from backend.collector.rss_collector import run_once as collect
-from backend.collector.ml_classifier import classify_new_incidents
+from backend.collector.sharding import default_owner
+from backend.collector.ml_classifier import classify_new_incidents, reload_models_if_stale
 from backend.automation.retrain_controller import run_retraining
+from backend.automation import alert_delivery, backup, job_queue
+from backend.automation.update_scores import run_update as update_scores
+from backend import analytics_store, metrics, reports, vector_index
+
+COLLECT_INTERVAL_SECONDS = 600       # run every 10 minutes
+RETRAIN_CHECK_SECONDS = 3600
+POLL_SECONDS = 2
+CLASSIFIER_PROCESSES = 2
+METRICS_PORT = int(os.environ.get("CYBERNOW_METRICS_PORT", "9108"))
+
+QUEUE_DEPTH = metrics.gauge("cybernow_queue_depth", "Pipeline jobs by kind/status")
+
+stop_event = threading.Event()
+model_updated = threading.Event()
+
+# ================== STAGE LATENCY ==================
+_latency_lock = threading.Lock()
+_latencies = defaultdict(lambda: deque(maxlen=200))
+
+
+def record_latency(stage: str, seconds: float):
+    with _latency_lock:
+        _latencies[stage].append(seconds)
+    metrics.STAGE_SECONDS.observe(seconds, stage=f"pipeline.{stage}")
+
+
+def stage_latency():
+    """{stage: {"count", "p50_s", "max_s"}} over the recent window."""
+    with _latency_lock:
+        return {
+            stage: {
+                "count": len(vals),
+                "p50_s": round(statistics.median(vals), 3),
+                "max_s": round(max(vals), 3),
+            }
+            for stage, vals in _latencies.items()
+            if vals
+        }
+
+
+def report():
+    depth = job_queue.queue_depth()
+    QUEUE_DEPTH.clear()
+    for kind, statuses in depth.items():
+        for status, n in statuses.items():
+            QUEUE_DEPTH.set(n, kind=kind, status=status)
+    print("📊 Queue depth:", depth or "empty")
+    for stage, st in sorted(stage_latency().items()):
+        print(f"   {stage:<16} n={st['count']:<4} p50={st['p50_s']}s max={st['max_s']}s")
+
+
+# ================== WORKERS ==================
+def collector_worker():
+    last_retrain_check = 0.0
+    while not stop_event.is_set():
+        try:
+            print("📥 Collecting incidents...")
+            t0 = time.perf_counter()
+            # leases keep this from double-polling feeds a cron run just fetched
+            new_ids = collect(
+                lease_owner=default_owner("pipeline"),
+                min_interval=COLLECT_INTERVAL_SECONDS,
+            ) or []
+            record_latency("collect", time.perf_counter() - t0)
+            print(f"   → {len(new_ids)} new incidents")
+
+            t0 = time.perf_counter()
+            analytics_store.refresh()
+            record_latency("analytics", time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            vector_index.update()
+            record_latency("vectors", time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            if reports.build_due():
+                record_latency("reports", time.perf_counter() - t0)
 
-print("🚀 CyberNow pipeline started")
+            # recency buckets age; only rows whose inputs changed are rewritten
+            t0 = time.perf_counter()
+            update_scores()
+            record_latency("scores", time.perf_counter() - t0)
 
-while True:
+            if time.monotonic() - last_retrain_check > RETRAIN_CHECK_SECONDS:
+                job_queue.enqueue("retrain", unique=True)
+                last_retrain_check = time.monotonic()
+
+            job_queue.purge_done()
+            report()
+        except Exception as e:
+            print("❌ Collector error:", e)
+
+        stop_event.wait(COLLECT_INTERVAL_SECONDS)
+
+
+def _new_pool():
+    return ProcessPoolExecutor(
+        max_workers=CLASSIFIER_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def classifier_worker():
+    pool = _new_pool()
     try:
-        print("📥 Collecting incidents...")
-        collect()
+        while not stop_event.is_set():
+            if model_updated.is_set():
+                # workers hold the old model in memory; start fresh ones
+                model_updated.clear()
+                reload_models_if_stale()
+                pool.shutdown(wait=True)
+                pool = _new_pool()
+
+            jobs = job_queue.claim("reclassify")
+            if not jobs:
+                stop_event.wait(POLL_SECONDS)
+                continue
+
+            job = jobs[0]
+            try:
+                t0 = time.perf_counter()
+                classify_new_incidents(executor=pool)
+                record_latency("reclassify", time.perf_counter() - t0)
+                job_queue.complete(job["id"])
+            except Exception as e:
+                print("❌ Classifier error:", e)
+                job_queue.fail(job["id"], e)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def trainer_worker():
+    while not stop_event.is_set():
+        jobs = job_queue.claim("retrain")
+        if not jobs:
+            stop_event.wait(POLL_SECONDS)
+            continue
 
-        print("🧠 Classifying new incidents...")
-        classify_new_incidents()
+        job = jobs[0]
+        try:
+            print("🔁 Checking drift & retraining if needed...")
+            t0 = time.perf_counter()
+            if run_retraining():
+                model_updated.set()
+                job_queue.enqueue("reclassify", unique=True)
+            record_latency("retrain", time.perf_counter() - t0)
+            job_queue.complete(job["id"])
+        except Exception as e:
+            print("❌ Trainer error:", e)
+            job_queue.fail(job["id"], e)
 
 
-        print("🔁 Checking drift & retraining if needed...")
-        run_retraining()
+def alert_worker():
+    session = requests.Session()
+    while not stop_event.is_set():
+        try:
+            t0 = time.perf_counter()
+            claimed, _ = alert_delivery.drain(session)
+        except Exception as e:
+            print("❌ Alert worker error:", e)
+            claimed = 0
+        if not claimed:
+            stop_event.wait(POLL_SECONDS)
+            continue
+        record_latency("alerts", time.perf_counter() - t0)
+
+
+def backup_worker():
+    while not stop_event.is_set():
+        age = backup.last_snapshot_age()
+        if age is not None and age < backup.INTERVAL_SECONDS:
+            stop_event.wait(backup.INTERVAL_SECONDS - age)
+            continue
+        t0 = time.perf_counter()
+        if backup.run_backup():
+            record_latency("backup", time.perf_counter() - t0)
+        else:
+            stop_event.wait(backup.INTERVAL_SECONDS / 6)   # retry sooner after a failure
+
+
+# ================== MAIN ==================
+def main():
+    print("🚀 CyberNow pipeline started")
+    init_db()
+    metrics.serve(METRICS_PORT)
+    print(f"📈 Metrics on :{METRICS_PORT}/metrics")
+
+    requeued = job_queue.requeue_running()
+    if requeued:
+        print(f"↩ Requeued {requeued} interrupted jobs")
+
+    # rows from an older model, or ingested while no model was available
+    job_queue.enqueue("reclassify", unique=True)
+
+    workers = [
+        threading.Thread(target=fn, name=fn.__name__, daemon=True)
+        for fn in (collector_worker, classifier_worker, trainer_worker,
+                   alert_worker, backup_worker)
+    ]
+    for w in workers:
+        w.start()
+
+    try:
+        while any(w.is_alive() for w in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("⏹ Stopping pipeline...")
+        stop_event.set()
+        for w in workers:
+            w.join(timeout=30)
 
-        print("✅ Pipeline cycle complete. Sleeping...")
-    except Exception as e:
-        print("❌ Pipeline error:", e)
 
-    time.sleep(600)  # run every 10 minutes
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# backend/serialization.py
+"""
+JSON serialization layer for API responses.
+
+- dumps(): orjson when installed, stdlib json otherwise
+- json_response(): ETag/304, gzip/brotli negotiation, and an LRU of
+  pre-serialized (and pre-compressed) bytes keyed by a caller-supplied
+  cache_key, so an unchanged result set is not re-encoded per poll
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:  # optional: faster encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: br content-encoding
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+CACHE_ENTRIES = 64
+
+
+# ================== ENCODING ==================
+def _default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def _negotiate():
+    """Highest-q encoding the client accepts (q > 0; br wins ties), else None."""
+    accepted = request.accept_encodings   # parsed Accept-Encoding, incl. q-values and *
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(offered, key=lambda enc: accepted[enc])
+    return best if accepted[best] > 0 else None
+
+
+def _compress(body: bytes, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, 6)
+    return body
+
+
+# ================== CACHED RESPONSES ==================
+class _Entry:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self._encoded = {None: body}
+
+    def encoded(self, encoding):
+        if len(self.body) < MIN_COMPRESS_BYTES:
+            encoding = None
+        if encoding not in self._encoded:
+            self._encoded[encoding] = _compress(self.body, encoding)
+        return encoding, self._encoded[encoding]
+
+
+_cache_lock = threading.Lock()
+_cache = OrderedDict()
+
+
+def _cached_entry(cache_key, payload):
+    if cache_key is not None:
+        with _cache_lock:
+            entry = _cache.get(cache_key)
+            if entry is not None:
+                _cache.move_to_end(cache_key)
+                return entry
+
+    entry = _Entry(dumps(payload() if callable(payload) else payload))
+
+    if cache_key is not None:
+        with _cache_lock:
+            _cache[cache_key] = entry
+            while len(_cache) > CACHE_ENTRIES:
+                _cache.popitem(last=False)
+    return entry
+
+
+def json_response(payload, cache_key=None, status=200):
+    """
+    Serialize `payload` as a JSON response. `cache_key` must change
+    whenever the payload does (e.g. a fingerprint of the result rows);
+    `payload` may be a zero-arg callable so a cache hit skips building it.
+    """
+    entry = _cached_entry(cache_key, payload)
+
+    if entry.etag in request.headers.get("If-None-Match", ""):
+        resp = Response(status=304)
+    else:
+        encoding, data = entry.encoded(_negotiate())
+        resp = Response(data, status=status, mimetype="application/json")
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+
+    resp.headers["ETag"] = entry.etag
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+
+def fingerprint(rows) -> str:
+    """Cheap cache key for a result set (hash of its row tuples)."""
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
@@ -19,19 +19,20 @@ async function loadDashboard() {
     const mitigated = el("mitigated") || el("threatsMitigated");
     const feed = el("feed") || el("liveFeedList");
 
+    /* ---------- ONE SNAPSHOT REQUEST FOR THE WHOLE PAGE ---------- */
+    const snapshotRes = await fetch("/api/dashboard/snapshot");
+    if (!snapshotRes.ok) throw new Error("Snapshot API failed");
+    const snapshot = await snapshotRes.json();
+
     /* ---------- SUMMARY (SAFE FIELDS ONLY) ---------- */
-    const summaryRes = await fetch("/api/dashboard/summary");
-    if (!summaryRes.ok) throw new Error("Summary API failed");
-    const summary = await summaryRes.json();
+    const summary = snapshot.summary || {};
 
     if (total) total.textContent = summary.total_threats_today ?? 0;
     if (mitigated) mitigated.textContent = summary.threats_mitigated ?? 0;
 
     /* ---------- LIVE FEED + FRONTEND COUNTS ---------- */
     if (feed) {
-      const feedRes = await fetch("/api/incidents/live");
-      if (!feedRes.ok) throw new Error("Live feed API failed");
-      const feedData = await feedRes.json();
+      const feedData = snapshot.live || [];
 
       feed.innerHTML = "";
 
@@ -137,9 +138,7 @@ async function loadDashboard() {
     /* ---------- THREAT TRENDS ---------- */
     const trendCanvas = el("trendChart");
     if (trendCanvas) {
-      const trendRes = await fetch("/api/analytics/trends");
-      if (!trendRes.ok) throw new Error("Trends API failed");
-      const trendData = await trendRes.json();
+      const trendData = snapshot.trends || {};
 
       if (trendChart) trendChart.destroy();
 
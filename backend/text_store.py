@@ -0,0 +1,131 @@
+# backend/text_store.py
+"""
+Incident text bodies, stored once per distinct content.
+
+incidents only keeps fixed-width and filter columns plus text_hash; the
+cleaned feed summary lives in incident_texts:
+
+    hash   64-bit blake2b of the UTF-8 text, as a signed integer; the
+           primary key, so it is the rowid and needs no extra index
+           (collision odds ~3e-6 at ten million distinct bodies)
+    codec  "zstd" | "zlib" | "raw"
+    body   compressed bytes
+    size   uncompressed bytes
+
+Identical bodies (the same advisory syndicated by several feeds, or
+re-polled under a new id) share one row. zstd is used when the
+zstandard package is installed, zlib otherwise; bodies too short to
+gain from compression are kept raw. Readers decode lazily, only for the
+rows they return (fetch()), or join the table (JOIN_COLUMNS + decode())
+when they stream every row anyway.
+
+Orphans left by retention deletes are removed by purge_orphans().
+"""
+
+import hashlib
+import zlib
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .models import Incident, IncidentText
+
+try:
+    import zstandard
+except ImportError:  # optional: better ratio and faster than zlib
+    zstandard = None
+
+CODEC = "zstd" if zstandard is not None else "zlib"
+ZSTD_LEVEL = 6
+ZLIB_LEVEL = 6
+MIN_COMPRESS_BYTES = 96
+FETCH_CHUNK = 500
+
+JOIN_COLUMNS = (IncidentText.codec, IncidentText.body)
+
+_zstd_c = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard is not None else None
+_zstd_d = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+
+class TextCodecError(RuntimeError):
+    """A stored body uses a codec this process cannot decode."""
+
+
+# ================== CODEC ==================
+def digest(text):
+    return int.from_bytes(
+        hashlib.blake2b(text.encode(), digest_size=8).digest(), "big", signed=True
+    )
+
+
+def encode(text):
+    """text → (codec, body bytes)."""
+    raw = text.encode()
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return "raw", raw
+    if CODEC == "zstd":
+        packed = _zstd_c.compress(raw)
+    else:
+        packed = zlib.compress(raw, ZLIB_LEVEL)
+    return (CODEC, packed) if len(packed) < len(raw) else ("raw", raw)
+
+
+def decode(codec, body):
+    if body is None:
+        return None
+    if codec == "raw":
+        return bytes(body).decode()
+    if codec == "zlib":
+        return zlib.decompress(body).decode()
+    if codec == "zstd":
+        if _zstd_d is None:
+            raise TextCodecError("zstd-compressed text needs the zstandard package")
+        return _zstd_d.decompress(body).decode()
+    raise TextCodecError(f"unknown text codec {codec!r}")
+
+
+def outerjoin(stmt):
+    """Join incident_texts onto a select over incidents (for JOIN_COLUMNS)."""
+    return stmt.outerjoin(IncidentText, IncidentText.hash == Incident.text_hash)
+
+
+# ================== READ / WRITE ==================
+def store(db, texts):
+    """
+    Write the bodies that are not stored yet (caller commits). Returns
+    one hash per text, None for empty ones.
+    """
+    hashes = [digest(t) if t else None for t in texts]
+    new = {}
+    for h, t in zip(hashes, texts):
+        if h is not None and h not in new:
+            codec, body = encode(t)
+            new[h] = {"hash": h, "codec": codec, "body": body, "size": len(t.encode())}
+    if new:
+        db.execute(
+            sqlite_insert(IncidentText).on_conflict_do_nothing(index_elements=["hash"]),
+            list(new.values()),
+        )
+    return hashes
+
+
+def fetch(db, hashes):
+    """{hash: text} for the given hashes (None/missing ones are skipped)."""
+    wanted = list({h for h in hashes if h})
+    out = {}
+    for i in range(0, len(wanted), FETCH_CHUNK):
+        rows = db.execute(
+            select(IncidentText.hash, *JOIN_COLUMNS)
+            .where(IncidentText.hash.in_(wanted[i:i + FETCH_CHUNK]))
+        )
+        for h, codec, body in rows:
+            out[h] = decode(codec, body)
+    return out
+
+
+def purge_orphans(db):
+    """Delete bodies no incident references any more (caller commits)."""
+    referenced = select(Incident.text_hash).where(Incident.text_hash.isnot(None))
+    return db.execute(
+        delete(IncidentText).where(IncidentText.hash.notin_(referenced))
+    ).rowcount
@@ -0,0 +1,452 @@
+# backend/vector_index.py
+"""
+Vector index over incidents for the "related incidents" API.
+
+Each incident (title + summary) is encoded with the trained TF-IDF
+vectorizer and projected to the unit-length SVD embedding (ml/embedding.py),
+so a dot product is a cosine similarity. The index is three flat files,
+appended in id order and read through np.memmap:
+
+    <gen>.ids     int64    incident ids (ascending)
+    <gen>.vec     float32  N x dim embeddings
+    <gen>.codes   uint64   N x CODE_BITS/64 random-projection sign bits
+
+plus meta.json (generation, row count, max id, which model encoded it). Readers
+only trust the first meta["count"] rows, so an append in progress is
+invisible until meta.json is replaced.
+
+Search:
+- exact:  blocked matrix-vector product over the memmap, top-k per block
+- approx: Hamming distance on the sign codes (XOR + popcount) picks
+          APPROX_CANDIDATES rows, which are re-ranked exactly
+- auto:   approx from APPROX_MIN_ROWS rows up, exact below
+"earlier" restricts the search to lower ids, a prefix of the files.
+
+update() (run_pipeline calls it after each collect) appends incidents
+newer than meta["max_id"], compacts out rows removed by retention, and
+rebuilds into a new generation when the vectorizer or embedding changes
+(retrain). Appending by id relies on incident ids never being reissued
+(AUTOINCREMENT, see automation/db_migrate.py); an index written before
+that (no meta["monotonic_ids"]) may hold a deleted row's vector under a
+reused id, so it is rebuilt once. If
+train.py has not produced embedding.joblib yet, one is fitted on recent
+incidents and kept with the index.
+
+Run as: python -m backend.vector_index [--rebuild]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import func, select
+
+from .models import Incident
+from .automation.db_migrate import reserve_ids
+from . import metrics, text_store
+
+BACKEND_DIR = Path(__file__).resolve().parent
+VECTOR_DIR = Path(os.environ.get("CYBERNOW_VECTOR_DIR", BACKEND_DIR / "vector_store"))
+META_FILE = VECTOR_DIR / "meta.json"
+OWN_EMBEDDING_FILE = VECTOR_DIR / "embedding.joblib"
+VECTORIZER_FILE = BACKEND_DIR / "ml" / "vectorizer.joblib"
+
+MODES = ("auto", "exact", "approx")
+CODE_BITS = 128
+PLANES_SEED = 7
+BLOCK_ROWS = 1 << 18                 # 1 MiB of float32 per dim per block
+APPROX_MIN_ROWS = 200_000
+APPROX_CANDIDATES = 4096
+ENCODE_BATCH = 2000
+FIT_ROWS = 50_000                    # rows for an index-owned embedding
+COMPACT_FRACTION = 0.2               # dead rows (retention) before compaction
+OVERFETCH = 10                       # extra hits to survive deleted rows
+
+SEARCHES = metrics.counter(
+    "cybernow_related_searches_total", "Related-incident searches, by mode"
+)
+
+_write_lock = threading.Lock()
+_read_cache = {"mtime": None, "index": None}
+_encoder = {"key": None, "vectorizer": None, "embedding": None}
+
+try:
+    _bitwise_count = np.bitwise_count
+except AttributeError:  # numpy < 2.0
+    _POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _bitwise_count(a):
+        return _POP8[a.view(np.uint8)].reshape(*a.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+class VectorIndexError(ValueError):
+    """Bad search parameters (reported to the client as 400)."""
+
+
+# ================== ENCODING ==================
+def _planes(dim):
+    rng = np.random.default_rng(PLANES_SEED)
+    return rng.standard_normal((CODE_BITS, dim)).astype(np.float32)
+
+
+def sign_codes(Z, planes):
+    """Random-projection sign bits of the rows of Z, packed into uint64 words."""
+    bits = (Z @ planes.T) > 0
+    return np.packbits(bits, axis=1).view(np.uint64)
+
+
+def _stat_key(path):
+    try:
+        st = path.stat()
+    except OSError:
+        return "none"
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _model_key():
+    """Identity of the trained vectorizer + embedding; a change means re-encode."""
+    from .ml import embedding
+
+    return f"{_stat_key(VECTORIZER_FILE)}|{_stat_key(embedding.EMBEDDING_FILE)}"
+
+
+def _load_encoder(meta):
+    """(vectorizer, embedding bundle) the index in `meta` was encoded with, cached."""
+    key = (meta["model"], meta["embedding"])
+    if _encoder["key"] != key:
+        import joblib
+        from .ml import embedding
+
+        own = meta["embedding"] != "model"
+        _encoder.update(
+            key=key,
+            vectorizer=joblib.load(VECTORIZER_FILE),
+            embedding=embedding.load(OWN_EMBEDDING_FILE if own else embedding.EMBEDDING_FILE),
+        )
+    return _encoder["vectorizer"], _encoder["embedding"]
+
+
+def encode(texts, meta):
+    from .ml import embedding
+
+    vectorizer, bundle = _load_encoder(meta)
+    return embedding.transform(bundle, vectorizer.transform(texts))
+
+
+def _texts_query(after_id=0):
+    return (
+        text_store.outerjoin(select(Incident.id, Incident.title, *text_store.JOIN_COLUMNS))
+        .where(Incident.id > after_id)
+        .order_by(Incident.id)
+        .execution_options(yield_per=ENCODE_BATCH)
+    )
+
+
+def _row_text(row):
+    return f"{row.title or ''} {text_store.decode(row.codec, row.body) or ''}".strip()
+
+
+def _fit_own_embedding(db):
+    """Embedding fitted on the newest FIT_ROWS incidents (no trained one yet)."""
+    import joblib
+    from .ml import embedding
+
+    rows = db.execute(
+        text_store.outerjoin(select(Incident.id, Incident.title, *text_store.JOIN_COLUMNS))
+        .order_by(Incident.id.desc())
+        .limit(FIT_ROWS)
+    ).all()
+    vectorizer = joblib.load(VECTORIZER_FILE)
+    bundle, _ = embedding.fit(vectorizer.transform([_row_text(r) for r in rows]))
+    VECTOR_DIR.mkdir(parents=True, exist_ok=True)
+    embedding.save(bundle, OWN_EMBEDDING_FILE)
+
+
+# ================== FILES ==================
+def _read_meta():
+    try:
+        with open(META_FILE, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta):
+    VECTOR_DIR.mkdir(parents=True, exist_ok=True)
+    meta["updated_at"] = datetime.now(timezone.utc).isoformat()
+    tmp = META_FILE.with_name(META_FILE.name + ".tmp")
+    tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    os.replace(tmp, META_FILE)
+
+
+def _paths(generation):
+    return {ext: VECTOR_DIR / f"{generation}.{ext}" for ext in ("ids", "vec", "codes")}
+
+
+def _itemsizes(dim):
+    return {"ids": 8, "vec": 4 * dim, "codes": CODE_BITS // 8}
+
+
+def _append(meta, ids, Z):
+    """Append rows to the files of meta's generation and advance meta (not yet saved)."""
+    paths = _paths(meta["generation"])
+    sizes = _itemsizes(meta["dim"])
+    arrays = {
+        "ids": np.ascontiguousarray(ids, dtype=np.int64),
+        "vec": np.ascontiguousarray(Z, dtype=np.float32),
+        "codes": sign_codes(Z, _planes(meta["dim"])),
+    }
+    for ext, path in paths.items():
+        with open(path, "ab") as fh:
+            # drop bytes of an append that crashed before meta.json was written
+            fh.truncate(meta["count"] * sizes[ext])
+            fh.write(arrays[ext].tobytes())
+    meta["count"] += len(ids)
+    meta["max_id"] = int(ids[-1])
+
+
+def _new_meta(generation, dim, model, emb):
+    meta = {"generation": generation, "dim": int(dim), "code_bits": CODE_BITS,
+            "model": model, "embedding": emb, "count": 0, "max_id": 0,
+            "monotonic_ids": True}
+    for path in _paths(generation).values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return meta
+
+
+def _remove_generation(generation):
+    for path in _paths(generation).values():
+        path.unlink(missing_ok=True)
+
+
+def load():
+    """
+    Memory-mapped index {"ids", "vec", "codes", "words", "meta"}, or None if
+    not built. "words" are the code columns copied into contiguous arrays
+    (16 bytes a row at CODE_BITS=128) for the Hamming scan.
+    """
+    try:
+        mtime = META_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+    if _read_cache["mtime"] != mtime:
+        meta = _read_meta()
+        if meta is None:
+            return None
+        n, dim = meta["count"], meta["dim"]
+        paths = _paths(meta["generation"])
+        if n:
+            index = {
+                "ids": np.memmap(paths["ids"], dtype=np.int64, mode="r", shape=(n,)),
+                "vec": np.memmap(paths["vec"], dtype=np.float32, mode="r", shape=(n, dim)),
+                "codes": np.memmap(paths["codes"], dtype=np.uint64, mode="r",
+                                   shape=(n, CODE_BITS // 64)),
+            }
+        else:
+            index = {"ids": np.empty(0, np.int64), "vec": np.empty((0, dim), np.float32),
+                     "codes": np.empty((0, CODE_BITS // 64), np.uint64)}
+        index["words"] = [np.ascontiguousarray(index["codes"][:, w])
+                          for w in range(CODE_BITS // 64)]
+        index["meta"] = meta
+        _read_cache.update(mtime=mtime, index=index)
+    return _read_cache["index"]
+
+
+def version():
+    return _read_cache["mtime"]
+
+
+# ================== BUILD / UPDATE ==================
+def _encode_new(db, meta, after_id):
+    added = 0
+    for chunk in db.execute(_texts_query(after_id)).partitions(ENCODE_BATCH):
+        ids = np.array([r.id for r in chunk], dtype=np.int64)
+        _append(meta, ids, encode([_row_text(r) for r in chunk], meta))
+        added += len(chunk)
+    return added
+
+
+def _rebuild(db):
+    from .ml import embedding
+
+    if db.execute(select(func.count(Incident.id))).scalar() < 2:
+        return 0
+    old = _read_meta()
+    if old:
+        reserve_ids(db, old["max_id"])
+    generation = (old["generation"] + 1) if old else 1
+    emb = "model"
+    if not embedding.EMBEDDING_FILE.exists():
+        _fit_own_embedding(db)
+        emb = f"index:{generation}"
+    meta = _new_meta(generation, 0, _model_key(), emb)
+    meta["dim"] = int(_load_encoder(meta)[1]["dim"])
+    added = _encode_new(db, meta, 0)
+    _write_meta(meta)
+    if old:
+        _remove_generation(old["generation"])
+    return added
+
+
+def _compact(db, meta):
+    """Rewrite the live rows into a new generation (no re-encoding)."""
+    index = load()
+    live_ids = np.fromiter(db.scalars(select(Incident.id).order_by(Incident.id)), dtype=np.int64)
+    keep = np.isin(index["ids"], live_ids, assume_unique=True)
+    new = _new_meta(meta["generation"] + 1, meta["dim"], meta["model"], meta["embedding"])
+    for start in range(0, len(keep), BLOCK_ROWS):
+        sl = slice(start, start + BLOCK_ROWS)
+        mask = keep[sl]
+        if mask.any():
+            _append(new, index["ids"][sl][mask], index["vec"][sl][mask])
+    new["max_id"] = meta["max_id"]
+    _write_meta(new)
+    _remove_generation(meta["generation"])
+    return int(len(keep) - keep.sum())
+
+
+@metrics.timed("vectors.update")
+def update(db=None, rebuild=False):
+    """Append new incidents (rebuild/compact when needed). Returns rows added."""
+    from .database import SessionLocal
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
+    try:
+        with _write_lock:
+            meta = _read_meta()
+            if (rebuild or meta is None or meta["model"] != _model_key()
+                    or not meta.get("monotonic_ids")):
+                return _rebuild(db)
+            reserve_ids(db, meta["max_id"])
+
+            live = db.execute(select(func.count(Incident.id))).scalar()
+            if meta["count"] - live > COMPACT_FRACTION * max(meta["count"], 1):
+                removed = _compact(db, meta)
+                print(f"🗜 Vector index compacted: {removed} deleted incidents dropped")
+                meta = _read_meta()
+
+            added = _encode_new(db, meta, meta["max_id"])
+            if added:
+                _write_meta(meta)
+            return added
+    finally:
+        if own_session:
+            db.close()
+
+
+# ================== SEARCH ==================
+def _top(scores, k):
+    if len(scores) <= k:
+        order = np.argsort(-scores, kind="stable")
+    else:
+        part = np.argpartition(-scores, k)[:k]
+        order = part[np.argsort(-scores[part], kind="stable")]
+    return order
+
+
+def search_exact(vec, q, n, k):
+    """(row positions, scores) of the k best of the first n rows."""
+    best_pos = np.empty(0, dtype=np.int64)
+    best_score = np.empty(0, dtype=np.float32)
+    for start in range(0, n, BLOCK_ROWS):
+        scores = vec[start:min(start + BLOCK_ROWS, n)] @ q
+        top = _top(scores, k)
+        best_pos = np.concatenate([best_pos, top + start])
+        best_score = np.concatenate([best_score, scores[top]])
+        keep = _top(best_score, k)
+        best_pos, best_score = best_pos[keep], best_score[keep]
+    return best_pos, best_score
+
+
+def search_approx(vec, words, q, n, k, candidates=APPROX_CANDIDATES):
+    """Hamming pre-filter on the sign codes, then exact re-ranking."""
+    if n <= candidates:
+        return search_exact(vec, q, n, k)
+    qcode = sign_codes(q[None, :], _planes(len(q)))[0]
+    dist = _bitwise_count(words[0][:n] ^ qcode[0])     # uint8: at most CODE_BITS=128
+    for w in range(1, len(words)):
+        dist += _bitwise_count(words[w][:n] ^ qcode[w])
+    # smallest radius holding `candidates` rows (a counting pass, not a partition)
+    radius = np.searchsorted(np.cumsum(np.bincount(dist)), candidates)
+    cand = np.flatnonzero(dist <= radius)
+    if len(cand) > 4 * candidates:      # many ties at the radius
+        cand = np.sort(cand[np.argpartition(dist[cand], candidates)[:candidates]])
+    scores = vec[cand] @ q
+    top = _top(scores, k)
+    return cand[top], scores[top]
+
+
+def search(index, q, k, mode="auto", before_id=None):
+    """Ids and cosine similarities of the k nearest indexed incidents to q."""
+    n = len(index["ids"])
+    if before_id is not None:
+        n = int(np.searchsorted(index["ids"], before_id, side="left"))
+    if mode == "auto":
+        mode = "approx" if n >= APPROX_MIN_ROWS else "exact"
+    SEARCHES.inc(mode=mode)
+    if mode == "approx":
+        pos, scores = search_approx(index["vec"], index["words"], q, n, k)
+    else:
+        pos, scores = search_exact(index["vec"], q, n, k)
+    return index["ids"][pos].tolist(), scores.tolist()
+
+
+def query_vector(db, index, incident_id):
+    """The incident's stored embedding, or one encoded from its text; None if unknown."""
+    ids = index["ids"]
+    pos = int(np.searchsorted(ids, incident_id))
+    if pos < len(ids) and ids[pos] == incident_id:
+        return np.asarray(index["vec"][pos])
+    row = db.execute(
+        text_store.outerjoin(select(Incident.id, Incident.title, *text_store.JOIN_COLUMNS))
+        .where(Incident.id == incident_id)
+    ).first()
+    if row is None:
+        return None
+    return encode([_row_text(row)], index["meta"])[0]
+
+
+def related(db, incident_id, k=10, mode="auto", earlier=False):
+    """
+    Incidents most similar to `incident_id`: [(id, similarity)], best first,
+    positive similarities only ([] for an incident with no known terms).
+    None if the incident does not exist or no index has been built.
+    """
+    if mode not in MODES:
+        raise VectorIndexError(f"mode must be one of {', '.join(MODES)}")
+    index = load()
+    if index is None:
+        return None
+    q = query_vector(db, index, incident_id)
+    if q is None:
+        return None
+    if np.linalg.norm(q) == 0:
+        return []
+    ids, scores = search(index, q, k + OVERFETCH, mode,
+                         before_id=incident_id if earlier else None)
+    return [(i, s) for i, s in zip(ids, scores) if i != incident_id and s > 0]
+
+
+# ================== CLI ==================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build / update the incident vector index")
+    parser.add_argument("--rebuild", action="store_true", help="re-encode every incident")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    added = update(rebuild=args.rebuild)
+    meta = _read_meta() or {}
+    print(f"🧭 Vector index: +{added} rows, {meta.get('count', 0)} total "
+          f"(dim {meta.get('dim')}) in {time.perf_counter() - t0:.2f}s → {VECTOR_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+# backend/wsgi.py
+# WSGI entry point: gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+from backend.app import app
+from backend.database import init_db
+from backend import hot_window
+
+# schema + pending upgrades once in the master (preload_app), before workers fork
+init_db()
+
+# load the recent-incident window once in the master; workers fork with it
+# (if the schema isn't there yet, the first request builds it instead)
+try:
+    hot_window.rebuild()
+except Exception as e:
+    print("⚠️ hot window warm-up skipped:", e)
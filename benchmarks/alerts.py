@@ -0,0 +1,191 @@
+# benchmarks/alerts.py
+"""
+Alert rule engine check + benchmark.
+
+1. Generates --rules random rules and --incidents synthetic incidents,
+   matches them with backend.alerts.RuleIndex and with a naive scan over
+   every rule, and fails if the two disagree.
+2. Stores the rules in a scratch DB, dispatches the incidents (alert jobs
+   are queued) and drains the queue into a local WebhookStub whose first
+   requests fail; every matched alert must arrive exactly once.
+
+Run as: python -m benchmarks.alerts --rules 5000 --incidents 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.synthetic import (
+    PRIORITIES, SECTORS, SOURCES, THREATS, VENDORS, WebhookStub, make_text,
+)
+
+
+def make_rules(n, n_webhooks, stub, seed=0):
+    rng = random.Random(seed)
+    rules = []
+    for i in range(n):
+        conditions = {}
+        # analyst-style rules: 2-3 conditions, e.g. CRITICAL + Healthcare + "ransomware"
+        for key in rng.sample(["priority", "sector", "source", "keywords"], rng.randint(2, 3)):
+            if key == "priority":
+                conditions[key] = rng.sample(["HIGH", "CRITICAL"], rng.randint(1, 2))
+            elif key == "sector":
+                conditions[key] = [rng.choice(SECTORS)]
+            elif key == "source":
+                conditions[key] = [rng.choice(SOURCES)]
+            else:
+                conditions[key] = rng.sample(THREATS + VENDORS, rng.randint(1, 2))
+        rules.append({
+            "name": f"rule-{i}",
+            "webhook_url": stub.url(f"team-{i % n_webhooks}"),
+            **conditions,
+        })
+    return rules
+
+
+def make_incidents(n, seed=1):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(n):
+        title, summary = make_text(rng)
+        rows.append({
+            "id": i + 1,
+            "title": title,
+            "summary": summary,
+            "url": f"https://example.test/{i}",
+            "source": rng.choice(SOURCES),
+            "timestamp": now - timedelta(minutes=i),
+            "priority": rng.choice(PRIORITIES),
+            "category": "critical",
+            "sector": rng.choice(SECTORS),
+            "threat_score": 50.0,
+        })
+    return rows
+
+
+def naive_match(rules, row, tokens):
+    text = " " + " ".join(tokens(f"{row['title']} {row['summary']}")) + " "
+    hits = []
+    for rule_id, rule in rules:
+        ok = True
+        for field in ("priority", "category", "sector", "source"):
+            if field in rule and str(row[field]).lower() not in {v.lower() for v in rule[field]}:
+                ok = False
+        if "keywords" in rule and not any(
+            f" {' '.join(tokens(k))} " in text for k in rule["keywords"]
+        ):
+            ok = False
+        if ok:
+            hits.append(rule_id)
+    return sorted(hits)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--incidents", type=int, default=2000)
+    parser.add_argument("--webhooks", type=int, default=20)
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="cybernow-alerts-"))
+    os.environ["CYBERNOW_DATABASE_URL"] = f"sqlite:///{workdir / 'alerts.db'}"
+    os.environ["CYBERNOW_WEBHOOK_HOSTS"] = "127.0.0.1"    # the local WebhookStub
+    from backend import alerts
+    from backend.automation import alert_delivery
+    from backend.database import SessionLocal, init_db
+    from backend.models import AlertRule
+
+    results = {}
+    try:
+        with WebhookStub(fail_first=3) as stub:
+            specs = make_rules(args.rules, args.webhooks, stub)
+            values = [alerts.parse_rule(spec) for spec in specs]
+            rows = make_incidents(args.incidents)
+
+            # ---- matching: index vs naive scan ----
+            t0 = time.perf_counter()
+            index = alerts.RuleIndex(
+                (i + 1, v["name"], v["webhook_url"], v["conditions"])
+                for i, v in enumerate(values)
+            )
+            results["index_build_s"] = round(time.perf_counter() - t0, 4)
+
+            t0 = time.perf_counter()
+            indexed = [sorted(index.match(r)) for r in rows]
+            results["index_match_s"] = round(time.perf_counter() - t0, 4)
+
+            plain = [(i + 1, json.loads(v["conditions"])) for i, v in enumerate(values)]
+            t0 = time.perf_counter()
+            naive = [naive_match(plain, r, alerts._tokens) for r in rows]
+            results["naive_match_s"] = round(time.perf_counter() - t0, 4)
+
+            results["matches"] = sum(len(m) for m in indexed)
+            results["match_agrees"] = indexed == naive
+            results["speedup"] = round(
+                results["naive_match_s"] / max(results["index_match_s"], 1e-9), 1
+            )
+
+            # ---- dispatch + batched delivery through the queue ----
+            init_db()
+            db = SessionLocal()
+            db.add_all(AlertRule(**v) for v in values)
+            db.commit()
+
+            t0 = time.perf_counter()
+            queued = alerts.dispatch(db, rows)
+            results["dispatch_s"] = round(time.perf_counter() - t0, 4)
+            db.close()
+
+            alert_delivery.BACKOFF_SECONDS = 0.05
+            t0 = time.perf_counter()
+            jobs = 0
+            while True:
+                claimed, _ = alert_delivery.drain()
+                if not claimed:
+                    break
+                jobs += claimed
+            results["deliver_s"] = round(time.perf_counter() - t0, 4)
+
+            received = Counter()
+            for _, body in stub.received:
+                for alert in body["alerts"]:
+                    received[(alert["rule_id"], alert["incident"]["id"])] += 1
+            results.update({
+                "queued": queued,
+                "jobs": jobs,
+                "posts": len(stub.received),
+                "failed_posts": stub.fail_first,
+                "delivered": sum(received.values()),
+                "duplicates": sum(n - 1 for n in received.values()),
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ok = (
+        results["match_agrees"]
+        and results["queued"] == results["matches"]
+        and results["delivered"] == results["matches"]
+        and results["duplicates"] == 0
+    )
+    text = json.dumps({"ok": ok, "rules": args.rules, "incidents": args.incidents,
+                       "results": results}, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+    print(text)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,129 @@
+# benchmarks/collector_shards.py
+"""
+Sharded collector check + throughput benchmark.
+
+Starts a FeedStub with --feeds slow feeds, then for each worker count N
+runs N collector processes (shard i/N, leased) against a fresh scratch
+DB and reports wall time. Fails if any feed was fetched more than once
+per round or any incident was stored twice, then runs a second round in
+which every worker is given ALL feeds: leases must still keep each feed
+to one poll.
+
+Run as: python -m benchmarks.collector_shards --feeds 24 --workers 1,2,4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import FeedStub
+
+
+def _worker(db_url, feeds, shard, total, sharded, barrier):
+    os.environ["CYBERNOW_DATABASE_URL"] = db_url
+    from backend.collector import sharding
+    from backend.collector.rss_collector import run_once
+
+    mine = sharding.shard_sources(feeds, shard, total) if sharded else feeds
+    barrier.wait()
+    run_once(mine, lease_owner=sharding.default_owner(f"bench-{shard}"), min_interval=3600)
+
+
+def run_round(workdir, stub, n_workers, sharded=True):
+    db_path = workdir / f"shards-{n_workers}-{int(sharded)}.db"
+    db_url = f"sqlite:///{db_path}"
+
+    ctx = multiprocessing.get_context("spawn")
+    # create the schema once, up front, so workers don't race on DDL
+    init = ctx.Process(target=_init_db, args=(db_url,))
+    init.start()
+    init.join()
+
+    stub.hits.clear()
+    barrier = ctx.Barrier(n_workers + 1)
+    procs = [
+        ctx.Process(target=_worker,
+                    args=(db_url, stub.urls, i, n_workers, sharded, barrier))
+        for i in range(n_workers)
+    ]
+    for p in procs:
+        p.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+
+    conn = sqlite3.connect(db_path)
+    rows, distinct = conn.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT source || '|' || external_id) FROM incidents"
+    ).fetchone()
+    conn.close()
+
+    return {
+        "workers": n_workers,
+        "sharded": sharded,
+        "seconds": round(elapsed, 3),
+        "feeds_fetched": len(stub.hits),
+        "max_fetches_per_feed": max(stub.hits.values(), default=0),
+        "incidents": rows,
+        "duplicates": rows - distinct,
+        "exit_codes": [p.exitcode for p in procs],
+    }
+
+
+def _init_db(db_url):
+    os.environ["CYBERNOW_DATABASE_URL"] = db_url
+    from backend.database import init_db
+    init_db()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=24)
+    parser.add_argument("--items", type=int, default=25)
+    parser.add_argument("--delay", type=float, default=0.25,
+                        help="simulated upstream latency per feed (s)")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    counts = [int(n) for n in args.workers.split(",")]
+    workdir = Path(tempfile.mkdtemp(prefix="cybernow-shards-"))
+    results = []
+    try:
+        with FeedStub(n_feeds=args.feeds, items_per_feed=args.items,
+                      delay=args.delay) as stub:
+            for n in counts:
+                results.append(run_round(workdir, stub, n, sharded=True))
+                print(f"▶ {n} sharded workers: {results[-1]['seconds']}s")
+            # no sharding at all: leases alone must prevent double polls
+            results.append(run_round(workdir, stub, max(counts), sharded=False))
+            print(f"▶ {max(counts)} unsharded workers: {results[-1]['seconds']}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ok = all(
+        r["max_fetches_per_feed"] == 1
+        and r["feeds_fetched"] == args.feeds
+        and r["duplicates"] == 0
+        and r["exit_codes"] == [0] * r["workers"]
+        for r in results
+    )
+    text = json.dumps({"ok": ok, "results": results}, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+    print(text)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,150 @@
+# benchmarks/load_test.py
+"""
+Load-test the production serving mode with concurrent dashboard clients.
+
+Each client repeats the dashboard page-load sequence (the same API calls
+dashboard.js makes) for --duration seconds. The server is gunicorn with
+backend/gunicorn.conf.py when installed, else werkzeug's threaded server.
+
+Run as: python -m benchmarks.load_test --rows 100000 --clients 32 --out load.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from benchmarks.run import percentiles
+from benchmarks.synthetic import generate_incidents
+
+PAGE_LOAD = [
+    "/api/dashboard/summary",
+    "/api/incidents/live",
+    "/api/analytics/trends",
+    "/api/analytics/threat-distribution",
+    "/api/ml/status",
+]
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _wait_ready(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + "/api/ml/status", timeout=1).read()
+            return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+
+def _start_server(port, workers, threads):
+    if shutil.which("gunicorn"):
+        env = dict(os.environ,
+                   CYBERNOW_BIND=f"127.0.0.1:{port}",
+                   CYBERNOW_WORKERS=str(workers),
+                   CYBERNOW_THREADS=str(threads))
+        proc = subprocess.Popen(
+            ["gunicorn", "-c", "backend/gunicorn.conf.py", "backend.wsgi:app"],
+            cwd=REPO_ROOT, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        return "gunicorn", proc.terminate
+
+    from werkzeug.serving import make_server
+    from backend.wsgi import app
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return "werkzeug-threaded", server.shutdown
+
+
+def _client(base, deadline, timings, errors, lock):
+    local_t, local_err = [], 0
+    while time.time() < deadline:
+        for path in PAGE_LOAD:
+            t0 = time.perf_counter()
+            try:
+                urllib.request.urlopen(base + path, timeout=10).read()
+                local_t.append(time.perf_counter() - t0)
+            except Exception:
+                local_err += 1
+    with lock:
+        timings.extend(local_t)
+        errors[0] += local_err
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp(prefix="cybernow-load-"))
+    db_path = tmp / "load.db"
+    os.environ["CYBERNOW_DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    stop = None
+    try:
+        from backend.database import init_db
+        init_db()
+        generate_incidents(db_path, args.rows)
+
+        mode, stop = _start_server(args.port, args.workers, args.threads)
+        base = f"http://127.0.0.1:{args.port}"
+        if not _wait_ready(base):
+            print("Server did not come up")
+            return None
+
+        timings, errors, lock = [], [0], threading.Lock()
+        deadline = time.time() + args.duration
+        clients = [
+            threading.Thread(target=_client, args=(base, deadline, timings, errors, lock))
+            for _ in range(args.clients)
+        ]
+        t0 = time.perf_counter()
+        for c in clients:
+            c.start()
+        for c in clients:
+            c.join()
+        elapsed = time.perf_counter() - t0
+
+        report = {
+            "server": mode,
+            "workers": args.workers if mode == "gunicorn" else 1,
+            "threads": args.threads,
+            "clients": args.clients,
+            "rows": args.rows,
+            "duration_s": round(elapsed, 2),
+            "requests": len(timings),
+            "errors": errors[0],
+            "requests_per_s": round(len(timings) / elapsed, 1),
+            "page_loads_per_s": round(len(timings) / len(PAGE_LOAD) / elapsed, 1),
+            "latency": percentiles(timings) if timings else None,
+        }
+        text = json.dumps(report, indent=2)
+        if args.out:
+            Path(args.out).write_text(text)
+        print(text)
+        return report
+    finally:
+        if stop:
+            stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,100 @@
+# benchmarks/related.py
+"""
+Related-incidents vector index benchmark.
+
+Writes --rows synthetic unit vectors (clustered like campaigns: --clusters
+centres plus noise) through backend.vector_index's append path into a
+scratch directory, then runs --queries searches in exact and approx mode
+and reports p50/p95 latency and the approx mode's recall@k against the
+exact result.
+
+Run as: python -m benchmarks.related --rows 1000000 --queries 200
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def make_vectors(n, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    Z = centres[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    Z /= np.linalg.norm(Z, axis=1, keepdims=True)
+    return Z
+
+
+def _pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--clusters", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="cybernow-vectors-"))
+    os.environ["CYBERNOW_VECTOR_DIR"] = str(workdir)
+    from backend import vector_index
+
+    results = {}
+    try:
+        t0 = time.perf_counter()
+        meta = vector_index._new_meta(1, args.dim, "synthetic", "model")
+        chunk = 100_000
+        for start in range(0, args.rows, chunk):
+            n = min(chunk, args.rows - start)
+            Z = make_vectors(n, args.dim, args.clusters, seed=start)
+            vector_index._append(meta, np.arange(start + 1, start + n + 1), Z)
+        vector_index._write_meta(meta)
+        results["build_s"] = round(time.perf_counter() - t0, 2)
+        results["index_mb"] = round(
+            sum(p.stat().st_size for p in workdir.glob("1.*")) / 1e6, 1
+        )
+
+        index = vector_index.load()
+        rng = np.random.default_rng(1)
+        picks = rng.integers(0, args.rows, args.queries)
+        timings = {"exact": [], "approx": []}
+        found = {"exact": [], "approx": []}
+        for pos in picks:
+            q = np.asarray(index["vec"][pos])
+            for mode in timings:
+                t0 = time.perf_counter()
+                ids, _ = vector_index.search(index, q, args.k, mode)
+                timings[mode].append(time.perf_counter() - t0)
+                found[mode].append(set(ids))
+
+        for mode, values in timings.items():
+            results[f"{mode}_p50_ms"] = _pct(values, 50)
+            results[f"{mode}_p95_ms"] = _pct(values, 95)
+        results[f"approx_recall_at_{args.k}"] = round(statistics.mean(
+            len(a & e) / args.k for a, e in zip(found["approx"], found["exact"])
+        ), 3)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps({"rows": args.rows, "dim": args.dim, "queries": args.queries,
+                       "results": results}, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+    print(text)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
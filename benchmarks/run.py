@@ -0,0 +1,375 @@
+# benchmarks/run.py
+"""
+CyberNow benchmark suite.
+
+Builds a scratch SQLite DB filled with synthetic incidents, then times:
+- collector:  run_once() against a local stub serving synthetic feeds
+              (cold = all new entries, warm = all duplicates)
+- classify:   classify_batch() throughput at several batch sizes
+- train:      run_train() on the synthetic DB (artifacts go to the workdir)
+- api:        p50/p99 latency of every GET /api/* endpoint, plus
+              identity vs gzip payload size
+- serialization: stdlib json vs backend.serialization on the live feed
+- retention:  cleanup_old_incidents() over the synthetic rows
+- backfill:   entries/s of the bulk backfill (backend/collector/backfill.py)
+              vs the collector's insert path (classify + commit per 25)
+              on the same archived feed dumps
+- analytics:  column store build + /api/analytics/range latency vs the
+              equivalent SQLite GROUP BY
+
+Run as: python -m benchmarks.run --rows 10000 --out results.json
+Results are JSON so runs can be diffed / compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.synthetic import FeedStub, generate_incidents, make_text
+
+SCENARIOS = ["collector", "classify", "train", "api", "serialization", "analytics", "retention",
+             "backfill"]
+API_REPEAT = 50
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p99_ms": round(ordered[max(0, int(len(ordered) * 0.99) - 1)] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+# ================== SCENARIOS ==================
+def bench_collector(args, workdir):
+    from backend.collector import rss_collector
+
+    with FeedStub(n_feeds=args.feeds, items_per_feed=args.items, seed=args.seed) as stub:
+        saved = rss_collector.FEEDS
+        rss_collector.FEEDS = stub.urls
+        try:
+            t0 = time.perf_counter()
+            new_ids = rss_collector.run_once() or []
+            cold = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            rss_collector.run_once()
+            warm = time.perf_counter() - t0
+        finally:
+            rss_collector.FEEDS = saved
+
+    return {
+        "feeds": args.feeds,
+        "items_per_feed": args.items,
+        "inserted": len(new_ids),
+        "cold_cycle_s": round(cold, 4),
+        "warm_cycle_s": round(warm, 4),
+    }
+
+
+def bench_classify(args, workdir):
+    import random
+    from backend.collector.ml_classifier import classify_batch
+
+    rng = random.Random(args.seed)
+    texts = [" ".join(make_text(rng)) for _ in range(args.classify_rows)]
+
+    out = {}
+    for batch_size in (1, 32, 256):
+        t0 = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            classify_batch(texts[i:i + batch_size])
+        elapsed = time.perf_counter() - t0
+        out[f"batch_{batch_size}"] = {
+            "rows": len(texts),
+            "seconds": round(elapsed, 4),
+            "rows_per_s": round(len(texts) / elapsed, 1),
+        }
+    return out
+
+
+def bench_train(args, workdir):
+    from backend.ml import fingerprint, train
+
+    # keep the repo's model artifacts untouched
+    ml_dir = workdir / "ml"
+    ml_dir.mkdir(exist_ok=True)
+    for attr in ("MODEL_FILE", "VECT_FILE", "IFOREST_FILE",
+                 "LINEAR_MODEL_FILE", "COMPACT_FOREST_FILE", "DRIFT_STATE",
+                 "SOURCE_PRIORS_FILE", "EMBEDDING_FILE"):
+        setattr(train, attr, ml_dir / getattr(train, attr).name)
+    fingerprint.FINGERPRINT_FILE = ml_dir / fingerprint.FINGERPRINT_FILE.name
+
+    t0 = time.perf_counter()
+    ok = train.run_train()
+    return {"ok": bool(ok), "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def bench_api(args, workdir):
+    from backend.app import app
+
+    client = app.test_client()
+    endpoints = sorted(
+        rule.rule
+        for rule in app.url_map.iter_rules()
+        if rule.rule.startswith("/api/")
+        and "GET" in rule.methods
+        and "<" not in rule.rule
+    )
+
+    out = {}
+    for path in endpoints:
+        client.get(path)  # warm-up
+        timings = []
+        for _ in range(API_REPEAT):
+            t0 = time.perf_counter()
+            resp = client.get(path)
+            timings.append(time.perf_counter() - t0)
+        gz = client.get(path, headers={"Accept-Encoding": "gzip"})
+        out[path] = {
+            "status": resp.status_code,
+            "bytes": len(resp.get_data()),
+            "bytes_gzip": len(gz.get_data()),
+            **percentiles(timings),
+        }
+    return out
+
+
+def bench_serialization(args, workdir):
+    import gzip as gzip_mod
+    import json as json_mod
+    from backend import serialization
+    from backend.app import app
+
+    with app.test_client() as client:
+        payload = client.get("/api/incidents/live").get_json()
+
+    def stdlib():
+        return gzip_mod.compress(json_mod.dumps(payload).encode(), 6)
+
+    def layer():
+        return serialization._Entry(serialization.dumps(payload)).encoded("gzip")[1]
+
+    def layer_cached(entry=serialization._Entry(serialization.dumps(payload))):
+        return entry.encoded("gzip")[1]
+
+    out = {"payload_items": len(payload), "encoder": "orjson" if serialization.orjson else "json"}
+    for name, fn in (("stdlib_json_gzip", stdlib), ("layer_gzip", layer),
+                     ("layer_cached", layer_cached)):
+        timings = []
+        for _ in range(API_REPEAT * 4):
+            t0 = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t0)
+        out[name] = percentiles(timings)
+    return out
+
+
+def bench_analytics(args, workdir):
+    from datetime import date, timedelta
+    from sqlalchemy import func
+    from backend import analytics_store
+    from backend.database import SessionLocal
+    from backend.models import Incident
+
+    analytics_store.STORE_FILE = workdir / "analytics_store.npz"
+    t0 = time.perf_counter()
+    added = analytics_store.refresh(rebuild=True)
+    build = time.perf_counter() - t0
+
+    store = analytics_store.load_store()
+    end = date.today()
+    start = end - timedelta(days=args.days)
+    out = {"rows": added, "build_s": round(build, 3),
+           "store_bytes": analytics_store.STORE_FILE.stat().st_size}
+    for interval in analytics_store.INTERVALS:
+        for group_by in analytics_store.GROUP_COLUMNS:
+            timings = []
+            for _ in range(API_REPEAT):
+                t0 = time.perf_counter()
+                analytics_store.range_counts(store, start, end, interval, group_by)
+                timings.append(time.perf_counter() - t0)
+            out[f"{interval}_{group_by}"] = percentiles(timings)
+
+    db = SessionLocal()
+    try:
+        day = func.date(Incident.timestamp)
+        timings = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            db.query(day, Incident.category, func.count(Incident.id)).filter(
+                Incident.timestamp >= start
+            ).group_by(day, Incident.category).all()
+            timings.append(time.perf_counter() - t0)
+        out["sqlite_day_category"] = percentiles(timings)
+    finally:
+        db.close()
+    return out
+
+
+def bench_retention(args, workdir):
+    from backend.database import SessionLocal
+    from backend.collector.rss_collector import cleanup_old_incidents
+
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        cleanup_old_incidents(db)
+        db.commit()
+        return {"seconds": round(time.perf_counter() - t0, 4)}
+    finally:
+        db.close()
+
+
+def bench_backfill(args, workdir):
+    from backend.database import SessionLocal
+    from backend import scoring
+    from backend.collector import backfill, rss_collector
+    from backend.collector.entity_extractor import extract_batch
+    from backend.collector.feed_fetcher import parse_entries
+    from benchmarks.synthetic import make_feed_xml
+
+    dumps = workdir / "archives"
+    dumps.mkdir(exist_ok=True)
+    for k in range(args.feeds):
+        xml = make_feed_xml(args.backfill_items, seed=args.seed, feed_id=f"archive-{k}")
+        (dumps / f"archive-{k}.xml").write_bytes(xml)
+
+    stats = backfill.backfill(backfill.tasks([str(dumps)]), keep_expired=True)
+
+    # same entries under other sources, through run_once's per-feed path
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        n = 0
+        for path in sorted(dumps.glob("*.xml")):
+            entries = parse_entries([path.read_bytes()], str(path))
+            rows = [rss_collector.entry_row(f"collector:{path.name}", e) for e in entries]
+            for i in range(0, len(rows), rss_collector.ENTRIES_PER_FEED):
+                chunk = rows[i:i + rss_collector.ENTRIES_PER_FEED]
+                rss_collector.classify_rows(chunk)
+                scoring.score_fields(chunk)
+                n += len(rss_collector.insert_incidents(
+                    db, chunk, extract_batch(f"{r['title']} {r['summary']}" for r in chunk)
+                ))
+        collector_s = time.perf_counter() - t0
+    finally:
+        db.close()
+
+    return {
+        "entries": stats["entries"],
+        "backfill": {k: stats[k] for k in ("new", "seconds", "entries_per_s")},
+        "collector_path": {
+            "new": n,
+            "seconds": round(collector_s, 3),
+            "entries_per_s": round(n / collector_s, 1),
+        },
+    }
+
+
+BENCHES = {
+    "collector": bench_collector,
+    "classify": bench_classify,
+    "train": bench_train,
+    "api": bench_api,
+    "serialization": bench_serialization,
+    "analytics": bench_analytics,
+    "retention": bench_retention,
+    "backfill": bench_backfill,
+}
+
+
+# ================== MAIN ==================
+def _git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000,
+                        help="synthetic incidents in the DB (e.g. 10000, 100000, 1000000)")
+    parser.add_argument("--days", type=int, default=90, help="spread of incident timestamps")
+    parser.add_argument("--feeds", type=int, default=5)
+    parser.add_argument("--items", type=int, default=25, help="items per synthetic feed")
+    parser.add_argument("--classify-rows", type=int, default=2000)
+    parser.add_argument("--backfill-items", type=int, default=4000,
+                        help="entries per archived feed in the backfill scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--workdir", help="keep the scratch DB here instead of a temp dir")
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(BENCHES)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    tmp = None
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.mkdtemp(prefix="cybernow-bench-")
+        workdir = Path(tmp)
+
+    db_path = workdir / "bench.db"
+    # must be set before backend.database is imported
+    os.environ["CYBERNOW_DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    try:
+        from backend.database import init_db
+        init_db()
+
+        t0 = time.perf_counter()
+        generate_incidents(db_path, args.rows, seed=args.seed, days=args.days)
+        fill_s = time.perf_counter() - t0
+        print(f"Generated {args.rows} incidents in {fill_s:.1f}s")
+
+        results = {}
+        for name in scenarios:
+            print(f"▶ {name}")
+            results[name] = BENCHES[name](args, workdir)
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "git_rev": _git_rev(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "rows": args.rows,
+                "seed": args.seed,
+                "fill_s": round(fill_s, 3),
+                "db_bytes": db_path.stat().st_size,
+            },
+            "results": results,
+        }
+        text = json.dumps(report, indent=2)
+        if args.out:
+            Path(args.out).write_text(text)
+        print(text)
+        return report
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,152 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark for the CLI / server entry points.
+
+For each entry point, imports its module --repeat times in a fresh
+interpreter with `python -X importtime` and reports:
+- wall_ms:   p50 wall-clock of `python -c "import <module>"`, minus the
+             same for a bare interpreter (site hooks, .pth files)
+- import_ms: p50 cumulative import time of the module itself
+- modules:   number of modules it imports (beyond the bare interpreter's)
+- heaviest:  the slowest top-level packages it pulls in (cumulative ms)
+- heavy:     which of HEAVY_MODULES got imported at all
+
+Nothing runs past the imports, so no DB is touched (CYBERNOW_DATABASE_URL
+points at a scratch path anyway). With --check, exits non-zero if an
+entry point in ML_FREE imports any of HEAVY_MODULES, so a stray
+top-level `import sklearn` shows up in CI.
+
+Run as: python -m benchmarks.startup --repeat 5 --out startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ENTRY_POINTS = {
+    "collector": "backend.run_collector",
+    "update_scores": "backend.automation.update_scores",
+    "pipeline": "backend.run_pipeline",
+    "api": "backend.app",
+    "export": "backend.run_export",
+    "backfill": "backend.run_backfill",
+    "migrate": "backend.automation.db_migrate",
+    "train": "backend.ml.train",
+}
+# the ML stack: loaded on first use, never by importing these
+HEAVY_MODULES = ("sklearn", "joblib", "scipy", "pandas", "pyarrow")
+ML_FREE = ("collector", "update_scores", "pipeline", "api", "export", "backfill", "migrate")
+TOP_IMPORTS = 8
+
+
+def _import_profile(module, env):
+    """(wall seconds, {module: (self_us, cumulative_us, depth)}); module=None: bare interpreter."""
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        profile[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return wall, profile
+
+
+def _p50_ms(values):
+    return round(statistics.median(values) * 1000, 1)
+
+
+def measure(module, repeat, env, baseline_s=0.0, baseline_modules=()):
+    walls, imports, profile = [], [], {}
+    for _ in range(repeat):
+        wall, profile = _import_profile(module, env)
+        walls.append(wall - baseline_s)
+        imports.append(profile[module][1] / 1e6)
+    profile = {k: v for k, v in profile.items() if k not in baseline_modules}
+
+    # top-level packages outside the backend, wherever in the tree they were first imported
+    packages = [(cum, name) for name, (_, cum, _) in profile.items()
+                if "." not in name and name != "backend"]
+    heaviest = [(name, cum) for cum, name in sorted(packages, reverse=True)[:TOP_IMPORTS]]
+    return {
+        "module": module,
+        "wall_ms": _p50_ms(walls),
+        "import_ms": _p50_ms(imports),
+        "modules": len(profile),
+        "heaviest": {name: round(us / 1000, 1) for name, us in heaviest},
+        "heavy": sorted({name.split(".")[0] for name in profile} & set(HEAVY_MODULES)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="cold imports per entry point")
+    parser.add_argument("--entry-points", default=",".join(ENTRY_POINTS))
+    parser.add_argument("--check", action="store_true",
+                        help="fail if an ML-free entry point imports the ML stack")
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.entry_points.split(",") if n.strip()]
+    unknown = set(names) - set(ENTRY_POINTS)
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(sorted(unknown))}")
+
+    repo_root = Path(__file__).resolve().parent.parent
+    scratch = tempfile.mkdtemp(prefix="cybernow-startup-")
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(repo_root), os.environ.get("PYTHONPATH")])),
+        "CYBERNOW_DATABASE_URL": f"sqlite:///{Path(scratch) / 'startup.db'}",
+    }
+
+    # compiled bytecode is written by the first run; time warm-cache starts
+    for name in names:
+        _import_profile(ENTRY_POINTS[name], env)
+    bare = [_import_profile(None, env) for _ in range(args.repeat)]
+    baseline = statistics.median(wall for wall, _ in bare)
+    baseline_modules = set(bare[0][1])
+
+    results = {}
+    for name in names:
+        results[name] = measure(ENTRY_POINTS[name], args.repeat, env, baseline, baseline_modules)
+        r = results[name]
+        heavy = f"  ⚠ {', '.join(r['heavy'])}" if r["heavy"] else ""
+        print(f"{name:<14} {r['wall_ms']:>8.1f} ms wall {r['import_ms']:>8.1f} ms import "
+              f"{r['modules']:>5} modules{heavy}", file=sys.stderr)
+
+    text = json.dumps({
+        "python": sys.version.split()[0],
+        "baseline_ms": round(baseline * 1000, 1),
+        "repeat": args.repeat,
+        "results": results,
+    }, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+    print(text)
+
+    if args.check:
+        offenders = {n: results[n]["heavy"] for n in names if n in ML_FREE and results[n]["heavy"]}
+        for name, heavy in offenders.items():
+            print(f"❌ {name} imports {', '.join(heavy)} at startup", file=sys.stderr)
+        return not offenders
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,238 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic data for the benchmark suite:
+- make_feed_xml(): an RSS 2.0 document with N plausible incident items
+- FeedStub: serves synthetic feeds from a local HTTP server
+- WebhookStub: local alert webhook receiver (records POSTed batches)
+- generate_incidents(): bulk-fills an incidents table to N rows
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+THREATS = [
+    "ransomware", "phishing campaign", "zero-day exploit", "botnet", "data breach",
+    "supply chain attack", "credential theft", "DDoS attack", "backdoor", "trojan",
+    "misconfiguration", "vulnerability", "security update", "patch", "APT intrusion",
+]
+TARGETS = [
+    "bank", "hospital", "university", "government ministry", "cloud provider",
+    "telecom operator", "power utility", "retailer", "SaaS platform", "airline",
+]
+VENDORS = [
+    "Microsoft", "Cisco", "Fortinet", "VMware", "Apache", "Atlassian", "Citrix",
+    "Ivanti", "Oracle", "SAP", "Google Chrome", "Linux kernel",
+]
+ACTIONS = [
+    "hits", "targets", "disrupts", "exposes data at", "abuses", "spreads through",
+]
+PRIORITIES = ["LOW", "LOW", "LOW", "MEDIUM", "HIGH", "CRITICAL"]
+CATEGORIES = ["low", "high", "critical"]
+SECTORS = ["Finance", "Healthcare", "Government", "Technology", "Energy", "General"]
+SOURCES = [
+    "https://www.cert-in.org.in/rss.xml",
+    "https://www.ncsc.gov.uk/rss/news",
+    "https://www.bleepingcomputer.com/feed/",
+    "https://feeds.feedburner.com/TheHackersNews",
+    "https://www.exploit-db.com/rss.xml",
+    "https://nvd.nist.gov/feeds/xml/cve/misc/nvd-rss.xml",
+]
+
+
+def make_text(rng: random.Random):
+    threat = rng.choice(THREATS)
+    vendor = rng.choice(VENDORS)
+    target = rng.choice(TARGETS)
+    cve = f"CVE-{rng.randint(2019, 2026)}-{rng.randint(1000, 49999)}"
+    title = f"{threat.capitalize()} {rng.choice(ACTIONS)} {target} via {vendor} flaw"
+    summary = (
+        f"Researchers report a {threat} affecting a {target}. Attackers exploited "
+        f"{cve} in {vendor} products; indicators include "
+        f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}."
+    )
+    return title, summary
+
+
+# ================== FEEDS ==================
+def make_feed_xml(n_items: int, seed: int = 0, feed_id: str = "feed"):
+    rng = random.Random(f"{seed}-{feed_id}")
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    items = []
+    for i in range(n_items):
+        title, summary = make_text(rng)
+        published = now - timedelta(minutes=17 * i)
+        items.append(
+            "<item>"
+            f"<title>{escape(title)}</title>"
+            f"<link>https://example.test/{feed_id}/{i}</link>"
+            f"<guid>{feed_id}-{seed}-{i}</guid>"
+            f"<description>{escape('<p>' + summary + '</p>')}</description>"
+            f"<pubDate>{format_datetime(published)}</pubDate>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel>'
+        f"<title>Synthetic {feed_id}</title><link>https://example.test/</link>"
+        + "".join(items)
+        + "</channel></rss>"
+    ).encode("utf-8")
+
+
+class FeedStub:
+    """
+    Local HTTP server for synthetic feeds: /feed/<k>.xml for k < n_feeds.
+    Use as a context manager; .urls lists the feed URLs. `delay` adds
+    per-request latency to mimic slow upstream feeds.
+    """
+
+    def __init__(self, n_feeds: int = 5, items_per_feed: int = 25, seed: int = 0,
+                 delay: float = 0.0):
+        self.bodies = {
+            f"/feed/{k}.xml": make_feed_xml(items_per_feed, seed, f"f{k}")
+            for k in range(n_feeds)
+        }
+        self.hits = {}
+        self.delay = delay
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = stub.bodies.get(self.path)
+                stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        host, port = self.server.server_address
+        self.urls = [f"http://{host}:{port}{path}" for path in self.bodies]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WebhookStub:
+    """
+    Local webhook receiver: records every JSON body POSTed to /hook/<name>.
+    The first `fail_first` requests get a 503 to exercise retries.
+    """
+
+    def __init__(self, fail_first: int = 0):
+        self.received = []           # (path, body)
+        self.requests = 0
+        self.fail_first = fail_first
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    failing = stub.requests <= stub.fail_first
+                    if not failing:
+                        stub.received.append((self.path, json.loads(body)))
+                self.send_response(503 if failing else 204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        host, port = self.server.server_address
+        self.base_url = f"http://{host}:{port}/hook"
+
+    def url(self, name):
+        return f"{self.base_url}/{name}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ================== INCIDENTS ==================
+def generate_incidents(db_path, n_rows: int, seed: int = 0, days: int = 90,
+                       chunk: int = 50_000):
+    """
+    Append n_rows synthetic incidents spread over the last `days` days.
+    The table must already exist (init_db()). Writes with raw sqlite3
+    so 1M rows take seconds, not minutes.
+    """
+    # imported here: backend.database binds its engine on import, and callers
+    # point CYBERNOW_DATABASE_URL at their scratch DB first
+    from backend import text_store
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA synchronous=OFF")
+
+    sql = (
+        "INSERT INTO incidents (source, external_id, title, text_hash, url, "
+        "timestamp, ingested_at, priority, category, sector, geo_scope, is_mitigated, "
+        "anomaly_score, threat_score) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+    )
+    text_sql = (
+        "INSERT OR IGNORE INTO incident_texts (hash, codec, body, size) VALUES (?,?,?,?)"
+    )
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM incidents").fetchone()[0]
+    written = 0
+    while written < n_rows:
+        batch, texts = [], []
+        for i in range(start + written, start + min(written + chunk, n_rows)):
+            title, summary = make_text(rng)
+            text_hash = text_store.digest(summary)
+            texts.append((text_hash, *text_store.encode(summary), len(summary.encode())))
+            ts = now - timedelta(seconds=rng.randint(0, days * 86400))
+            priority = rng.choice(PRIORITIES)
+            batch.append((
+                rng.choice(SOURCES),
+                f"synthetic-{seed}-{i}",
+                title,
+                text_hash,
+                f"https://example.test/incident/{i}",
+                ts.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                ts.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                priority,
+                rng.choice(CATEGORIES),
+                rng.choice(SECTORS),
+                "Global",
+                priority == "LOW",
+                -rng.uniform(0.25, 0.6),
+                rng.uniform(0.4, 1.0),
+            ))
+        conn.executemany(text_sql, texts)
+        conn.executemany(sql, batch)
+        conn.commit()
+        written += len(batch)
+
+    conn.close()
+    return written